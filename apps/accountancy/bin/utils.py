@@ -1,3 +1,4 @@
+from typing import Dict, Iterable, Tuple
 import datetime
 
 import pendulum
@@ -32,21 +33,45 @@ def due_date_calculate(invoice_date: datetime, condition: PaymentCondition):
     return calculate_date.format("DD/MM/YYYY", locale="fr")
 
 
+def get_echeances_calendar(invoices_pairs: Iterable[Tuple]) -> Dict:
+    """Calendrier des échéances textuelles : chaque couple (date de facture, condition de paiement)
+    distinct n'est calculé qu'une fois, les conditions de paiement sont chargées en une requête
+    :param invoices_pairs: couples (date de la facture, code de la condition de paiement)
+    :return: {(date de la facture, code): échéance textuelle}
+    """
+    pairs_set = set(invoices_pairs)
+    conditions_dict = {}
+
+    for condition in PaymentCondition.objects.filter(
+        code__in={code for _, code in pairs_set}
+    ).order_by("offset_month", "offset_days"):
+        conditions_dict.setdefault(condition.code, []).append(condition)
+
+    echeances_dict = {}
+
+    for invoice_date, code in pairs_set:
+        due_dates_list = []
+
+        for due_date in conditions_dict.get(code, []):
+            percent_at_term = int(due_date.percent_at_term)
+            pourcent = (
+                f"{percent_at_term} % le "
+                if percent_at_term and percent_at_term != 100
+                else ""
+            )
+            due_dates_list.append(
+                "".join([pourcent, due_date_calculate(invoice_date, due_date)])
+            )
+
+        echeances_dict[(invoice_date, code)] = ", ".join(due_dates_list)
+
+    return echeances_dict
+
+
 def get_str_echeances(invoice_date: datetime, code: str):
     """Calcul des Echéances
     :param invoice_date: date de la facture
     :param code: uuid de la condition de paiement
     :return: Retourne l'échéance textuelle
     """
-    due_dates_list = []
-
-    for due_date in PaymentCondition.objects.filter(code=code).order_by(
-        "offset_month", "offset_days"
-    ):
-        percent_at_term = int(due_date.percent_at_term)
-        pourcent = (
-            f"{percent_at_term} % le " if percent_at_term and percent_at_term != 100 else ""
-        )
-        due_dates_list.append("".join([pourcent, due_date_calculate(invoice_date, due_date)]))
-
-    return ", ".join(due_dates_list)
+    return get_echeances_calendar([(invoice_date, code)]).get((invoice_date, code), "")
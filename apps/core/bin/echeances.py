@@ -7,13 +7,13 @@ Commentaire:
 created at: 2023-06-21
 created by: Paulo ALVES
 
-modified at: 2023-06-21
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 import os
 import platform
 import sys
-from typing import Tuple
+from typing import Dict, Iterable, Tuple
 from functools import lru_cache
 from uuid import UUID
 import datetime
@@ -57,14 +57,15 @@ def get_payment_method_elements(uuid_payment_method: UUID) -> Tuple:
     return end_month, offset_days, offset_month
 
 
-def get_due_date(invoice_date, uuid_payment_method: UUID) -> datetime.date.isoformat:
+def compute_due_date(invoice_date, end_month: int, offset_days: int, offset_month: int):
     """
-    Renvoi la date d'échéance du paiement de la facture
+    Calcul de la date d'échéance du paiement de la facture, à partir des éléments du mode de règlement
     :param invoice_date: date de la facture
-    :param uuid_payment_method: auuid sage du Mode de règlement
+    :param end_month: fin de mois (1 == non, 2 == fin de mois après, 3 == fin de mois avant)
+    :param offset_days: jours de décalage
+    :param offset_month: mois de décalage
     :return:
     """
-    end_month, offset_days, offset_month = get_payment_method_elements(uuid_payment_method)
     due_date = pendulum.parse(invoice_date)
 
     if end_month is None:
@@ -87,3 +88,36 @@ def get_due_date(invoice_date, uuid_payment_method: UUID) -> datetime.date.isofo
         due_date = due_date.add(days=offset_days)
 
     return due_date.to_date_string()
+
+
+def get_due_date(invoice_date, uuid_payment_method: UUID) -> datetime.date.isoformat:
+    """
+    Renvoi la date d'échéance du paiement de la facture
+    :param invoice_date: date de la facture
+    :param uuid_payment_method: auuid sage du Mode de règlement
+    :return:
+    """
+    return compute_due_date(invoice_date, *get_payment_method_elements(uuid_payment_method))
+
+
+def get_due_dates_calendar(invoices_pairs: Iterable[Tuple]) -> Dict:
+    """
+    Calendrier des échéances : chaque couple (date de facture, mode de règlement) distinct
+    n'est calculé qu'une fois, les modes de règlement sont chargés en une seule requête
+    :param invoices_pairs: couples (date de facture isoformat, auuid sage du Mode de règlement)
+    :return: {(date de facture, auuid): date d'échéance}
+    """
+    pairs_set = set(invoices_pairs)
+    elements_dict = {
+        auuid: (None if end_month is None else int(end_month), offset_days, offset_month)
+        for auuid, end_month, offset_days, offset_month in PaymentCondition.objects.filter(
+            auuid__in={uuid_payment_method for _, uuid_payment_method in pairs_set}
+        ).values_list("auuid", "end_month", "offset_days", "offset_month")
+    }
+
+    return {
+        (invoice_date, uuid_payment_method): compute_due_date(
+            invoice_date, *elements_dict.get(uuid_payment_method, (None, None, None))
+        )
+        for invoice_date, uuid_payment_method in pairs_set
+    }
@@ -0,0 +1,17 @@
+# pylint: disable=E0401
+"""
+FR : Plugin de parsing des fichiers EDI OPTO 33
+EN : OPTO 33 EDI files parsing plugin
+
+Commentaire:
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from apps.core.edi_parsing.plugins import register_edi_loader
+from apps.data_flux.loader import Opto33Loader
+
+register_edi_loader("Edi", Opto33Loader)
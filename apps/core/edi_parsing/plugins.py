@@ -0,0 +1,109 @@
+# pylint: disable=E0401
+"""
+FR : Registre des plugins de parsing des formats de fichiers fournisseurs
+EN : Registry of supplier file format parsing plugins
+
+Chaque format fournisseur s'enregistre par son flow_name :
+    - soit avec un parser de lignes, générateur appelé avec (source, params_dict), qui renvoie
+      les lignes du fichier sous forme de listes, lues par le RowParserLoader sans réécrire
+      le fichier en csv :
+
+        @register_edi_parser("Interson")
+        def interson_rows(file: Path, params_dict: Dict = None):
+            ...
+            yield row
+
+    - soit avec son propre loader :
+
+        register_edi_loader("Edi", Opto33Loader)
+
+Les formats qui ne sont pas enregistrés sont lus par le FileStreamLoader.
+
+Commentaire:
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from importlib import import_module
+from typing import AnyStr, Callable, Dict
+
+from apps.data_flux.loader import RowParserLoader, TemplateDataLoader
+
+# Modules dans lesquels les formats fournisseurs s'enregistrent
+EDI_PLUGINS_MODULES = (
+    "apps.core.edi_parsing.opto_33",
+    "apps.edi.bin.edi_pre_processing_pool",
+)
+
+# Plugins par flow_name
+EDI_PLUGINS_DICT = {}
+
+
+class EdiParserPlugin:
+    """Plugin de parsing d'un format de fichier fournisseur"""
+
+    def __init__(
+        self,
+        flow_name: AnyStr,
+        row_parser: Callable = None,
+        loader: TemplateDataLoader = RowParserLoader,
+    ):
+        """
+        :param flow_name:   flow_name du format fournisseur
+        :param row_parser:  Générateur des lignes du fichier
+        :param loader:      Loader à utiliser pour le fichier
+        """
+        self.flow_name = flow_name
+        self.row_parser = row_parser
+        self.loader = loader
+
+    def get_loader_params_dict(self, params_dict: Dict) -> Dict:
+        """
+        :param params_dict: Paramètres du loader
+        :return: Paramètres du loader, avec le parser de lignes du plugin
+        """
+        if self.row_parser is None:
+            return params_dict
+
+        return {**params_dict, "row_parser": self.row_parser}
+
+
+def register_edi_parser(flow_name: AnyStr):
+    """
+    Décorateur d'enregistrement d'un parser de lignes pour le format fournisseur
+    :param flow_name: flow_name du format fournisseur
+    """
+
+    def decorator(row_parser: Callable):
+        EDI_PLUGINS_DICT[flow_name] = EdiParserPlugin(flow_name, row_parser=row_parser)
+        return row_parser
+
+    return decorator
+
+
+def register_edi_loader(flow_name: AnyStr, loader: TemplateDataLoader):
+    """
+    Enregistrement d'un loader pour le format fournisseur
+    :param flow_name:   flow_name du format fournisseur
+    :param loader:      Loader à utiliser pour le fichier
+    """
+    EDI_PLUGINS_DICT[flow_name] = EdiParserPlugin(flow_name, loader=loader)
+
+
+def load_edi_plugins():
+    """Import des modules des formats fournisseurs, pour qu'ils s'enregistrent"""
+    for module in EDI_PLUGINS_MODULES:
+        import_module(module)
+
+
+def get_edi_plugin(flow_name: AnyStr):
+    """
+    :param flow_name: flow_name du format fournisseur
+    :return: EdiParserPlugin ou None si le format n'est pas enregistré
+    """
+    load_edi_plugins()
+
+    return EDI_PLUGINS_DICT.get(flow_name)
@@ -891,50 +891,106 @@ def date_today():
     return datetime.date.today()
 
 
-def validate_date(value: AnyStr):
-    """
-    Fonction de validation et renvoie de la date au format datetime date
-    :param value: valeur à transformer
-    :return:
-    """
-    value = str(value).strip()
-    dte_value = None
+# Formats de dates essayés, dans l'ordre, par validate_date
+VALIDATE_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d.%m.%Y",
+    "%d-%m-%Y",
+    "%Y%m%d",
+    "%d/%m/%y",
+)
+
+
+class DateFormatSniffer:
+    """
+    Détection du format d'une colonne de dates.
+    Dans un même fichier, toutes les dates d'une colonne ont en général le même format,
+    le format qui a réussi en dernier est donc essayé en premier, et la cascade des autres formats
+    n'est essayée qu'en cas d'échec. Les chaînes déjà rencontrées sont mémorisées.
+    """
+
+    memo_size = 4096
+
+    def __init__(self, formats):
+        """
+        :param formats: Formats strptime dans l'ordre où ils doivent être essayés
+        """
+        self.formats = tuple(formats)
+        self.last_format = None
+        self.memo_dict = {}
+
+    def strptime(self, value: AnyStr, date_format: AnyStr):
+        """
+        :param value:       Chaîne à transformer
+        :param date_format: Format strptime
+        :return: datetime ou None si la chaîne ne correspond pas au format
+        """
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            return None
+
+    def parse(self, value: AnyStr):
+        """
+        Transformation d'une chaîne en datetime
+        :param value: Chaîne à transformer
+        :return: datetime ou None si aucun format ne correspond
+        """
+        if value in self.memo_dict:
+            return self.memo_dict[value]
+
+        dte_value = None
+
+        if self.last_format is not None:
+            dte_value = self.strptime(value, self.last_format)
+
+        if dte_value is None:
+            for date_format in self.formats:
+                if date_format == self.last_format:
+                    continue
+
+                dte_value = self.strptime(value, date_format)
+
+                if dte_value is not None:
+                    self.last_format = date_format
+                    break
+
+        if len(self.memo_dict) >= self.memo_size:
+            self.memo_dict.clear()
+
+        self.memo_dict[value] = dte_value
 
-    try:
-        dte_value = datetime.datetime.strptime(value, "%Y-%m-%d")
         return dte_value
-    except ValueError:
-        pass
 
-    try:
-        dte_value = datetime.datetime.strptime(value, "%d/%m/%Y")
-        return dte_value
-    except ValueError:
-        pass
 
-    try:
-        dte_value = datetime.datetime.strptime(value, "%d.%m.%Y")
-        return dte_value
-    except ValueError:
-        pass
+# Détecteurs de formats de dates par colonne
+DATE_FORMAT_SNIFFERS_DICT = {}
 
-    try:
-        dte_value = datetime.datetime.strptime(value, "%d-%m-%Y")
-        return dte_value
-    except ValueError:
-        pass
 
-    try:
-        dte_value = datetime.datetime.strptime(value, "%Y%m%d")
-        return dte_value
-    except ValueError:
-        pass
+def get_date_format_sniffer(key, formats=VALIDATE_DATE_FORMATS):
+    """
+    Renvoie le détecteur de format de dates de la colonne
+    :param key:     Clé identifiant la colonne
+    :param formats: Formats strptime à essayer
+    :return: DateFormatSniffer
+    """
+    sniffer = DATE_FORMAT_SNIFFERS_DICT.get(key)
 
-    try:
-        dte_value = datetime.datetime.strptime(value, "%d/%m/%y")
-        return dte_value
-    except ValueError:
-        pass
+    if sniffer is None:
+        sniffer = DATE_FORMAT_SNIFFERS_DICT[key] = DateFormatSniffer(formats)
+
+    return sniffer
+
+
+def validate_date(value: AnyStr):
+    """
+    Fonction de validation et renvoie de la date au format datetime date
+    :param value: valeur à transformer
+    :return:
+    """
+    value = str(value).strip()
+    dte_value = get_date_format_sniffer("validate_date").parse(value)
 
     if dte_value is None:
         raise ValueError(
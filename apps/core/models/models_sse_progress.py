@@ -166,7 +166,13 @@ class SSEProgress(models.Model):
     def estimated_remaining_time(self):
         """Estime le temps restant en secondes"""
         if self.processed_items == 0 or self.duration == 0:
-            return None
+            # Estimation de l'ordonnanceur d'import, avant le premier élément traité
+            estimated_seconds = (self.metadata or {}).get("estimated_seconds")
+
+            if estimated_seconds is None:
+                return None
+
+            return max(int(estimated_seconds - self.duration), 0)
 
         remaining_items = self.total_items - self.processed_items
         if remaining_items <= 0:
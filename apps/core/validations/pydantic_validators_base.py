@@ -16,8 +16,20 @@ from decimal import Decimal
 
 from pydantic import BaseModel, validator
 
+from apps.core.functions.functions_dates import get_date_format_sniffer
 from apps.core.functions.functions_utilitaires import get_decimal, get_zero_decimal
 
+# Formats de dates essayés, dans l'ordre, par ValidateFieldsBase.input_format_date
+INPUT_FORMAT_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d.%m.%Y",
+    "%Y.%m.%d",
+    "%d-%m-%Y",
+    "%Y%m%d",
+    "%d/%m/%y",
+)
+
 # print(field.name, field.type_, type(field), dir(field.type_))
 
 
@@ -79,47 +91,12 @@ class ValidateFieldsBase(BaseModel):
         if hasattr(field.type_, "day") and isinstance(value, (str,)):
             value = str(value).strip()
 
-            try:
-                value = datetime.datetime.strptime(value, "%Y-%m-%d")
-                return value
-            except ValueError:
-                pass
-
-            try:
-                value = datetime.datetime.strptime(value, "%d/%m/%Y")
-                return value
-            except ValueError:
-                pass
-
-            try:
-                value = datetime.datetime.strptime(value, "%d.%m.%Y")
-                return value
-            except ValueError:
-                pass
+            dte_value = get_date_format_sniffer(
+                (cls, field.name), INPUT_FORMAT_DATE_FORMATS
+            ).parse(value)
 
-            try:
-                value = datetime.datetime.strptime(value, "%Y.%m.%d")
-                return value
-            except ValueError:
-                pass
-
-            try:
-                value = datetime.datetime.strptime(value, "%d-%m-%Y")
-                return value
-            except ValueError:
-                pass
-
-            try:
-                value = datetime.datetime.strptime(value, "%Y%m%d")
-                return value
-            except ValueError:
-                pass
-
-            try:
-                value = datetime.datetime.strptime(value, "%d/%m/%y")
-                return value
-            except ValueError:
-                pass
+            if dte_value is not None:
+                return dte_value
 
         return value
 
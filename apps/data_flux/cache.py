@@ -1,42 +1,263 @@
+# pylint: disable=E0401,W0703,W1203,C0415
+"""
+FR : Module de cache à deux niveaux, LRU en mémoire avec TTL et cache partagé redis optionnel
+EN : Two-tier cache module, in-process LRU with TTL and optional shared redis cache
+
+Commentaire:
+    Chaque registre de cache a un numéro de version dans le cache partagé, inclus dans les
+    clés. L'invalidation incrémente cette version, les autres process (web, workers celery)
+    ignorent alors leurs valeurs locales et partagées au prochain accès.
+    La version est gardée en mémoire quelques secondes (version_ttl), pour ne pas interroger
+    le cache partagé à chaque lecture. Une invalidation est donc vue immédiatement par le process
+    qui l'a faite, et au plus tard après version_ttl secondes par les autres process.
+    Si redis n'est pas disponible, le cache partagé est un faux redis en mémoire (LocalSharedCache),
+    utilisable aussi pour les tests.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from typing import Any, AnyStr, Callable, Dict
+from collections import OrderedDict
+import json
+import threading
+import time
+
+from heron.loggers import LOGGER_IMPORT
 from apps.core.functions.functions_setups import settings
 
+# Noms des registres de cache, invalidés par les signaux de apps.edi.signals
+SUPPLIERS_CACHE_NAME = "edi_suppliers"
+FLOWS_COLUMNS_CACHE_NAME = "flows_columns"
+FLOWS_REGISTRY_CACHE_NAME = "flows_registry"
 
-class CacheRegistry:
-    """Registry de cache"""
+# Registres de cache par nom
+CACHE_REGISTRIES_DICT = {}
+
+# Cache partagé du process : client redis ou LocalSharedCache
+SHARED_CACHE_DICT = {}
+
+
+class LocalSharedCache:
+    """Faux client redis en mémoire, avec les seules méthodes utilisées par CacheRegistry"""
 
     def __init__(self):
+        self.values_dict = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: AnyStr):
+        """Renvoie la valeur en bytes, comme redis, ou None si absente ou expirée"""
+        with self.lock:
+            value, expire_at = self.values_dict.get(name, (None, None))
+
+            if expire_at is not None and expire_at < time.monotonic():
+                del self.values_dict[name]
+                return None
+
+            return value
+
+    def set(self, name: AnyStr, value: Any, ex: int = None):
+        """Enregistre la valeur, avec une durée de vie en secondes optionnelle"""
+        if not isinstance(value, bytes):
+            value = str(value).encode()
+
+        with self.lock:
+            self.values_dict[name] = (value, None if ex is None else time.monotonic() + ex)
+
+    def incr(self, name: AnyStr) -> int:
+        """Incrémente la valeur entière de la clé"""
+        with self.lock:
+            value, expire_at = self.values_dict.get(name, (b"0", None))
+            value = int(value) + 1
+            self.values_dict[name] = (str(value).encode(), expire_at)
+
+        return value
+
+    def delete(self, *names):
+        """Supprime les clés"""
+        with self.lock:
+            for name in names:
+                self.values_dict.pop(name, None)
+
+
+def get_shared_cache():
+    """Renvoie le cache partagé du process, le client redis est créé à la première demande
+    et remplacé par LocalSharedCache si redis n'est pas installé ou pas joignable
+    """
+    shared_cache = SHARED_CACHE_DICT.get("shared")
+
+    if shared_cache is None:
+        try:
+            import redis
+
+            shared_cache = redis.StrictRedis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                socket_connect_timeout=1,
+            )
+            shared_cache.ping()
+
+        except Exception as error:
+            LOGGER_IMPORT.warning(f"Cache redis indisponible, cache partagé local : {error!r}")
+            shared_cache = LocalSharedCache()
+
+        SHARED_CACHE_DICT["shared"] = shared_cache
+
+    return shared_cache
+
+
+class CacheRegistry:
+    """Registre de cache à deux niveaux : LRU en mémoire avec TTL, puis cache partagé"""
+
+    def __init__(
+        self, name: AnyStr, maxsize: int = 256, ttl: int = 300, version_ttl: int = 5, shared=None
+    ):
+        """
+        :param name: nom du registre, préfixe des clés du cache partagé
+        :param maxsize: nombre maximum de valeurs en mémoire
+        :param ttl: durée de vie des valeurs en secondes
+        :param version_ttl: durée en secondes pendant laquelle la version n'est pas relue
+                            dans le cache partagé
+        :param shared: cache partagé (client redis, LocalSharedCache),
+                       par défaut celui du process
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self._shared = shared
+        self.local_dict = OrderedDict()
+        self.version_dict = {"version": None, "expire_at": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """Cache partagé du registre"""
+        if self._shared is None:
+            self._shared = get_shared_cache()
+
+        return self._shared
+
+    def set_local_version(self, version: AnyStr):
+        """Garde la version en mémoire pendant version_ttl secondes"""
+        with self.lock:
+            self.version_dict["version"] = version
+            self.version_dict["expire_at"] = time.monotonic() + self.version_ttl
+
+    def get_version(self) -> AnyStr:
+        """Renvoie la version courante du registre, relue dans le cache partagé
+        au plus toutes les version_ttl secondes
         """
-        Instancie le cache registry, si redis n'est pas importé ni activé,
-        alors on cache dans un registry
+        with self.lock:
+            if (
+                self.version_dict.get("version") is not None
+                and self.version_dict.get("expire_at") >= time.monotonic()
+            ):
+                return self.version_dict.get("version")
+
+        try:
+            version = self.shared.get(f"{self.name}:version")
+        except Exception as error:
+            LOGGER_IMPORT.warning(f"CacheRegistry.get_version {self.name!r} : {error!r}")
+            return "0"
+
+        version = version.decode() if version else "0"
+        self.set_local_version(version)
+
+        return version
+
+    def get(self, key: AnyStr, default: Any = None) -> Any:
+        """Renvoie la valeur en mémoire, sinon dans le cache partagé
+        :param key: clé de la valeur
+        :param default: valeur renvoyée si la clé n'est pas en cache
         """
-        self.registry = dict()
+        version = self.get_version()
+
+        with self.lock:
+            value_version, expire_at, value = self.local_dict.get(key, (None, 0, None))
+
+            if value_version == version and expire_at >= time.monotonic():
+                self.local_dict.move_to_end(key)
+                return value
 
         try:
-            import redis
+            shared_value = self.shared.get(f"{self.name}:{version}:{key}")
+        except Exception as error:
+            LOGGER_IMPORT.warning(f"CacheRegistry.get {self.name!r} : {error!r}")
+            shared_value = None
+
+        if shared_value is None:
+            return default
+
+        value = json.loads(shared_value)
+        self.set_local(key, value, version)
+
+        return value
+
+    def set_local(self, key: AnyStr, value: Any, version: AnyStr):
+        """Enregistre la valeur en mémoire, en supprimant les plus anciennes au-delà de maxsize"""
+        with self.lock:
+            self.local_dict[key] = (version, time.monotonic() + self.ttl, value)
+            self.local_dict.move_to_end(key)
+
+            while len(self.local_dict) > self.maxsize:
+                self.local_dict.popitem(last=False)
+
+    def set(self, key: AnyStr, value: Any):
+        """Enregistre la valeur (sérialisable en json) en mémoire et dans le cache partagé
+        :param key: clé de la valeur
+        :param value: valeur
+        """
+        version = self.get_version()
+        self.set_local(key, value, version)
+
+        try:
+            self.shared.set(f"{self.name}:{version}:{key}", json.dumps(value), ex=self.ttl)
+        except Exception as error:
+            LOGGER_IMPORT.warning(f"CacheRegistry.set {self.name!r} : {error!r}")
+
+    def get_or_set(self, key: AnyStr, function: Callable) -> Any:
+        """Renvoie la valeur en cache, sinon la calcule par function() et la met en cache
+        :param key: clé de la valeur
+        :param function: fonction sans argument de calcul de la valeur
+        """
+        missing = object()
+        value = self.get(key, missing)
+
+        if value is missing:
+            value = function()
+            self.set(key, value)
+
+        return value
+
+    def invalidate(self):
+        """Invalide toutes les valeurs du registre, dans tous les process,
+        les autres process voyant la nouvelle version au plus tard après version_ttl secondes
+        """
+        with self.lock:
+            self.local_dict.clear()
+            self.version_dict["version"] = None
+
+        try:
+            version = self.shared.incr(f"{self.name}:version")
+        except Exception as error:
+            LOGGER_IMPORT.warning(f"CacheRegistry.invalidate {self.name!r} : {error!r}")
+            return
+
+        self.set_local_version(str(version))
+
+
+def get_cache_registry(name: AnyStr, **kwargs: Dict) -> CacheRegistry:
+    """Renvoie le registre de cache du nom demandé, créé au premier appel
+    :param name: nom du registre
+    :param kwargs: paramètres de création du registre (maxsize, ttl, version_ttl, shared)
+    """
+    cache_registry = CACHE_REGISTRIES_DICT.get(name)
+
+    if cache_registry is None:
+        cache_registry = CACHE_REGISTRIES_DICT[name] = CacheRegistry(name, **kwargs)
 
-            try:
-                self.registry = redis.StrictRedis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    password=settings.REDIS_PASSWORD,
-                )
-            except redis.exceptions.ConnectionError:
-                raise ModuleNotFoundError
-
-        except ModuleNotFoundError:
-            print("ModuleNotFoundError")
-
-    def get(self, name):
-        if isinstance(self.registry, (dict,)):
-            return self.registry.get(name).encode()
-        else:
-            self.registry.get(name)
-
-    def set(self, name, value):
-        if isinstance(self.registry, (dict,)):
-            self.registry[name] = value
-        else:
-            self.registry.set(name, value)
-
-    def add_error(self, error):
-        ...
+    return cache_registry
@@ -57,6 +57,10 @@ class ValidationError(Exception):
     """Gestion d'erreur de validation"""
 
 
+class ValidationAbortError(ValidationError):
+    """Arrêt du générateur de validation en erreur, pour annuler le COPY qui le consomme"""
+
+
 class ValidationFormError(Exception):
     """Exception du module de Validation"""
 
@@ -9,6 +9,8 @@ Ces flux renvoient des modes de consommation du flux, tels que :
 
 Flux implémentés :
     FileLoader
+    FileStreamLoader : FileLoader lisant le fichier depuis le disque, sans le charger en mémoire
+    RowParserLoader : FileLoader dont les lignes sont renvoyées par un parser de lignes
 
 Flux à Implémenter :
     ApiJsonLoader
@@ -24,16 +26,21 @@ Commentaire:
 created at: 2021-10-30
 created by: Paulo ALVES
 
-modified at: 2021-10-30
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 import io
-import uuid
 from typing import Dict, Any
 import csv
+from itertools import islice
 from operator import itemgetter
 
-from .utilities import excel_file_to_csv_string_io, file_to_csv_string_io
+from .utilities import (
+    excel_file_to_csv_string_io,
+    file_to_csv_string_io,
+    excel_file_to_csv_temp_file,
+    file_to_csv_stream,
+)
 from .exceptions import (
     IterFileToInsertError,
     GetAddDictError,
@@ -42,7 +49,7 @@ from .exceptions import (
     ExcelToCsvFileError,
     CsvFileToStringIoError,
 )
-from .models import Line, Error
+from .trace import get_trace_buffer, flush_trace_buffer
 from .opto_33_parser import EdiOpoto33Parser
 
 
@@ -115,31 +122,16 @@ class TemplateDataLoader:
         self, insertion_type: str = "Unknown", num_line: int = None, designation: str = None,
             error_dict=None
     ):
-        """Ajoute d'une ligne sur la trace"""
+        """
+        Ajoute d'une ligne sur la trace, dans le tampon de la trace qui sera enregistré
+        par la sauvegarde de la trace de validation ou à la sortie du context manager
+        """
         if error_dict is None:
             error_dict = {}
 
-        insertion_dict = {
-            "Create": "cette ligne à bien été créée",
-            "Update": "cette ligne à bien été modifiée",
-            "Errors": "Cette ligne à généré une erreur",
-            "Passed": "Cette ligne n'a pas été traitée",
-            "Unknown": "Cette ligne n'a pas été traitée",
-        }
-        uuid_line_identification = uuid.uuid4()
-        line = Line.objects.create(
-            **{
-                "uuid_identification": uuid_line_identification,
-                "trace": self.trace,
-                "insertion_type": insertion_type,
-                "num_line": num_line,
-                "designation": designation or insertion_dict.get(insertion_type),
-            }
-        )
-        line.save()
-
-        error = Error.objects.create(**{**{"line": line}, **error_dict})
-        error.save()
+        trace_buffer = get_trace_buffer(self.trace)
+        line = trace_buffer.add_line(insertion_type, num_line, designation)
+        trace_buffer.add_errors(line, [error_dict])
 
     def __exit__(self, tipe, value, traceback):
         """Post context manager, pour fermer la source de données
@@ -147,7 +139,114 @@ class TemplateDataLoader:
         :param value:     Valeur venant de la sortie de la classe
         :param traceback: Traceback sur une éventuele exception de la sortie de la classe
         """
-        self.close()
+        try:
+            if self.trace:
+                flush_trace_buffer(self.trace)
+        finally:
+            self.close()
+
+
+class RowPlan:
+    """
+    Plan de lecture des lignes d'un flux, compilé une seule fois à l'ouverture :
+        - projection des colonnes par itemgetter
+        - valeurs d'exclusion des lignes (exclude_rows_dict) déjà normalisées
+        - valeurs constantes de add_fields_dict déjà calculées, seules les fonctions
+          (tuple (fonction, kwargs)) sont appelées à chaque ligne
+    """
+
+    def __init__(self, postion_list, columns_list, params_dict: Dict):
+        """
+        :param postion_list: Positions des colonnes à récupérer dans les lignes du flux
+        :param columns_list: Noms des colonnes à récupérer
+        :param params_dict:  Paramètres du loader
+        """
+        self.projection = itemgetter(*postion_list)
+        self.columns_list = columns_list
+        self.delimiter = params_dict.get("delimiter", ";")
+        self.exclusions = [
+            (index - 1, str(value).strip().upper())
+            for index, value in params_dict.get("exclude_rows_dict", {}).items()
+        ]
+        add_fields_dict = params_dict.get("add_fields_dict", {}) or {}
+        self.add_fields = bool(add_fields_dict)
+        self.add_keys = list(add_fields_dict)
+        self.add_constants_dict = {
+            key: value for key, value in add_fields_dict.items() if not isinstance(value, (tuple,))
+        }
+        self.add_functions = [
+            (key, value[0], value[1])
+            for key, value in add_fields_dict.items()
+            if isinstance(value, (tuple,))
+        ]
+        self.add_constants_list = [self.add_constants_dict.get(key) for key in self.add_keys]
+
+    def is_excluded(self, line, all_lines: bool = False):
+        """
+        :param line:        Ligne du flux
+        :param all_lines:   Si False les lignes vides sont exclues
+        :return: True si la ligne ne doit pas être renvoyée
+        """
+        if not all_lines and not any(line):
+            return True
+
+        for position, value in self.exclusions:
+            if value in str(line[position]).strip().upper():
+                return True
+
+        return False
+
+    def get_add_dict(self):
+        """
+        :return: Dictionnaire des noms d'attributs et valeurs à ajouter à la vollée
+        """
+        if not self.add_functions:
+            return self.add_constants_dict
+
+        add_dict = dict(self.add_constants_dict)
+        add_dict.update(
+            (key, function(**kwargs)) for key, function, kwargs in self.add_functions
+        )
+
+        return {key: add_dict[key] for key in self.add_keys}
+
+    def get_add_values(self):
+        """
+        :return: Liste des valeurs à ajouter à la vollée
+        """
+        if not self.add_functions:
+            return self.add_constants_list
+
+        add_dict = self.get_add_dict()
+
+        return [add_dict[key] for key in self.add_keys]
+
+    def get_list(self, line):
+        """
+        :param line: Ligne du flux
+        :return: Liste des valeurs de la ligne à renvoyer
+        """
+        if self.add_fields:
+            return list(self.projection(line)) + self.get_add_values()
+
+        return list(self.projection(line))
+
+    def get_dict(self, line):
+        """
+        :param line: Ligne du flux
+        :return: Dictionnaire des valeurs de la ligne à renvoyer
+        """
+        if self.add_fields:
+            return {**dict(zip(self.columns_list, self.projection(line))), **self.get_add_dict()}
+
+        return dict(zip(self.columns_list, self.projection(line)))
+
+    def get_csv(self, line):
+        """
+        :param line: Ligne du flux
+        :return: Ligne au format csv à renvoyer
+        """
+        return self.delimiter.join([f'"{str(value)}"' for value in self.get_list(line)])
 
 
 class FileLoader(TemplateDataLoader):
@@ -215,19 +314,24 @@ class FileLoader(TemplateDataLoader):
         self.csv_io = io.StringIO()
         self._set_io()
         self.csv_io.seek(0)
+        self._set_first_line(first_line)
+        self._get_csv_reader()
+
+    def open(self, flux_params_dict: Dict = None):
+        """Surcharge de la méthode open, mais nous n'en avons pas besoins"""
+
+    def _set_first_line(self, first_line: int):
+        """
+        Pour connaître la position (seek) à partir de laquelle récupérer les lignes du fichier
+        :param first_line: Première ligne du flux de données commence à 1
+        """
         self.first_line = 0
 
-        # Pour connaître la position (seek) à partir de laquelle récupérer les lignes du fichier
         for i, line in enumerate(self.csv_io):
             if i == (first_line - 1):
                 break
             self.first_line += len(line)
 
-        self._get_csv_reader()
-
-    def open(self, flux_params_dict: Dict = None):
-        """Surcharge de la méthode open, mais nous n'en avons pas besoins"""
-
     def _set_io(self):
         """
         Ecriture des données brutes dans le fichier self.csv_io de type io.StringIO de l'instance.
@@ -409,6 +513,42 @@ class FileLoader(TemplateDataLoader):
         ]
         return add_list
 
+    def get_row_plan(self):
+        """
+        Compile le plan de lecture des lignes, après lecture de l'entête
+        :return: RowPlan
+        """
+        postion_list = self.get_header()
+
+        try:
+            row_plan = RowPlan(postion_list, list(self.columns_dict), self.params_dict)
+        except IndexError as except_error:
+            comment = "La méthode get_add_dict a besoins d'un tuple de 2 élements"
+            if self.trace:
+                self.trace.errors = True
+                self.trace.comment = comment
+                self.trace.save()
+            raise GetAddDictError(comment) from except_error
+
+        return row_plan
+
+    def trace_line_not_conform(self, num_line: int, line):
+        """
+        Trace la ligne qui n'a pas le même nombre de colonnes que les autres
+        :param num_line:    N° de la ligne
+        :param line:        Ligne du flux
+        """
+        if self.trace:
+            error_dict = {
+                "attr_name": "",
+                "message": (
+                    "La ligne ne contient pas le même nombre de colonne que les autres"
+                ),
+                "data_expected": "",
+                "data_received": ";".join(line)
+            }
+            self.trace_add_line_error("Errors", num_line, error_dict=error_dict)
+
     def read(self, all_lines=False):
         """
         Méthode de lecture du flux de donées au format io.StringIO
@@ -416,42 +556,18 @@ class FileLoader(TemplateDataLoader):
                             all_lines = False -> shorcut l'itération des lignes vides
                             all_lines = True -> iterre même sur des lignes vides
         """
-        postion_list = self.get_header()
+        row_plan = self.get_row_plan()
 
         # on renvoie pour chaque ligne du fichier les données au format csv
         for i, line in enumerate(self.csv_reader, 1):
-            if (not any(line) and not all_lines) or any(
-                str(value).strip().upper() in str(line[index - 1]).strip().upper()
-                for index, value in self.params_dict.get("exclude_rows_dict", {}).items()
-            ):
+            if row_plan.is_excluded(line, all_lines):
                 continue
 
             try:
-                if self.params_dict.get("add_fields_dict", {}):
-
-                    yield f'{self.params_dict.get("delimiter", ";")}'.join(
-                        [
-                            f'"{str(value)}"'
-                            for value in list(itemgetter(*postion_list)(line)) + self.get_add_values
-                        ]
-                    )
-                else:
-                    yield f'{self.params_dict.get("delimiter", ";")}'.join(
-                        [f'"{str(value)}"' for value in itemgetter(*postion_list)(line)]
-                    )
+                yield row_plan.get_csv(line)
 
             except IndexError:
-                if self.trace:
-                    error_dict = {
-                        "attr_name": "",
-                        "message": (
-                            "La ligne ne contient pas le même nombre de colonne que les autres"
-                        ),
-                        "data_expected": "",
-                        "data_received": ";".join(line)
-                    }
-                    self.trace_add_line_error("Errors", i, error_dict=error_dict)
-
+                self.trace_line_not_conform(i, line)
                 raise IterFileToInsertError("Le fichier contient une ligne non conforme")
 
     def make_io(self, csv_io: io.StringIO, all_lines=False):
@@ -474,35 +590,18 @@ class FileLoader(TemplateDataLoader):
                             all_lines = False -> shorcut l'itération des lignes vides
                             all_lines = True -> iterre même sur des lignes vides
         """
-        postion_list = self.get_header()
+        row_plan = self.get_row_plan()
 
         # on renvoie pour chaque ligne du fichier les données dans un tableau, une liste
         for i, line in enumerate(self.csv_reader, 1):
-            if (not any(line) and not all_lines) or any(
-                str(value).strip().upper() in str(line[index - 1]).strip().upper()
-                for index, value in self.params_dict.get("exclude_rows_dict", {}).items()
-            ):
+            if row_plan.is_excluded(line, all_lines):
                 continue
 
             try:
-
-                if self.params_dict.get("add_fields_dict", {}):
-                    yield list(itemgetter(*postion_list)(line)) + self.get_add_values
-                else:
-                    yield list(itemgetter(*postion_list)(line))
+                yield row_plan.get_list(line)
 
             except IndexError:
-                if self.trace:
-                    error_dict = {
-                        "attr_name": "",
-                        "message": (
-                            "La ligne ne contient pas le même nombre de colonne que les autres"
-                        ),
-                        "data_expected": "",
-                        "data_received": ";".join(line)
-                    }
-                    self.trace_add_line_error("Errors", i, error_dict=error_dict)
-
+                self.trace_line_not_conform(i, line)
                 raise IterFileToInsertError("Le fichier contient une ligne non conforme")
 
     def read_dict(self, all_lines=False):
@@ -513,38 +612,18 @@ class FileLoader(TemplateDataLoader):
                             all_lines=True, iterre même sur des lignes vides
         :return: Générateur des lignes du fichier retraitées sous forme de dictionnaire key: value
         """
-        postion_list = self.get_header()
+        row_plan = self.get_row_plan()
 
         # on renvoie pour chaque ligne du fichier le dictionnaire de données
         for i, line in enumerate(self.csv_reader, 1):
-            if (not any(line) and not all_lines) or any(
-                str(value).strip().upper() in str(line[index - 1]).strip().upper()
-                for index, value in self.params_dict.get("exclude_rows_dict", {}).items()
-            ):
+            if row_plan.is_excluded(line, all_lines):
                 continue
 
             try:
-
-                if self.params_dict.get("add_fields_dict", {}):
-                    yield {
-                        **dict(zip(list(self.columns_dict), itemgetter(*postion_list)(line))),
-                        **self.get_add_dict,
-                    }
-                else:
-                    yield dict(zip(list(self.columns_dict), itemgetter(*postion_list)(line)))
+                yield row_plan.get_dict(line)
 
             except IndexError:
-                if self.trace:
-                    error_dict = {
-                        "attr_name": "",
-                        "message": (
-                            "La ligne ne contient pas le même nombre de colonne que les autres"
-                        ),
-                        "data_expected": "",
-                        "data_received": ";".join(line)
-                    }
-                    self.trace_add_line_error("Errors", i, error_dict=error_dict)
-
+                self.trace_line_not_conform(i, line)
                 raise IterFileToInsertError("Le fichier contient une ligne non conforme")
 
     def close(self):
@@ -557,6 +636,135 @@ class FileLoader(TemplateDataLoader):
             pass
 
 
+class FileStreamLoader(FileLoader):
+    """
+    FileLoader en mode streaming : le fichier source est lu par morceaux directement depuis le
+    disque, sans être copié dans un io.StringIO. Les fichiers Excel sont transformés en csv dans
+    un fichier temporaire. La mémoire utilisée par read(), read_list() et read_dict() ne dépend
+    donc plus de la taille du fichier.
+    """
+
+    def _set_first_line(self, first_line: int):
+        """
+        Saute les lignes avant first_line une à une et garde la position (tell) du fichier,
+        seul un readline permettant un tell() sur un fichier texte
+        :param first_line: Première ligne du flux de données commence à 1
+        """
+        for _ in range(first_line - 1):
+            if not self.csv_io.readline():
+                break
+
+        self.first_line = self.csv_io.tell()
+
+    def _set_io(self):
+        """
+        Ouverture du fichier source dans self.csv_io, sans le lire.
+        Il y aura un prétraitement si le fichier envoyé est un fichier Excel
+        """
+        # On remplace le io.StringIO créé par FileLoader.__init__
+        self.csv_io.close()
+
+        try:
+            if str(self.source.suffix).lower() in {".xls", ".xlsx"}:
+                self.csv_io = excel_file_to_csv_temp_file(self.source)
+            else:
+                self.csv_io = file_to_csv_stream(self.source, self.params_dict.get("encoding"))
+
+        except (ExcelToCsvFileError, OSError) as except_error:
+            comment = (
+                f"une erreur dans la transformation du fichier {self.source.name!r} "
+                "excel en csv"
+            )
+
+            if self.trace:
+                self.trace.errors = True
+                self.trace.comment = comment
+                self.trace.save()
+            raise ExcelToCsvError(comment) from except_error
+
+        except CsvFileToStringIoError as except_error:
+            comment = f"une erreur à l'ouverture du fichier {self.source.name!r} en csv"
+
+            if self.trace:
+                self.trace.errors = True
+                self.trace.comment = comment
+                self.trace.save()
+            raise FileToCsvError(comment) from except_error
+
+
+class RowParserLoader(FileLoader):
+    """
+    FileLoader dont les lignes sont renvoyées par le parser de lignes params_dict["row_parser"],
+    directement depuis le fichier source, sans réécriture du fichier en csv.
+    Le row_parser est un générateur appelé avec (source, params_dict), qui renvoie les lignes
+    du fichier sous forme de listes, comme le ferait un csv.reader. Il n'est parcouru qu'une
+    seule fois : les premières lignes lues (contrôle des colonnes, entête) sont gardées
+    en mémoire et rejouées à chaque _get_csv_reader, avant la suite du même générateur.
+    """
+
+    # Nombre de lignes gardées pour être rejouées, l'entête et le contrôle n'en lisent qu'une
+    head_rows_size = 10
+
+    def _set_io(self):
+        """Le parser de lignes lit lui même le fichier source"""
+        row_parser = self.params_dict.get("row_parser")
+        self.parser_rows = None
+        self.head_rows = []
+
+        if row_parser is None:
+            comment = f"il n'y a pas de parser de lignes pour le fichier {self.source.name!r}"
+
+            if self.trace:
+                self.trace.errors = True
+                self.trace.comment = comment
+                self.trace.save()
+            raise FileToCsvError(comment)
+
+        self.parser_rows = row_parser(self.source, self.params_dict)
+        self.rows = self.parser_rows
+        self.rows_replayable = True
+
+    def _set_first_line(self, first_line: int):
+        """
+        Les lignes avant first_line sont sautées directement dans le générateur
+        :param first_line: Première ligne du flux de données commence à 1
+        """
+        self.first_line = first_line
+        self.rows = islice(self.parser_rows, first_line - 1, None)
+
+    def _iter_rows(self):
+        """Lignes déjà lues rejouées, puis suite du générateur du parser de lignes"""
+        yield from self.head_rows[:]
+
+        for row in self.rows:
+            if self.rows_replayable and len(self.head_rows) < self.head_rows_size:
+                self.head_rows.append(row)
+            else:
+                self.rows_replayable = False
+
+            yield row
+
+    def _get_csv_reader(self):
+        """
+        Le parser de lignes étant un générateur, on rejoue les lignes déjà lues,
+        afin de pouvoir faire des opérations comme next() dessus.
+        """
+        if not self.rows_replayable:
+            raise IterFileToInsertError(
+                f"Le fichier {self.source.name!r} a déjà été lu par le parser de lignes"
+            )
+
+        self.csv_reader = self._iter_rows()
+
+    def close(self):
+        """Fermeture du générateur de lignes et du buffer io.StringIO"""
+        if getattr(self, "parser_rows", None) is not None and hasattr(self.parser_rows, "close"):
+            self.parser_rows.close()
+
+        self.parser_rows = None
+        super().close()
+
+
 class Opto33Loader(TemplateDataLoader):
     """
     Opto33Loader pour importer un fichier opto33 et le cleanner en vue d'une insertion en base
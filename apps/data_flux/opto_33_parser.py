@@ -15,9 +15,9 @@ modified by: Paulo ALVES
 import io
 import re
 from datetime import datetime
-from typing import AnyStr, Callable, Generator
+from types import MappingProxyType
+from typing import AnyStr, Callable, Generator, Iterable
 from pathlib import Path
-from copy import deepcopy
 
 # --------------------------------------------------------------------------------------------------
 # import os
@@ -44,6 +44,17 @@ from apps.data_flux.exceptions import (
     PathFileError,
 )
 
+# Caractères de service EDIFACT par défaut, redéfinissables par le segment UNA :
+# séparateur de composants, séparateur d'éléments, décimale, caractère d'échappement,
+# réservé, fin de segment
+EDI_SERVICE_CHARS = ":+.? '"
+
+# Taille des morceaux du fichier lus par le tokenizer
+EDI_CHUNK_SIZE = 64 * 1024
+
+# Taille de la fin du fichier lue pour y trouver le pied de page UNZ
+EDI_FOOTER_SIZE = 4 * 1024
+
 INVOICE_DICT = {
     "supplier": "",
     "supplier_ident": "",
@@ -511,6 +522,133 @@ class EDIQualifierParser:
         return {"document_id": doc_id, "financial_documents_count": count}
 
 
+class EdiSegmentTokenizer:
+    """
+    Tokenizer des segments EDIFACT, en une seule passe sur le fichier lu par morceaux.
+    Chaque segment est renvoyé sous forme de liste d'éléments, chaque élément étant la liste de ses
+    composants, le caractère d'échappement (?) étant retiré devant les caractères qu'il protège.
+    Les fins de lignes sont aussi des fins de segments, comme pour les fichiers sans "'".
+    """
+
+    def __init__(self, file: io.TextIOBase, chunk_size: int = EDI_CHUNK_SIZE):
+        """
+        :param file:        Fichier texte ouvert en lecture
+        :param chunk_size:  Taille des morceaux lus
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.component_separator = ""
+        self.element_separator = ""
+        self.release_character = ""
+        self.segment_pattern = None
+        self.set_service_chars(EDI_SERVICE_CHARS)
+
+    def set_service_chars(self, service_chars: AnyStr) -> None:
+        """
+        Initialise les séparateurs à partir des caractères de service (segment UNA)
+        :param service_chars: Les 6 caractères de service
+        """
+        component, element, _, release, _, terminator = service_chars
+        self.component_separator = component
+        self.element_separator = element
+        self.release_character = release.strip()
+        terminators = re.escape(terminator) + r"\r\n"
+
+        if self.release_character:
+            escaped_release = re.escape(self.release_character)
+            self.segment_pattern = re.compile(
+                rf"((?:{escaped_release}.|[^{escaped_release}{terminators}])*)[{terminators}]",
+                re.S,
+            )
+        else:
+            self.segment_pattern = re.compile(rf"([^{terminators}]*)[{terminators}]")
+
+    def split_segment(self, segment: AnyStr) -> list:
+        """
+        Découpe le segment en éléments et composants
+        :param segment: Texte du segment, sans la fin de segment
+        :return: [[composant, ...], ...]
+        """
+        component_separator = self.component_separator
+        element_separator = self.element_separator
+        release_character = self.release_character
+
+        if not release_character or release_character not in segment:
+            return [
+                element.split(component_separator) for element in segment.split(element_separator)
+            ]
+
+        elements, components, value = [], [], []
+        escaped = False
+
+        for char in segment:
+            if escaped:
+                value.append(char)
+                escaped = False
+            elif char == release_character:
+                escaped = True
+            elif char == component_separator:
+                components.append("".join(value))
+                value = []
+            elif char == element_separator:
+                components.append("".join(value))
+                elements.append(components)
+                components, value = [], []
+            else:
+                value.append(char)
+
+        components.append("".join(value))
+        elements.append(components)
+
+        return elements
+
+    def __iter__(self) -> Generator:
+        """
+        Générateur des segments du fichier
+        :return: [[composant, ...], ...]
+        """
+        carry = ""
+        service_checked = False
+
+        while True:
+            chunk = self.file.read(self.chunk_size)
+            text = carry + chunk
+
+            if not service_checked:
+                text = text.lstrip()
+
+                if chunk and len(text) < 9:
+                    carry = text
+                    continue
+
+                if text[:3] == "UNA":
+                    self.set_service_chars(text[3:9])
+                    text = text[9:]
+
+                service_checked = True
+
+            match = self.segment_pattern.match
+            position = 0
+            segment_match = match(text, position)
+
+            while segment_match:
+                position = segment_match.end()
+                segment = segment_match.group(1)
+
+                if segment:
+                    yield self.split_segment(segment)
+
+                segment_match = match(text, position)
+
+            carry = text[position:]
+
+            if not chunk:
+                break
+
+        if carry.strip():
+            yield self.split_segment(carry.strip())
+
+
 class EdiOpoto33Parser:
     """Parser des fichiers de type EDI optique Opto33"""
 
@@ -542,18 +680,61 @@ class EdiOpoto33Parser:
         self.document = {}
 
     @staticmethod
-    def extract_entries(lines: str) -> Generator:
+    def flatten_segment(segment: list) -> list:
+        """
+        Aplatit les éléments et composants du segment, à la suite du qualifier
+            :param segment: [[qualifier], [composant, ...], ...]
+            :return: [qualifier, composant, ...]
+        """
+        return [component for element in segment for component in element]
+
+    def get_segments(self, encoding: AnyStr) -> Generator:
+        """
+        Générateur des segments du fichier EDI opto 33, lu par morceaux
+            :param encoding: encoding du fichier
+            :return: [[qualifier], [composant, ...], ...]
+        """
+        with open(self.edi_file, encoding=encoding) as file:
+            yield from EdiSegmentTokenizer(file)
+
+    def get_header(self, encoding: AnyStr) -> tuple:
+        """
+        Entête UNB du fichier
+            :param encoding: encoding du fichier
+            :return: ("UNB", [élément, ...])
+        """
+        for segment in self.get_segments(encoding):
+            if segment[0][0] == "UNB":
+                return "UNB", [":".join(element) for element in segment[1:]]
+
+            if segment[0][0] == "UNH":
+                break
+
+        raise OptoParserError(
+            f"Impossible d'extraire les données de l'entête du fichier : {self.edi_file.name!r}"
+        )
+
+    def get_footer(self, encoding: AnyStr) -> tuple:
         """
-        Générateur ligne à ligne du fichier EDI opto 33 (factures)
-            :param lines: lignes du fichier
-            :return: code_parser, ligne
+        Pied de page UNZ du fichier, lu dans les derniers octets du fichier
+            :param encoding: encoding du fichier
+            :return: ("UNZ", [élément, ...])
         """
-        for line in lines:
-            qualifier = line[:3]
-            data = re.split(r"(?<![?])\+", line[4:])
+        with open(self.edi_file, "rb") as file:
+            file.seek(0, io.SEEK_END)
+            file.seek(max(0, file.tell() - EDI_FOOTER_SIZE))
+            tail = file.read().decode(encoding, errors="replace")
+
+        position = tail.rfind("UNZ")
 
-            if qualifier:
-                yield qualifier, data
+        if position != -1:
+            for segment in EdiSegmentTokenizer(io.StringIO(tail[position:])):
+                return "UNZ", [":".join(element) for element in segment[1:]]
+
+        raise OptoParserError(
+            "Impossible d'extraire les données du pied de page du fichier :"
+            f" {self.edi_file.name!r}"
+        )
 
     def entete_resume_parser(self, elements: list, invoice_dict: dict, detail: str) -> None:
         """Extraction des éléments de l'entête et du résumé"""
@@ -571,9 +752,14 @@ class EdiOpoto33Parser:
                 f"Impossible de parser {detail}: " f"{str(elements)!r}"
             ) from except_error
 
-    def line_parser(self, articles: list, invoice_dict: dict, invoices_list: list) -> None:
-        """Extraction des éléments des lignes"""
-        invoice_detail_dict = deepcopy(invoice_dict)
+    def line_parser(self, articles: list, invoice_dict: MappingProxyType) -> Generator:
+        """
+        Extraction des éléments des lignes
+            :param articles: Lignes LIN de la facture
+            :param invoice_dict: Entête de la facture, partagée par toutes ses lignes
+            :return: générateur des dictionaires des lignes
+        """
+        invoice_detail_dict = dict(invoice_dict)
         bl_dict = {
             "delivery_number": None,
             "delivery_date": None,
@@ -642,29 +828,18 @@ class EdiOpoto33Parser:
                 invoice_detail_dict.update(article_dict)
                 invoice_detail_dict.update(bl_dict)
 
-                invoices_list.append(invoice_detail_dict)
-                invoice_detail_dict = deepcopy(invoice_dict)
+                yield invoice_detail_dict
+                invoice_detail_dict = dict(invoice_dict)
 
-    def extract_invoices(self, invoices: list) -> Generator:
+    def extract_invoices(self, encoding: AnyStr) -> Generator:
         """
-        Extraction des factures une à une
-            :param invoices: générator des factures une à une
+        Extraction des factures une à une, au fil de la lecture du fichier
+            :param encoding: encoding du fichier
             :return: générateur des dictionaire des éléments des factures
         """
         try:
-            invoices_list = []
-
-            for invoice in self.invoices(invoices):
-                try:
-                    entete, *articles, resume, _ = invoice
-
-                except ValueError as except_error:
-                    raise OptoQualifierError(
-                        f"Impossible de parser invoice en qualifier, entete, *articles, resume, _: "
-                        f"{str(invoice)!r}"
-                    ) from except_error
-
-                invoice_dict = deepcopy(INVOICE_DICT)
+            for entete, articles, resume in self.invoices(self.get_segments(encoding)):
+                invoice_dict = dict(INVOICE_DICT)
 
                 # Parser d'entête
                 self.entete_resume_parser(entete[1:], invoice_dict, "l'entête")
@@ -672,29 +847,53 @@ class EdiOpoto33Parser:
                 # Parser du résumé
                 self.entete_resume_parser(resume, invoice_dict, "le résumé")
 
-                # Paser des lignes
-                self.line_parser(articles, invoice_dict, invoices_list)
-
-            yield from invoices_list
+                # Paser des lignes, l'entête étant partagée en lecture seule
+                yield from self.line_parser(articles, MappingProxyType(invoice_dict))
 
         except (OptoLinesError, Exception) as except_error:
             raise OptoLinesError("Erreur dans l'extraction des factures") from except_error
 
-    @staticmethod
-    def invoices(lines: list) -> Generator:
-        """
-        Générateur des éléments des factures, factures par factures
-        :param lines: lignes des fichiers
-        """
-        for line in lines:
-            yield [
-                [
-                    re.split(r"(?<![?])\+|:", invoice_lines)
-                    for invoice_lines in re.split(r"(?<!\?)['|\n]", invoice)
-                    if invoice_lines
-                ]
-                for invoice in re.split(r"[\n|'](?=LIN)|[\n|'](?=UNS)|[\n|'](?=UNT)", line)
-            ]
+    def invoices(self, segments: Iterable) -> Generator:
+        """
+        Générateur des éléments des factures, factures par factures, en un seul passage
+        sur les segments : l'entête de UNH au premier LIN, les articles de chaque LIN au suivant,
+        le résumé de UNS à UNT
+        :param segments: segments du fichier
+        :return: (entête, articles, résumé)
+        """
+        entete, articles, resume = None, [], []
+        current = None
+
+        for segment in segments:
+            qualifier = segment[0][0]
+
+            if qualifier in {"UNH", "UNZ"} and entete is not None:
+                yield entete, articles, resume
+                entete = None
+
+            if qualifier == "UNH":
+                entete, articles, resume = [], [], []
+                current = entete
+
+            elif entete is None:
+                continue
+
+            elif qualifier == "LIN":
+                current = []
+                articles.append(current)
+
+            elif qualifier == "UNS":
+                current = resume
+
+            elif qualifier == "UNT":
+                yield entete, articles, resume
+                entete = None
+                continue
+
+            current.append(self.flatten_segment(segment))
+
+        if entete is not None:
+            yield entete, articles, resume
 
     def parse(self) -> dict:
         """
@@ -702,71 +901,56 @@ class EdiOpoto33Parser:
             :return: {"file_name": "", "edi_financial_documents": []}
         """
         encoding = encoding_detect(self.edi_file) or "ascii"
+        header = self.get_header(encoding)
+        footer = self.get_footer(encoding)
+        footer_parse = self.cmd_parser.cmd_footer(footer[1])
+        footer_count_invoices = footer_parse.get("financial_documents_count")
+
+        # ANNULATION DE LA VALIDATION CAR JULBO NE RESPECTE PAS ID INTERCHANGE
+        # On vérifie l'ID d'interchage
+        if str(header[1][4]).replace("'", "") != footer_parse.get("document_id").replace(
+            "'", ""
+        ):
+            # print(self.edi_file.name)
+            # print(header, footer_parse.get("document_id"))
+            raise OptoIdError(
+                rf"l'ID du fichier Edi '{self.edi_file.name}' en entête (UNB) "
+                r"et en pied de page (UNZ) sont différents"
+            )
 
-        with open(self.edi_file, encoding=encoding) as file:
-            text = file.read().strip()
-            try:
-                _, header, *invoices, footer = re.split(
-                    r"[\n|'](?=UNB)|[\n|'](?=UNH)|[\n|'](?=UNZ)" if text[:3] == "UNA"
-                    # Certains fichiers EDI n'ont pas l'entête UNA
-                    else r"(?=UNB)|[\n|'](?=UNH)|[\n|'](?=UNZ)",
-                    text,
-                )
-            except ValueError as except_error:
-                raise OptoParserError(
-                    "Impossible d'extraire les données du pied de page du fichier :"
-                    f" {self.edi_file.name!r}"
-                ) from except_error
-
-            header, footer = self.extract_entries([header, footer])
-            footer_parse = self.cmd_parser.cmd_footer(footer[1])
-            footer_count_invoices = footer_parse.get("financial_documents_count")
-
-            # ANNULATION DE LA VALIDATION CAR JULBO NE RESPECTE PAS ID INTERCHANGE
-            # On vérifie l'ID d'interchage
-            if str(header[1][4]).replace("'", "") != footer_parse.get("document_id").replace(
-                "'", ""
-            ):
-                # print(self.edi_file.name)
-                # print(header, footer_parse.get("document_id"))
-                raise OptoIdError(
-                    rf"l'ID du fichier Edi '{self.edi_file.name}' en entête (UNB) "
-                    r"et en pied de page (UNZ) sont différents"
-                )
-
-            # On vérifie que le nombre de factures est celui annoncé
-            # if len(re.findall(r"UNH(?=\+)", text)) != footer_count_invoices:
-            #     raise OptoNumberError(
-            #         r"Il n'y a pas dans le fichier le nombre de factures "
-            #         r"annoncé dans le pied de page (UNZ), "
-            #         f"dans le fichier {self.edi_file.name!r}"
-            #     )
-
-            # ANNULATION DE LA VALIDATION CAR CooperVision NE RESPECTE PAS LE NOMBRE DE LIGNES
-            # errors_list = []
-            #
-            # # On vérifie que toutes les lignes de factures sont présentes.
-            # for line in self.invoices(invoices):
-            #     entete, *_, resume = line
-            #
-            #     if len([_ for lis in line for _ in lis]) != int(resume[0][1]):
-            #         errors_list.append(entete[1][2])
-            #
-            # if errors_list:
-            #     raise OptoNumberError(
-            #         f"Le nombre de lignes des factures/avoirs : {', '.join(errors_list)!r} "
-            #         "ne correpond pas au "
-            #         "nombre de lignes indiquées dans leur résumé (UNT), "
-            #         f"dans le fichier {self.edi_file.name!r}"
-            #     )
+        # On vérifie que le nombre de factures est celui annoncé
+        # if len(re.findall(r"UNH(?=\+)", text)) != footer_count_invoices:
+        #     raise OptoNumberError(
+        #         r"Il n'y a pas dans le fichier le nombre de factures "
+        #         r"annoncé dans le pied de page (UNZ), "
+        #         f"dans le fichier {self.edi_file.name!r}"
+        #     )
+
+        # ANNULATION DE LA VALIDATION CAR CooperVision NE RESPECTE PAS LE NOMBRE DE LIGNES
+        # errors_list = []
+        #
+        # # On vérifie que toutes les lignes de factures sont présentes.
+        # for line in self.invoices(invoices):
+        #     entete, *_, resume = line
+        #
+        #     if len([_ for lis in line for _ in lis]) != int(resume[0][1]):
+        #         errors_list.append(entete[1][2])
+        #
+        # if errors_list:
+        #     raise OptoNumberError(
+        #         f"Le nombre de lignes des factures/avoirs : {', '.join(errors_list)!r} "
+        #         "ne correpond pas au "
+        #         "nombre de lignes indiquées dans leur résumé (UNT), "
+        #         f"dans le fichier {self.edi_file.name!r}"
+        #     )
 
-            return {
-                "header": header,
-                "footer": self.cmd_parser.cmd_footer(footer[1]),
-                "invoices": self.extract_invoices(invoices),
-                "get_columns": INVOICE_DICT,
-                "count_invoices": footer_count_invoices,
-            }
+        return {
+            "header": header,
+            "footer": self.cmd_parser.cmd_footer(footer[1]),
+            "invoices": self.extract_invoices(encoding),
+            "get_columns": INVOICE_DICT,
+            "count_invoices": footer_count_invoices,
+        }
 
 
 if __name__ == '__main__':
@@ -12,16 +12,21 @@ modified at: 2021-10-30
 modified by: Paulo ALVES
 """
 import io
+import json
 import random
 import string
+import struct
 import csv
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
 from itertools import chain, islice
-from typing import AnyStr, Dict
+from typing import AnyStr, Dict, Iterable
 
 from psycopg2 import sql
 import psycopg2
 import django
-from django.db import models, connection
+from django.db import models, connection, connections
 
 from heron.loggers import LOGGER_POSTGRES_SAVE
 from .models import Trace, Line
@@ -60,45 +65,120 @@ def iter_slice(iterable, taille, form=tuple):
         return
 
 
-def execute_batch(cur, sql_execute, iterable, page_size=500):
+def get_columns_arrays(page, nullables=None):
     """
-    Fonction prise à psycopg2.
-    execute batch, avec ajout de renvoi du nombre d'éléments envoyés en insertion
+    Transpose une page de lignes en tableaux par colonne, pour un INSERT ... SELECT unnest(...)
+    :param page:      Liste des lignes
+    :param nullables: Liste de booléens par colonne, si True une chaîne vide sera envoyée à NULL
+    :return: Liste des tableaux de valeurs par colonne
+    """
+    columns = [list(column) for column in zip(*page)]
+
+    for i, column in enumerate(columns):
+        if nullables is None or nullables[i]:
+            columns[i] = [None if value == "" else value for value in column]
+
+    return columns
+
+
+def execute_page(cur, sql_execute, page, nullables=None):
+    """
+    Exécute une page de lignes en une seule requête. Si la requête est en erreur, la page est
+    coupée en deux et chaque moitié est renvoyée, jusqu'à isoler les lignes en erreur.
+    Dans une transaction, chaque essai est fait sous un SAVEPOINT, sinon la transaction
+    en erreur refuserait les essais suivants (InFailedSqlTransaction).
+    :param cur:         Cursor Django, de la connexion qui porte le SAVEPOINT
+    :param sql_execute: Requete sql, qui reçoit un tableau par colonne
+    :param page:        Liste des lignes
+    :param nullables:   Voir get_columns_arrays
+    :return: Tuple (nombre de lignes insérées, nombre de lignes en erreur)
+    """
+    # savepoint() renvoie None en autocommit, chaque requête étant alors sa propre transaction
+    savepoint_id = cur.db.savepoint()
+
+    try:
+        cur.execute(sql_execute, get_columns_arrays(page, nullables))
+
+        if savepoint_id is not None:
+            cur.db.savepoint_commit(savepoint_id)
+
+        return len(page), 0
+
+    except (psycopg2.OperationalError, django.db.utils.OperationalError) as except_error:
+        LOGGER_POSTGRES_SAVE.exception("Cconnexion à Postgres fermée de manière inattendue")
+        raise PostgresPreparedError(
+            "Cconnexion à Postgres fermée de manière inattendue"
+        ) from except_error
+
+    except (psycopg2.Error, django.db.utils.DatabaseError):
+        if savepoint_id is not None:
+            cur.db.savepoint_rollback(savepoint_id)
+
+        if len(page) == 1:
+            LOGGER_POSTGRES_SAVE.exception(f"Erreur sur l'insertion de la ligne : {page[0]!r}")
+            return 0, 1
+
+    middle = len(page) // 2
+    sent_first, failed_first = execute_page(cur, sql_execute, page[:middle], nullables)
+    sent_last, failed_last = execute_page(cur, sql_execute, page[middle:], nullables)
+
+    return sent_first + sent_last, failed_first + failed_last
+
+
+def execute_batch(cur, sql_execute, iterable, page_size=500, nullables=None):
+    """
+    Execute batch par pages, chaque page étant envoyée en une seule requête,
+    sous forme d'un tableau par colonne (EXECUTE stmt (ARRAY[...], ARRAY[...], ...)).
+    Le nombre de lignes d'une page est divisé par deux à chaque page en erreur,
+    puis doublé à chaque page sans erreur, sans dépasser page_size.
         :param cur:         Cursor psycopg2
-        :param sql_execute: Requete sql
+        :param sql_execute: Requete sql, qui reçoit un tableau par colonne
         :param iterable:    Iterateur des données à insèrer en base
-        :param page_size:   Taille du slicing des tranches
-        :return: Slicing de l'itérateur par longeur de page_size
+        :param page_size:   Taille maximale des pages
+        :param nullables:   Voir get_columns_arrays
+        :return: Tuple (erreur, (nombre de lignes envoyées, nombre de lignes insérées))
     """
     erreur = False
     count_initial = 0
     count_final = 0
+    current_page_size = page_size
+    rows = iter(iterable)
 
-    for page in iter_slice(iterable, taille=page_size):
-        nbre = len(page)
-        count_initial += nbre
+    while True:
+        page = list(islice(rows, current_page_size))
 
-        try:
-            sqls = [cur.mogrify(sql_execute, args) for args in page]
-            cur.execute(b";".join(sqls))
-            count_final += nbre
+        if not page:
+            break
 
-        except psycopg2.OperationalError:
-            LOGGER_POSTGRES_SAVE.exception("Cconnexion à Postgres fermée de manière inattendue")
+        count_initial += len(page)
+        nb_sent, nb_failed = execute_page(cur, sql_execute, page, nullables)
+        count_final += nb_sent
 
-        except psycopg2.Error:
-            LOGGER_POSTGRES_SAVE.exception("Erreur sur les insertions execute_bach")
+        if nb_failed:
+            erreur = True
+            LOGGER_POSTGRES_SAVE.warning(
+                f"execute_batch : page de {len(page)} lignes, "
+                f"{nb_sent} insérées, {nb_failed} en erreur"
+            )
+            current_page_size = max(current_page_size // 2, 1)
+        else:
+            current_page_size = min(current_page_size * 2, page_size)
 
     return erreur, (count_initial, count_final)
 
 
-def execute_prepared_upsert(cursor, sql_prepare, sql_execute, sql_deallocate, rows, page_size):
+def execute_prepared_upsert(
+    cursor, sql_prepare, sql_execute, sql_deallocate, rows, page_size, nullables=None
+):
     """
     Fonction qui exécute une requete préparée, INSERT ou UPSERT.
-        Attention!!! Cette requête sera en autocommit.
+        Attention!!! Cette requête sera en autocommit, chaque page étant une transaction.
     Exemple :
-        cursor.execute("PREPARE stmt (int) AS INSERT INTO foo VALUES ($1) ON CONFLICT DO NOTHING;")
-        execute_batch(cursor, "EXECUTE stmt (%s, %s, %s)", list_values)
+        cursor.execute(
+            "PREPARE stmt (int[], text[]) AS INSERT INTO foo SELECT * FROM unnest($1, $2) "
+            "ON CONFLICT DO NOTHING;"
+        )
+        execute_batch(cursor, "EXECUTE stmt (%s::int[], %s::text[])", list_values)
         cursor.execute("DEALLOCATE stmt")
     :param cursor:          Cusor au sens psycopg2
     :param sql_prepare:     Requête préparée
@@ -106,10 +186,13 @@ def execute_prepared_upsert(cursor, sql_prepare, sql_execute, sql_deallocate, ro
     :param sql_deallocate:  Sql pour le deallocate
     :param rows:            Flux iterateur
     :param page_size:       Taille des passes
+    :param nullables:       Voir get_columns_arrays
     """
     try:
         cursor.execute(sql_prepare)
-        error, tup_count = execute_batch(cursor, sql_execute, rows, page_size=page_size)
+        error, tup_count = execute_batch(
+            cursor, sql_execute, rows, page_size=page_size, nullables=nullables
+        )
         cursor.execute(sql_deallocate)
 
     except psycopg2.Error as except_error:
@@ -119,6 +202,280 @@ def execute_prepared_upsert(cursor, sql_prepare, sql_execute, sql_deallocate, ro
     return error, tup_count
 
 
+class IteratorFile(io.RawIOBase):
+    """
+    Adaptateur en lecture seule d'un itérable de bytes, en fichier pour un copy_expert psycopg2.
+    Les données sont consommées par le COPY au fur et à mesure qu'elles sont produites,
+    sans jamais matérialiser le fichier complet en mémoire.
+        exemple :
+            cursor.copy_expert(sql_copy, IteratorFile(validation.iter_validate()))
+    """
+
+    def __init__(self, iterable):
+        """
+        :param iterable: Itérable de bytes
+        """
+        super().__init__()
+        self.iterator = iter(iterable)
+        self.leftover = b""
+        # Exception levée par l'itérable (validation, loader), pour la distinguer
+        # des erreurs postgresql du COPY qui le consomme
+        self.iterator_error = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        """
+        Remplit le buffer demandé par le lecteur
+        :param buffer: buffer à remplir
+        :return: Nombre d'octets écrits dans le buffer, 0 en fin de flux
+        """
+        try:
+            while not self.leftover:
+                self.leftover = next(self.iterator)
+        except StopIteration:
+            return 0
+        except Exception as except_error:
+            self.iterator_error = except_error
+            raise
+
+        size = len(buffer)
+        output, self.leftover = self.leftover[:size], self.leftover[size:]
+        buffer[: len(output)] = output
+
+        return len(output)
+
+
+def get_pipeline_connection(alias: AnyStr = "default"):
+    """
+    Connexion Django dédiée au COPY en mode pipeline, pendant la durée d'un COPY la connexion
+    ne peut servir à rien d'autre, or la validation écrit les traces sur la connexion par défaut.
+    La connexion est à fermer par l'appelant.
+    :param alias: Alias de la base de données dans settings.DATABASES
+    :return: Connexion Django
+    """
+    return connections.create_connection(alias)
+
+
+def get_file_to_log(file):
+    """
+    :param file: Fichier envoyé au COPY
+    :return: Contenu du fichier pour les logs, si le fichier peut être relu
+    """
+    if not hasattr(file, "seekable") or not file.seekable():
+        return "flux non relisible"
+
+    file.seek(0)
+
+    return f"{file.read()!r}"
+
+
+# COPY au format binaire ==========================================================================
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+PGCOPY_NULL = struct.pack("!i", -1)
+PGCOPY_CHUNK_SIZE = 64 * 1024
+POSTGRES_EPOCH_DATE = date(2000, 1, 1)
+POSTGRES_EPOCH_DATETIME = datetime(2000, 1, 1)
+POSTGRES_EPOCH_DATETIME_TZ = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def binary_text(value):
+    """Encodage binaire Postgresql des types text, varchar, char"""
+    return str(value).encode("utf8")
+
+
+def binary_int2(value):
+    """Encodage binaire Postgresql du type smallint"""
+    return struct.pack("!h", int(value))
+
+
+def binary_int4(value):
+    """Encodage binaire Postgresql du type integer"""
+    return struct.pack("!i", int(value))
+
+
+def binary_int8(value):
+    """Encodage binaire Postgresql du type bigint"""
+    return struct.pack("!q", int(value))
+
+
+def binary_float8(value):
+    """Encodage binaire Postgresql du type double precision"""
+    return struct.pack("!d", float(value))
+
+
+def binary_bool(value):
+    """Encodage binaire Postgresql du type boolean"""
+    if isinstance(value, (str,)):
+        value = value.strip().lower() in {"true", "t", "1", "yes", "y", "on", "oui"}
+
+    return b"\x01" if value else b"\x00"
+
+
+def binary_uuid(value):
+    """Encodage binaire Postgresql du type uuid"""
+    return (value if isinstance(value, (uuid.UUID,)) else uuid.UUID(str(value))).bytes
+
+
+def binary_date(value):
+    """Encodage binaire Postgresql du type date : nombre de jours depuis le 01/01/2000"""
+    if isinstance(value, (str,)):
+        value = date.fromisoformat(value[:10])
+
+    elif isinstance(value, (datetime,)):
+        value = value.date()
+
+    return struct.pack("!i", (value - POSTGRES_EPOCH_DATE).days)
+
+
+def get_microseconds(delta):
+    """
+    :param delta: timedelta
+    :return: Le nombre de microsecondes du timedelta
+    """
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def binary_timestamp(value):
+    """Encodage binaire Postgresql du type timestamp : microsecondes depuis le 01/01/2000"""
+    if isinstance(value, (str,)):
+        value = datetime.fromisoformat(value)
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return struct.pack("!q", get_microseconds(value - POSTGRES_EPOCH_DATETIME))
+
+
+def binary_timestamptz(value):
+    """
+    Encodage binaire Postgresql du type timestamp with time zone : microsecondes UTC depuis le
+    01/01/2000. Une date naïve est considérée en UTC, comme la connexion Django avec USE_TZ
+    """
+    if isinstance(value, (str,)):
+        value = datetime.fromisoformat(value)
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return struct.pack("!q", get_microseconds(value - POSTGRES_EPOCH_DATETIME_TZ))
+
+
+def binary_numeric(value):
+    """
+    Encodage binaire Postgresql du type numeric :
+        ndigits, weight, sign, dscale puis les chiffres en base 10000
+    """
+    value = value if isinstance(value, (Decimal,)) else Decimal(str(value).strip())
+
+    if value.is_nan():
+        return struct.pack("!hhHH", 0, 0, 0xC000, 0)
+
+    if value.is_infinite():
+        raise ValueError(f"La valeur {value!r} ne peut être insérée dans un numeric")
+
+    sign, digits, exponent = value.as_tuple()
+
+    if exponent > 0:
+        digits += (0,) * exponent
+        exponent = 0
+
+    dscale = -exponent
+
+    # On aligne la partie décimale puis la partie entière sur des groupes de 4 chiffres
+    digits += (0,) * (-dscale % 4)
+    int_len = len(digits) - (dscale + (-dscale % 4))
+
+    if int_len < 0:
+        digits = (0,) * -int_len + digits
+        int_len = 0
+
+    digits = (0,) * (-int_len % 4) + digits
+    weight = (int_len + (-int_len % 4)) // 4 - 1
+    groups = [
+        digits[i] * 1000 + digits[i + 1] * 100 + digits[i + 2] * 10 + digits[i + 3]
+        for i in range(0, len(digits), 4)
+    ]
+
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+
+    while groups and groups[-1] == 0:
+        groups.pop()
+
+    if not groups:
+        weight = 0
+
+    return struct.pack(
+        f"!hhHH{len(groups)}h", len(groups), weight, 0x4000 if sign else 0, dscale, *groups
+    )
+
+
+def binary_json(value):
+    """Encodage binaire Postgresql du type json"""
+    return (value if isinstance(value, (str,)) else json.dumps(value)).encode("utf8")
+
+
+def binary_jsonb(value):
+    """Encodage binaire Postgresql du type jsonb, version 1 du format suivie du texte json"""
+    return b"\x01" + binary_json(value)
+
+
+BINARY_ENCODERS_DICT = {
+    "varchar": binary_text,
+    "character varying": binary_text,
+    "char": binary_text,
+    "character": binary_text,
+    "text": binary_text,
+    "citext": binary_text,
+    "smallint": binary_int2,
+    "smallserial": binary_int2,
+    "integer": binary_int4,
+    "serial": binary_int4,
+    "bigint": binary_int8,
+    "bigserial": binary_int8,
+    "double precision": binary_float8,
+    "boolean": binary_bool,
+    "uuid": binary_uuid,
+    "date": binary_date,
+    "timestamp": binary_timestamp,
+    "timestamp without time zone": binary_timestamp,
+    "timestamp with time zone": binary_timestamptz,
+    "numeric": binary_numeric,
+    "json": binary_json,
+    "jsonb": binary_jsonb,
+}
+
+
+def get_rows_from_file(file, delimiter: AnyStr = ";", quote_character: AnyStr = '"'):
+    """
+    :param file:            Fichier csv texte, IteratorFile de bytes ou itérable de lignes
+    :param delimiter:       Séparateur des lignes du fichier
+    :param quote_character: Quotation des champs
+    :return: Itérable des lignes
+    """
+    if isinstance(file, (io.RawIOBase,)):
+        file = io.TextIOWrapper(io.BufferedReader(file), encoding="utf8")
+
+    if hasattr(file, "read"):
+        if file.seekable():
+            file.seek(0)
+
+        return csv.reader(
+            file,
+            delimiter=delimiter,
+            quotechar=quote_character,
+            lineterminator="\n",
+            quoting=csv.QUOTE_MINIMAL,
+        )
+
+    return file
+
+
 def get_random_name(size=10):
     """
     Génère une suite de lettre alléatoire en minuscule
@@ -251,40 +608,112 @@ class PostgresDjangoUpsert:
 
         return fields_list
 
+    def get_binary_encoders(self):
+        """
+        :return: La liste des tuples (fonction d'encodage binaire, champ nullable, champ texte),
+                 dans l'ordre des champs de self.fields_dict
+        """
+        encoders_list = []
+
+        for field_key in self.fields_dict.keys():
+            field_attr = self.get_column_field(field_key)
+            db_type = field_attr.db_type(self.cnx)
+            base_type = db_type.split("(")[0].strip().lower()
+            encoder = BINARY_ENCODERS_DICT.get(base_type)
+
+            if encoder is None:
+                raise PostgresTypeError(
+                    f"Le type {db_type!r} du champ {field_key!r} n'est pas géré en COPY binaire"
+                )
+
+            encoders_list.append((encoder, field_attr.null, encoder is binary_text))
+
+        return encoders_list
+
+    def iter_binary_copy(self, rows: Iterable, chunk_size: int = PGCOPY_CHUNK_SIZE):
+        """
+        Générateur du flux COPY au format binaire, encodé suivant les types des champs du model.
+        Comme le FORCE_NULL du COPY csv, une chaîne vide est insérée à NULL si le champ est
+        nullable, elle l'est aussi pour tous les types autres que texte.
+        :param rows:       Itérable des lignes, dans l'ordre de self.fields_dict.
+                           Les valeurs peuvent être des str ou des types python
+                           (Decimal, date, datetime, UUID, ...)
+        :param chunk_size: Taille des morceaux renvoyés
+        :return: Générateur de bytes
+        """
+        encoders_list = self.get_binary_encoders()
+        nb_fields = struct.pack("!h", len(encoders_list))
+        buffer = bytearray(PGCOPY_HEADER)
+
+        for num_line, row in enumerate(rows, 1):
+            buffer += nb_fields
+
+            for value, (encoder, nullable, is_text) in zip(row, encoders_list):
+                if value is None or (value == "" and (nullable or not is_text)):
+                    buffer += PGCOPY_NULL
+                    continue
+
+                try:
+                    data = encoder(value)
+                except (ArithmeticError, ValueError, TypeError, AttributeError) as except_error:
+                    raise PostgresTypeError(
+                        f"COPY binaire, ligne {num_line} : valeur {value!r} non conforme"
+                    ) from except_error
+
+                buffer += struct.pack("!i", len(data))
+                buffer += data
+
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+
+        buffer += PGCOPY_TRAILER
+        yield bytes(buffer)
+
+    def get_array_type(self, field_key: AnyStr):
+        """
+        :param field_key: Champ du model django
+        :return: Le type tableau Postgresql du champ, pour un paramètre de requête préparée
+        """
+        db_type = self.get_column_field(field_key).db_type(self.cnx)
+        serials_dict = {"serial": "integer", "bigserial": "bigint", "smallserial": "smallint"}
+
+        return f"{serials_dict.get(db_type, db_type)}[]"
+
+    def get_nullables(self):
+        """
+        :return: La liste par champ, des champs pour lesquels une chaîne vide est à mettre à NULL,
+                 comme le FORCE_NULL du COPY csv
+        """
+        return [self.get_column_field(field_key).null for field_key in self.fields_dict]
+
     def get_prepare_batch(self, stmt_name: AnyStr):
         """
+        La requête préparée reçoit un tableau par colonne, chaque EXECUTE insère donc toute une
+        page de lignes par un INSERT ... SELECT * FROM unnest(...)
         :param stmt_name: Nom du prepare stmt
         :return: Les bases de la requête préparée
         """
-        with self.cnx.cursor() as cursor:
-            sql_champs = sql.SQL(
-                "SELECT column_name, data_type, character_maximum_length, is_nullable "
-                "FROM information_schema.columns "
-                "WHERE table_name = '{table}'"
-            ).format(table=sql.SQL(self.table_name))
-            cursor.execute(sql_champs)
-            dict_fields = {row[0]: row[1] for row in cursor.fetchall()}
-            tipes = [sql.SQL(dict_fields.get(key)) for key in self.fields_list]
-            stmt_ident = sql.Identifier(stmt_name)
-            params = ", ".join([f"${i}" for i, _ in enumerate(tipes, 1)])
-            exe_val = ", ".join(["%s" for _ in tipes])
-            prepare = sql.SQL(
-                "PREPARE {stmt_name} ({tipes}) AS INSERT INTO {table} ({fields}) "
-                "VALUES ({params}) "
-            ).format(
-                stmt_name=stmt_ident,
-                tipes=sql.SQL(", ").join(tipes),
-                table=sql.Identifier(self.table_name),
-                fields=self.get_fields(),
-                params=sql.SQL(params),
-            )
-            sql_execute = sql.SQL("EXECUTE {stmt_name} ({exe_val})").format(
-                stmt_name=stmt_ident,
-                exe_val=sql.SQL(exe_val),
-            )
-            sql_deallocate = sql.SQL("DEALLOCATE {stmt_name}").format(stmt_name=stmt_ident)
+        tipes = [self.get_array_type(field_key) for field_key in self.fields_dict]
+        stmt_ident = sql.Identifier(stmt_name)
+        params = ", ".join([f"${i}" for i, _ in enumerate(tipes, 1)])
+        prepare = sql.SQL(
+            "PREPARE {stmt_name} ({tipes}) AS INSERT INTO {table} ({fields}) "
+            "SELECT * FROM unnest({params}) "
+        ).format(
+            stmt_name=stmt_ident,
+            tipes=sql.SQL(", ").join([sql.SQL(tipe) for tipe in tipes]),
+            table=sql.Identifier(self.table_name),
+            fields=self.get_fields(),
+            params=sql.SQL(params),
+        )
+        sql_execute = sql.SQL("EXECUTE {stmt_name} ({exe_val})").format(
+            stmt_name=stmt_ident,
+            exe_val=sql.SQL(", ").join([sql.SQL(f"%s::{tipe}") for tipe in tipes]),
+        )
+        sql_deallocate = sql.SQL("DEALLOCATE {stmt_name}").format(stmt_name=stmt_ident)
 
-            return prepare, sql_execute, sql_deallocate
+        return prepare, sql_execute, sql_deallocate
 
     def get_columns_upsert(self):
         """
@@ -450,7 +879,8 @@ class PostgresDjangoUpsert:
     ):
         """
         Realise l'insertion choisie (upsert, do_nothing, insert)
-        :param file:            Fichier au format io.StringIO
+        :param file:            Fichier au format io.StringIO,
+                                ou IteratorFile pour un COPY en mode pipeline
         :param insert_mode:     Mode d'insertion choisi
         :param delimiter:       Séparateur des lignes du fichier
         :param quote_character: Quotation des champs
@@ -460,6 +890,11 @@ class PostgresDjangoUpsert:
                                     "page_size": None ou nbre par iteration par défault 500,
 
                                 }
+
+        Les modes binary_copy, binary_do_nothing et binary_upsert font le même travail que
+        insert, do_nothing et upsert, mais avec un COPY au format binaire, encodé en python
+        suivant les types des champs du model. Pour ces modes file peut aussi être un itérable
+        de lignes de valeurs python (Decimal, date, UUID, ...), qui ne passeront jamais en texte.
         """
 
         insert_mode_dict = {
@@ -468,14 +903,20 @@ class PostgresDjangoUpsert:
             "upsert": self.get_query_upsert,
             "prepared": "",
             "pre_validation": "",
+            "binary_copy": None,
+            "binary_do_nothing": self.get_query_do_nothing,
+            "binary_upsert": self.get_query_upsert,
         }
         trace_prepared = kwargs_prepared.get("trace", {})
+        csv_delimiter, csv_quote_character = delimiter, quote_character
 
         if insert_mode not in insert_mode_dict:
             raise PostgresInsertMethodError(
                 f"La methode {insert_mode!r} d'insertion choisie n'existe pas"
             )
 
+        binary_file = None
+
         with self.cnx.cursor() as cursor:
             try:
                 fields = self.get_fields()
@@ -522,13 +963,7 @@ class PostgresDjangoUpsert:
                     sql_prepare, sql_execute, sql_deallocate = self.get_prepare_smt(
                         kwargs_prepared.get("mode"), stmt_name
                     )
-                    csv_rows = csv.reader(
-                        file,
-                        delimiter=";",
-                        quotechar='"',
-                        lineterminator="\n",
-                        quoting=csv.QUOTE_MINIMAL,
-                    )
+                    csv_rows = get_rows_from_file(file, csv_delimiter, csv_quote_character)
                     error, tup_count = execute_prepared_upsert(
                         cursor,
                         sql_prepare,
@@ -536,10 +971,34 @@ class PostgresDjangoUpsert:
                         sql_deallocate,
                         csv_rows,
                         kwargs_prepared.get("page_size", 500),
+                        self.get_nullables(),
                     )
 
                     return error, tup_count
 
+                elif insert_mode.startswith("binary_"):
+                    sql_binary = "COPY {table} ({fields}) FROM STDIN WITH (FORMAT BINARY)"
+                    binary_file = IteratorFile(
+                        self.iter_binary_copy(
+                            get_rows_from_file(file, csv_delimiter, csv_quote_character)
+                        )
+                    )
+
+                    if insert_mode == "binary_copy":
+                        # copy direct dans la table définitive
+                        table = sql.Identifier(self.table_name)
+                        sql_copy = sql.SQL(sql_binary).format(table=table, fields=fields)
+                        cursor.copy_expert(sql=sql_copy, file=binary_file)
+
+                    else:
+                        # copy dans une table provisoire pour un do_nothing ou un upsert
+                        table = sql.Identifier(self.temp_table_name)
+                        cursor.execute(self.get_ddl_temp_table())
+                        sql_copy = sql.SQL(sql_binary).format(table=table, fields=fields)
+                        cursor.copy_expert(sql=sql_copy, file=binary_file)
+                        cursor.execute(insert_mode_dict.get(insert_mode))
+                        cursor.execute(self.get_drop_temp)
+
                 elif insert_mode == "pre_validation":
                     self.insert_with_pre_validation(
                         file,
@@ -565,7 +1024,9 @@ class PostgresDjangoUpsert:
                     # for line in file:
                     #     print(line)
 
-                    file.seek(0)
+                    if file.seekable():
+                        file.seek(0)
+
                     cursor.copy_expert(sql=sql_copy, file=file)
 
                     # do_nothing ou upsert
@@ -587,9 +1048,8 @@ class PostgresDjangoUpsert:
                 ) from except_error
 
             except psycopg2.errors.InvalidTextRepresentation as except_error:
-                file.seek(0)
                 LOGGER_POSTGRES_SAVE.exception(
-                    f"{except_error}\ntable : {table}\nfields : {fields}\n{file.read()!r}"
+                    f"{except_error}\ntable : {table}\nfields : {fields}\n{get_file_to_log(file)}"
                 )
                 raise PostgresTypeError(
                     f"Erreur de type, trace N° : {trace_prepared!r}"
@@ -601,9 +1061,19 @@ class PostgresDjangoUpsert:
                 ) from except_error
 
             except Exception as except_error:
-                file.seek(0)
+                iterator_error = getattr(file, "iterator_error", None) or getattr(
+                    binary_file, "iterator_error", None
+                )
+
+                # Le COPY a été annulé par le flux qui l'alimente, ce n'est pas une erreur
+                # postgresql, l'exception d'origine est en __cause__
+                if iterator_error is not None:
+                    raise PostgresDjangoError(
+                        f"COPY annulé par le flux de données, trace N° : {trace_prepared!r}"
+                    ) from iterator_error
+
                 LOGGER_POSTGRES_SAVE.exception(
-                    f"{except_error}\ntable : {table}\nfields : {fields}\n{file.read()!r}"
+                    f"{except_error}\ntable : {table}\nfields : {fields}\n{get_file_to_log(file)}"
                 )
                 raise PostgresDjangoError(
                     f"Erreur inconnue, trace N° : {trace_prepared!r}"
@@ -11,11 +11,27 @@ created by: Paulo ALVES
 modified at: 2022-04-08
 modified by: Paulo ALVES
 """
+from collections import Counter
+from typing import AnyStr, Dict, Iterable
 from uuid import uuid4
 
+from django.db import connection, transaction
 from django.utils import timezone
 
-from apps.data_flux.models import Trace
+from apps.data_flux.models import Trace, Line, Error
+from apps.data_flux.cache import FLOWS_COLUMNS_CACHE_NAME, get_cache_registry
+
+# Désignations par défaut des lignes de trace, suivant le type d'insertion
+INSERTION_DICT = {
+    "Create": "cette ligne à bien été créée",
+    "Update": "cette ligne à bien été modifiée",
+    "Errors": "Cette ligne à généré une erreur",
+    "Passed": "Cette ligne n'a pas été traitée",
+    "Unknown": "Cette ligne n'a pas été traitée",
+}
+
+# Tampons des lignes et erreurs par trace, partagés par les loaders et les validations
+TRACE_BUFFERS_DICT = {}
 
 
 def get_trace(trace_name, file_name, application_name, flow_name, comment):
@@ -42,3 +58,143 @@ def get_trace(trace_name, file_name, application_name, flow_name, comment):
         unknown_numbers_records=0,
     )
     return trace
+
+
+def get_file_columns_dict(flow_name: AnyStr):
+    """
+    Renvoie les colonnes du fichier par attribut, de la définition des colonnes du flux
+    :param flow_name: Nom du flux
+    :return: {attr_name: file_column, ...}
+    """
+    if not flow_name:
+        return {}
+
+    def get_file_columns_from_db():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                select attr_name, file_column
+                from edi_columndefinition
+                where flow_name = %(flow_name)s
+                """,
+                {"flow_name": flow_name},
+            )
+            return dict(cursor.fetchall())
+
+    return get_cache_registry(FLOWS_COLUMNS_CACHE_NAME).get_or_set(
+        flow_name, get_file_columns_from_db
+    )
+
+
+class TraceBuffer:
+    """
+    Tampon des lignes et des erreurs de trace, enregistrées par lots (bulk_create),
+    plutôt qu'une requête par ligne et par erreur. Les uuid des lignes étant attribués à la
+    création, les erreurs sont rattachées aux lignes avant leur enregistrement.
+    Les lignes sont comptées par type d'insertion au fil de l'eau, et la colonne du fichier des
+    erreurs est renseignée depuis la définition des colonnes du flux, lue une seule fois.
+    """
+
+    buffer_size = 1000
+
+    def __init__(self, trace: Trace, buffer_size: int = None):
+        """
+        :param trace:       Instance de la Trace
+        :param buffer_size: Nombre d'erreurs au delà duquel le tampon est enregistré
+        """
+        self.trace = trace
+        self.buffer_size = buffer_size or self.buffer_size
+        self.lines = []
+        self.errors = []
+        self.counts_dict = Counter()
+        self._file_columns_dict = None
+
+    @property
+    def file_columns_dict(self):
+        """Colonnes du fichier par attribut, pour le flux de la trace"""
+        if self._file_columns_dict is None:
+            self._file_columns_dict = get_file_columns_dict(self.trace.flow_name)
+
+        return self._file_columns_dict
+
+    def add_line(
+        self, insertion_type: AnyStr = "Unknown", num_line: int = None, designation: AnyStr = None
+    ):
+        """
+        Ajoute une ligne au tampon
+        :param insertion_type:  Type d'insertion dans la table
+        :param num_line:        N° de ligne traitée
+        :param designation:     Désignation de la ligne à inserrer
+        :return: Line non enregistrée
+        """
+        line = Line(
+            uuid_identification=uuid4(),
+            trace=self.trace,
+            insertion_type=insertion_type,
+            num_line=num_line,
+            designation=designation or INSERTION_DICT.get(insertion_type),
+        )
+        self.lines.append(line)
+        self.counts_dict[insertion_type] += 1
+
+        return line
+
+    def add_errors(self, line: Line, errors_list: Iterable[Dict]):
+        """
+        Ajoute des erreurs de la ligne au tampon
+        :param line:        Line du tampon
+        :param errors_list: Liste des dictionnaires des champs des erreurs
+        """
+        self.errors.extend(
+            Error(
+                **{
+                    "line_id": line.uuid_identification,
+                    "file_column": self.file_columns_dict.get(error_dict.get("attr_name")),
+                    **error_dict,
+                }
+            )
+            for error_dict in errors_list
+        )
+
+        if len(self.errors) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Enregistrement des lignes et des erreurs du tampon"""
+        if not self.lines and not self.errors:
+            return
+
+        lines, errors = self.lines, self.errors
+        self.lines, self.errors = [], []
+
+        with transaction.atomic():
+            Line.objects.bulk_create(lines, batch_size=self.buffer_size)
+            Error.objects.bulk_create(errors, batch_size=self.buffer_size)
+
+
+def get_trace_buffer(trace: Trace):
+    """
+    Renvoie le tampon de la trace, partagé par tous ceux qui tracent sur celle-ci
+    :param trace: Instance de la Trace
+    :return: TraceBuffer
+    """
+    trace_buffer = TRACE_BUFFERS_DICT.get(trace.uuid_identification)
+
+    if trace_buffer is None:
+        trace_buffer = TRACE_BUFFERS_DICT[trace.uuid_identification] = TraceBuffer(trace)
+
+    return trace_buffer
+
+
+def flush_trace_buffer(trace: Trace):
+    """
+    Enregistre et libère le tampon de la trace
+    :param trace: Instance de la Trace
+    :return: TraceBuffer libéré, pour ses compteurs, ou None
+    """
+    trace_buffer = TRACE_BUFFERS_DICT.pop(trace.uuid_identification, None)
+
+    if trace_buffer is not None:
+        trace_buffer.flush()
+
+    return trace_buffer
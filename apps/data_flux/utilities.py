@@ -5,31 +5,43 @@ Module des utilitaires
 created at: 2021-10-30
 created by: Paulo ALVES
 
-modified at: 2021-10-30
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 import io
 from pathlib import Path
 import csv
+import datetime
+import tempfile
 import zipfile
 
 import openpyxl
 from chardet.universaldetector import UniversalDetector
 import pandas as pd
+from python_calamine import CalamineWorkbook, CalamineError
 
 from .exceptions import EncodingError, ExcelToCsvFileError, CsvFileToStringIoError
 
 
-def encoding_detect(path_file):
-    """Fonction qui renvoi l'encoding le plus probable du fichier passé en paramètre"""
+# Taille maximale lue pour la détection de l'encoding en mode streaming
+ENCODING_SNIFF_SIZE = 1024 * 1024
+
+
+def encoding_detect(path_file, max_bytes: int = None):
+    """Fonction qui renvoi l'encoding le plus probable du fichier passé en paramètre
+    :param path_file: Fichier à analyser
+    :param max_bytes: Nombre d'octets maximum à analyser, None pour tout le fichier
+    """
     try:
         detector = UniversalDetector()
+        read_bytes = 0
 
         with open(path_file, "rb") as file:
             for line in file:
                 detector.feed(line)
+                read_bytes += len(line)
 
-                if detector.done:
+                if detector.done or (max_bytes and read_bytes >= max_bytes):
                     break
 
             detector.close()
@@ -45,14 +57,128 @@ def encoding_detect(path_file):
     return encoding
 
 
+def excel_float_to_str(value: float):
+    """Supprime les .0 inutiles des nombres d'excel, comme le float_format de pandas.to_csv"""
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def excel_datetime_to_str(value: datetime.datetime):
+    """Les dates sans heures d'excel sont écrites sans heures, comme pandas.to_csv"""
+    return value.isoformat(" ") if value.time() else value.date().isoformat()
+
+
+# Formatage des valeurs d'excel pour le csv, suivant leur type
+EXCEL_TO_STR_DICT = {
+    str: str,
+    float: excel_float_to_str,
+    int: str,
+    bool: str,
+    datetime.datetime: excel_datetime_to_str,
+    datetime.date: datetime.date.isoformat,
+}
+
+
+def get_excel_header(header_row):
+    """
+    Entête du fichier excel, nommée comme pandas.read_excel le fait :
+    les colonnes sans nom deviennent "Unnamed: n" et les doublons "nom.1", "nom.2", ...
+    :param header_row: Première ligne du fichier excel
+    :return: Liste des noms de colonnes
+    """
+    header = []
+    names_dict = {}
+
+    for i, value in enumerate(header_row):
+        name = EXCEL_TO_STR_DICT.get(value.__class__, str)(value) if value != "" else ""
+        name = name or f"Unnamed: {i}"
+        count = names_dict.get(name, 0)
+        names_dict[name] = count + 1
+        header.append(f"{name}.{count}" if count else name)
+
+    return header
+
+
+def excel_file_to_csv_calamine(excel_file: Path, csv_file, header=True):
+    """
+    Transforme la première feuille d'un fichier excel en csv, avec le lecteur calamine (Rust),
+    sans passer par un DataFrame pandas, et l'écrit dans le csv_file passé en paramètre
+    :param excel_file:  Fichier excel à passer en csv
+    :param csv_file:    Fichier texte (String_io, fichier temporaire, ...) en csv
+    :param header:      Entête
+    """
+    with excel_file.open("rb") as file:
+        workbook = CalamineWorkbook.from_filelike(file)
+        rows = iter(workbook.get_sheet_by_index(0).to_python(skip_empty_area=False))
+
+    csv_writer = csv.writer(
+        csv_file, delimiter=";", quotechar='"', lineterminator="\n", quoting=csv.QUOTE_ALL
+    )
+    header_row = next(rows, None)
+
+    if header_row is None:
+        return
+
+    if header:
+        csv_writer.writerow(get_excel_header(header_row))
+
+    excel_to_str_dict = EXCEL_TO_STR_DICT
+
+    csv_writer.writerows(
+        [excel_to_str_dict.get(value.__class__, str)(value) for value in row] for row in rows
+    )
+
+
+def excel_file_rows(excel_file: Path, header=True):
+    """
+    Générateur des lignes de la première feuille d'un fichier excel, en listes de textes,
+    comme un csv.reader sur le csv de excel_file_to_csv_string_io, sans fichier intermédiaire.
+    Le fichier est lu par calamine, pandas n'est utilisé que si calamine ne peut le lire
+    :param excel_file:  Fichier excel à lire
+    :param header:      Entête
+    """
+    try:
+        with excel_file.open("rb") as file:
+            workbook = CalamineWorkbook.from_filelike(file)
+            rows = iter(workbook.get_sheet_by_index(0).to_python(skip_empty_area=False))
+
+    except (CalamineError, OSError):
+        csv_io = io.StringIO()
+        excel_file_to_csv_string_io(excel_file, csv_io, header=header)
+        yield from csv.reader(csv_io, delimiter=";", quotechar='"', lineterminator="\n")
+        return
+
+    header_row = next(rows, None)
+
+    if header_row is None:
+        return
+
+    if header:
+        yield get_excel_header(header_row)
+
+    excel_to_str_dict = EXCEL_TO_STR_DICT
+
+    for row in rows:
+        yield [excel_to_str_dict.get(value.__class__, str)(value) for value in row]
+
+
 def excel_file_to_csv_string_io(excel_file: Path, string_io_file, header=True):
     """
     Fonction qui transforme un fichier excel en csv et rempli le string_io_file passer en paramètre
+    Le fichier est lu par calamine, pandas n'est utilisé que si calamine ne peut le lire
     :param excel_file:      String_io excel à passer en csv
     :param string_io_file:  String_io en csv
     :param header:          Entête
     """
 
+    try:
+        excel_file_to_csv_calamine(excel_file, string_io_file, header=header)
+        string_io_file.seek(0)
+        return
+
+    except (CalamineError, OSError):
+        string_io_file.seek(0)
+        string_io_file.truncate()
+
     try:
         # noinspection PyArgumentList
         try:
@@ -99,3 +225,43 @@ def file_to_csv_string_io(file: Path, string_io_file: io.StringIO, encoding_file
 
     except Exception as except_error:
         raise CsvFileToStringIoError(f"file_to_csv_string_io : {file.name!r}") from except_error
+
+
+def file_to_csv_stream(file: Path, encoding_file: str = None):
+    """Fonction qui ouvre le fichier csv en lecture, sans le charger en mémoire.
+    L'encoding est déterminé sur les ENCODING_SNIFF_SIZE premiers octets si on ne le connait pas
+    :param file:            Fichier csv, instance de Path (pathlib)
+    :param encoding_file:   Encoding du fichier si on le connait
+    :return: Fichier ouvert en lecture, à fermer par l'appelant
+    """
+    try:
+        encoding = encoding_file or encoding_detect(file, max_bytes=ENCODING_SNIFF_SIZE)
+
+        # noinspection PyTypeChecker
+        return file.open("r", encoding=encoding, errors="replace")
+
+    except EncodingError as except_error:
+        raise CsvFileToStringIoError(
+            f"file_to_csv_stream : {file.name!r}, errur sur la détermination de l'encoding"
+        ) from except_error
+
+    except Exception as except_error:
+        raise CsvFileToStringIoError(f"file_to_csv_stream : {file.name!r}") from except_error
+
+
+def excel_file_to_csv_temp_file(excel_file: Path, header=True):
+    """Fonction qui transforme un fichier excel en csv dans un fichier temporaire sur disque,
+    plutôt que dans un io.StringIO
+    :param excel_file:  Fichier excel à passer en csv
+    :param header:      Entête
+    :return: Fichier temporaire ouvert en lecture, supprimé à sa fermeture
+    """
+    temp_file = tempfile.TemporaryFile("w+", encoding="utf8")
+
+    try:
+        excel_file_to_csv_string_io(excel_file, temp_file, header=header)
+    except Exception:
+        temp_file.close()
+        raise
+
+    return temp_file
@@ -6,6 +6,7 @@ Instances de validation implémentées :
     - serializers.Serializer et serializers.ModelSerializer de DRF
     - BaseModel de Pydantic
     - ModelSchema de Djantic
+    - BaseModel de Pydantic et ModelSchema de Djantic, validés par colonnes par lots de lignes
 
 Commentaire:
 
@@ -15,31 +16,54 @@ created by: Paulo ALVES
 modified at: 2021-10-30
 modified by: Paulo ALVES
 """
+from collections import Counter
 import csv
-from itertools import chain
+import inspect
+import io
+from itertools import chain, islice
 import uuid
 from typing import Any, Dict, Iterable
 
 import pendulum
 import pydantic
 from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
 from djantic import ModelSchema
 from rest_framework import serializers as seria
 
 from django import forms
-from django.db import connection, models
-from django.db.models import Count, Q
+from django.db import models
 from django.utils import timezone
 
 # noinspection PyCompatibility
 from heron.loggers import LOGGER_VALIDATION
 from .exceptions import (
     ValidationError,
+    ValidationAbortError,
     ValidationFormError,
     IsValidError,
     FluxtypeError,
 )
-from .models import Trace, Line, Error
+from .models import Trace
+from .trace import get_trace_buffer, flush_trace_buffer
+
+# Taille des morceaux de csv encodés renvoyés par ValidationTemplate.iter_validate
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class RowsWriter:
+    """
+    Remplaçant du csv_writer de la validation, qui garde les lignes validées avec leurs types
+    python, plutôt que de les écrire en texte (pour un COPY binaire par exemple)
+    """
+
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, row):
+        """:param row: Ligne validée"""
+        self.rows.append(row)
 
 
 class TraceTemplate:
@@ -74,6 +98,12 @@ class TraceTemplate:
         self.params_dict = params_dict
         self.trace = params_dict.get("trace") or self.initialize()
         self.errors = False
+        self.counts_dict = Counter()
+
+    @property
+    def trace_buffer(self):
+        """Tampon des lignes et des erreurs de la trace, enregistré par self.save()"""
+        return get_trace_buffer(self.trace)
 
     def initialize(self):
         """
@@ -118,24 +148,7 @@ class TraceTemplate:
         :param num_line:        N° de ligne traitée
         :param designation:     Désignation de la ligne à inserrer
         """
-        insertion_dict = {
-            "Create": "cette ligne à bien été créée",
-            "Update": "cette ligne à bien été modifiée",
-            "Errors": "Cette ligne à généré une erreur",
-            "Passed": "Cette ligne n'a pas été traitée",
-            "Unknown": "Cette ligne n'a pas été traitée",
-        }
-        uuid_line_identification = uuid.uuid4()
-        line = Line.objects.create(
-            **{
-                "uuid_identification": uuid_line_identification,
-                "trace": self.trace,
-                "insertion_type": insertion_type,
-                "num_line": num_line,
-                "designation": designation or insertion_dict.get(insertion_type),
-            }
-        )
-        return line
+        return self.trace_buffer.add_line(insertion_type, num_line, designation)
 
     def add_error(self, num_line: str, error: Any):
         """
@@ -170,68 +183,38 @@ class TraceTemplate:
         line = self.add_line(insertion_type="Errors", num_line=num_line)
 
         for attr_name, errors_list in formatted_errors.items():
-
-            Error.objects.bulk_create(
+            self.trace_buffer.add_errors(
+                line,
                 [
-                    Error(
-                        **{
-                            "line": line,
-                            "attr_name": attr_name,
-                            "message": messages_dict.get("message"),
-                            "data_expected": messages_dict.get("data_expected"),
-                            "data_received": messages_dict.get("data_received"),
-                        }
-                    )
+                    {
+                        "attr_name": attr_name,
+                        "message": messages_dict.get("message"),
+                        "data_expected": messages_dict.get("data_expected"),
+                        "data_received": messages_dict.get("data_received"),
+                    }
                     for messages_dict in errors_list
-                ]
+                ],
             )
 
     def save(self):
         """Sauvegarde de l'ensemble de la trace y compris les lignes et les erreurs"""
 
-        # Sauvegarde finale, pour le comptage des differents état des enregistrements
-        create = Count("insertion_type", filter=Q(insertion_type="Create"))
-        update = Count("insertion_type", filter=Q(insertion_type="Update"))
-        errors = Count("insertion_type", filter=Q(insertion_type="Errors"))
-        passed = Count("insertion_type", filter=Q(insertion_type="Passed"))
-        unknown = Count("insertion_type", filter=Q(insertion_type="Unknown"))
-        counts_dict = Line.objects.filter(trace=self.trace.uuid_identification).aggregate(
-            create=create, update=update, errors=errors, passed=passed, unknown=unknown
-        )
+        # Enregistrement des lignes et des erreurs encore dans le tampon
+        trace_buffer = flush_trace_buffer(self.trace)
 
+        if trace_buffer is not None:
+            self.counts_dict.update(trace_buffer.counts_dict)
+
+        # Sauvegarde finale, avec les compteurs des differents état des enregistrements
         self.trace.final_at = timezone.now()
         self.trace.errors = self.errors
-        self.trace.created_numbers_records = counts_dict.get("create")
-        self.trace.updated_numbers_records = counts_dict.get("update")
-        self.trace.errors_numbers_records = counts_dict.get("errors")
-        self.trace.passed_numbers_records = counts_dict.get("passed")
-        self.trace.unknown_numbers_records = counts_dict.get("unknown")
+        self.trace.created_numbers_records = self.counts_dict.get("Create", 0)
+        self.trace.updated_numbers_records = self.counts_dict.get("Update", 0)
+        self.trace.errors_numbers_records = self.counts_dict.get("Errors", 0)
+        self.trace.passed_numbers_records = self.counts_dict.get("Passed", 0)
+        self.trace.unknown_numbers_records = self.counts_dict.get("Unknown", 0)
         self.trace.save()
 
-        # mise à jour des champs de colonnes pour avoir une meilleure indication dans les traces
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-            update data_flux_error err 
-            set file_column = maj.file_column
-            from (
-                select dfe.id, ec.file_column
-                from data_flux_trace dft  
-                join data_flux_line dfl 
-                on dft.uuid_identification = dfl.trace 
-                join data_flux_error dfe 
-                on dfl.uuid_identification = dfe.line 
-                join edi_columndefinition ec  
-                on dft.flow_name = ec.flow_name 
-                and dfe.attr_name = ec.attr_name 
-                where dft.uuid_identification = %(uuid_identification)s
-                and dfe.file_column isnull
-            ) maj
-            where err.id = maj.id
-            """,
-                {"uuid_identification": self.trace.uuid_identification},
-            )
-
 
 class DjangoTrace(TraceTemplate):
     """
@@ -451,6 +434,7 @@ class ValidationTemplate:
         self.first_element = next(iter(dict_flow))
         self.trace = 0
         self.params_dict = params_dict
+        self.error_lines = set()
 
     def _add_line(
         self, insertion_type: str = "Unknown", num_line: int = None, designation: str = None
@@ -492,8 +476,23 @@ class ValidationTemplate:
         """
         raise NotImplementedError
 
-    def validate(self):
-        """Lancement de la validation"""
+    @staticmethod
+    def _get_csv_writer(file_io):
+        """
+        :param file_io: Fichier de type io.StringIO, pour écrire les données cleannées
+        :return: csv_writer des données validées
+        """
+        return csv.writer(
+            file_io,
+            delimiter=";",
+            quotechar='"',
+            lineterminator="\n",
+            quoting=csv.QUOTE_ALL,
+            escapechar='"',
+        )
+
+    def _check_flux_type(self):
+        """Vérifie que le flux de données est bien un flux de dictionnaires"""
         if not isinstance(self.first_element, (dict,)):
             now = pendulum.now().format(r"\du dddd DD MMMM YYYY à HH:MM:SS", locale="fr")
             self._add_error(
@@ -504,28 +503,36 @@ class ValidationTemplate:
                 "doit être un flux de dictionnaires"
             )
 
-        lines = set()
+    def _iter_errors(self, csv_writer):
+        """
+        Validation des lignes une à une par la méthode is_valid
+        :param csv_writer: csv_writer pour écrire les données cleannées
+        :return: Générateur des tuples (n° de ligne, None ou errors)
+        """
+        for num_line, data_dict in enumerate(chain([self.first_element], self.dict_flow), 1):
+            yield num_line, self.is_valid(self.validator_class, data_dict, csv_writer)
+
+    def _iter_lines(self, csv_writer):
+        """
+        Générateur de la validation ligne à ligne, les lignes valides sont écrites dans csv_writer
+        et les n° de lignes en erreur ajoutés à self.error_lines
+        :param csv_writer: csv_writer pour écrire les données cleannées
+        :return: Générateur des n° de lignes validées
+        """
         nb_errors = 0
         nb_errors_max = self.params_dict.get("nb_errors_max", 0)
-        file_io = self.params_dict.get("file_io")
-        csv_writer = csv.writer(
-            file_io,
-            delimiter=";",
-            quotechar='"',
-            lineterminator="\n",
-            quoting=csv.QUOTE_ALL,
-            escapechar='"',
-        )
+
         try:
 
-            for num_line, data_dict in enumerate(chain([self.first_element], self.dict_flow), 1):
-                error_message = self.is_valid(self.validator_class, data_dict, csv_writer)
+            for num_line, error_message in self._iter_errors(csv_writer):
 
                 if error_message:
-                    lines.add(num_line)
+                    self.error_lines.add(num_line)
                     self._add_error(line=num_line, error=error_message)
                     nb_errors += 1
 
+                yield num_line
+
                 # si l'on dépasse le nombre d'erreurs max demandées,
                 # alors on stoppe le contrôle des lignes
                 if nb_errors_max and nb_errors >= nb_errors_max:
@@ -548,7 +555,70 @@ class ValidationTemplate:
         finally:
             self.trace_instance.save()
 
-        return lines
+    def validate(self):
+        """Lancement de la validation"""
+        self._check_flux_type()
+        csv_writer = self._get_csv_writer(self.params_dict.get("file_io"))
+
+        for _ in self._iter_lines(csv_writer):
+            pass
+
+        return self.error_lines
+
+    def iter_validate(self, chunk_size: int = COPY_CHUNK_SIZE, abort_on_errors: bool = False):
+        """
+        Lancement de la validation en mode pipeline : les lignes valides sont encodées en csv
+        utf8 et renvoyées par morceaux d'environ chunk_size octets, au fur et à mesure de la
+        validation. Le csv complet n'existe jamais en mémoire.
+        :param chunk_size:      Taille des morceaux renvoyés
+        :param abort_on_errors: Si True, on arrête de renvoyer des données dès la première erreur,
+                                et une ValidationAbortError est levée en fin de validation,
+                                pour que le COPY qui consomme le générateur soit annulé
+        :return: Générateur de bytes
+        """
+        self._check_flux_type()
+        buffer_io = io.StringIO()
+        csv_writer = self._get_csv_writer(buffer_io)
+
+        for _ in self._iter_lines(csv_writer):
+            if abort_on_errors and self.error_lines:
+                buffer_io.seek(0)
+                buffer_io.truncate()
+
+            elif buffer_io.tell() >= chunk_size:
+                yield buffer_io.getvalue().encode("utf8")
+                buffer_io.seek(0)
+                buffer_io.truncate()
+
+        if abort_on_errors and self.error_lines:
+            raise ValidationAbortError(
+                f"La validation comporte des erreurs aux lignes : {sorted(self.error_lines)}"
+            )
+
+        if buffer_io.tell():
+            yield buffer_io.getvalue().encode("utf8")
+
+    def iter_validate_rows(self, abort_on_errors: bool = False):
+        """
+        Lancement de la validation en mode pipeline, les lignes valides sont renvoyées sous
+        forme de listes de valeurs python, au fur et à mesure de la validation,
+        pour PostgresDjangoUpsert.insertion en mode binary_copy, binary_do_nothing, binary_upsert
+        :param abort_on_errors: Voir iter_validate
+        :return: Générateur de listes
+        """
+        self._check_flux_type()
+        rows_writer = RowsWriter()
+
+        for _ in self._iter_lines(rows_writer):
+            if not (abort_on_errors and self.error_lines):
+                yield from rows_writer.rows
+
+            rows_writer.rows.clear()
+
+        if abort_on_errors and self.error_lines:
+            raise ValidationAbortError(
+                f"La validation comporte des erreurs aux lignes : {sorted(self.error_lines)}"
+            )
 
 
 class DjangoValidation(ValidationTemplate):
@@ -685,6 +755,175 @@ class PydanticValidation(ValidationTemplate):
         return False
 
 
+# Valeur absente du dictionnaire de données à valider
+MISSING = object()
+
+
+class PydanticColumnarValidation(PydanticValidation):
+    """
+    Validation des modèles Pydantic par colonnes, sur des lots de lignes.
+    Dans un fichier, une même colonne a très souvent les mêmes valeurs (dates, tva, fournisseur,
+    codes articles, ...). Plutôt que d'instancier le modèle pour chaque ligne, chaque valeur
+    distincte d'une colonne est validée une seule fois par le champ Pydantic (ModelField.validate),
+    avec les mêmes validateurs que le modèle (troncature, décimaux, dates, booléens, tva, ...).
+    Les erreurs renvoyées sont les mêmes que PydanticValidation, pour PydanticTrace.
+    Si le modèle a des validateurs qui dépendent des autres champs (values ou root_validator),
+    la validation se fait ligne à ligne comme PydanticValidation.
+    """
+
+    batch_size = 5000
+
+    def __init__(
+        self,
+        validators: [
+            [
+                BaseModel,
+                ModelSchema,
+            ],
+            TraceTemplate,
+        ],
+        dict_flow: Dict,
+        params_dict: Dict,
+    ):
+        """
+        :param validators:  Tuple formé d'un Form Validateur et de la class Errors du Validateur
+        :param dict_flow:   Itérable de dict, pour validation par **kwargs
+        :param params_dict: Dictionnaire des paramètres :
+                                params_dict = {
+                                    # Nombre de lignes validées par lot
+                                    "batch_size": 5000,
+                                }
+        """
+        super().__init__(validators, dict_flow, params_dict)
+        self.batch_size = params_dict.get("batch_size") or self.batch_size
+        self.fields = self.validator_class.__fields__
+
+    def is_columnar(self):
+        """
+        :return: True si aucun validateur du modèle ne dépend des autres valeurs de la ligne
+        """
+        if self.validator_class.__pre_root_validators__:
+            return False
+
+        if self.validator_class.__post_root_validators__:
+            return False
+
+        for field in self.fields.values():
+            for class_validator in (field.class_validators or {}).values():
+                parameters = inspect.signature(class_validator.func).parameters
+
+                if "values" in parameters or any(
+                    parameter.kind == parameter.VAR_KEYWORD for parameter in parameters.values()
+                ):
+                    return False
+
+        return True
+
+    def validate_value(self, field, value):
+        """
+        Validation d'une valeur par le champ Pydantic, comme le ferait le modèle
+        :param field: ModelField Pydantic
+        :param value: Valeur à valider
+        :return: Tuple (valeur validée, None ou erreurs)
+        """
+        if value is MISSING:
+            if field.required:
+                return None, ErrorWrapper(MissingError(), loc=field.alias)
+
+            value = field.get_default()
+
+            if not field.validate_always:
+                return value, None
+
+        return field.validate(value, {}, loc=field.alias, cls=self.validator_class)
+
+    def validate_column(self, field, column):
+        """
+        Validation d'une colonne, chaque valeur distincte n'est validée qu'une fois.
+        Les valeurs absentes (MISSING) ne sont pas mémorisées, la valeur par défaut pouvant
+        être générée pour chaque ligne (default_factory : uuid.uuid4, timezone.now, ...)
+        :param field:  ModelField Pydantic
+        :param column: Liste des valeurs de la colonne
+        :return: Liste des tuples (valeur validée, None ou erreurs)
+        """
+        validated_dict = {}
+        results = []
+
+        for value in column:
+            if value is MISSING:
+                results.append(self.validate_value(field, value))
+                continue
+
+            try:
+                key = (value.__class__, value)
+                result = validated_dict.get(key)
+
+                if result is None:
+                    result = validated_dict[key] = self.validate_value(field, value)
+
+            except TypeError:
+                # valeur non hashable
+                result = self.validate_value(field, value)
+
+            results.append(result)
+
+        return results
+
+    def _iter_batch_errors(self, rows, first_num_line, csv_writer):
+        """
+        Validation d'un lot de lignes par colonnes
+        :param rows:            Lot de dictionnaires de données
+        :param first_num_line:  N° de la première ligne du lot
+        :param csv_writer:      csv_writer pour écrire les données cleannées
+        :return: Générateur des tuples (n° de ligne, None ou errors)
+        """
+        columns_dict = {
+            name: self.validate_column(field, [row.get(field.alias, MISSING) for row in rows])
+            for name, field in self.fields.items()
+        }
+        include = self.validator_class.Config.include
+
+        for i, data_dict in enumerate(rows):
+            errors = [
+                results[i][1] for results in columns_dict.values() if results[i][1] is not None
+            ]
+
+            if errors:
+                validation_error = pydantic.ValidationError(errors, self.validator_class)
+                yield first_num_line + i, (validation_error.errors(), data_dict)
+                continue
+
+            csv_writer.writerow(
+                [
+                    columns_dict[key][i][0] if key in columns_dict else None
+                    for key in include
+                ]
+            )
+            yield first_num_line + i, None
+
+    def _iter_errors(self, csv_writer):
+        """
+        Validation des lignes par lots de self.batch_size lignes
+        :param csv_writer: csv_writer pour écrire les données cleannées
+        :return: Générateur des tuples (n° de ligne, None ou errors)
+        """
+        if not self.is_columnar():
+            yield from super()._iter_errors(csv_writer)
+            return
+
+        rows = chain([self.first_element], self.dict_flow)
+        first_num_line = 1
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+
+            if not batch:
+                break
+
+            yield from self._iter_batch_errors(batch, first_num_line, csv_writer)
+            first_num_line += len(batch)
+
+
 class Validation:
     """
     Validation des modèles de données à intégrer en base
@@ -733,10 +972,12 @@ class Validation:
                                     # non implémenté pour le moment
                                     "foreign_key": ("attr_01", "attr_01", ....)
 
-                                    # tuple des class de ValidationTemplate et TraceTemplate
+                                    # tuple des class de ValidationTemplate et TraceTemplate,
+                                    # prioritaire sur le choix par le type de validator
                                     "validation": (ValidationTemplate, TraceTemplate)
 
                                     # Fichier de type io.StringIO, pour écrire les données cleannées
+                                    # inutile si l'on utilise iter_validate
                                     "file_io": file_io
                                 }
         """
@@ -768,7 +1009,7 @@ class Validation:
     def get_validation_instance(self):
         """Instancie le validateur désiré"""
 
-        if self.validator is None:
+        if self.validator is None or self.params_dict.get("validation") is not None:
             validation_test = self.params_dict.get("validation")
 
             if not isinstance(validation_test, (tuple, list)) and len(validation_test) != 2:
@@ -817,3 +1058,25 @@ class Validation:
         self.params_dict.get("file_io").seek(0)
         error_lines = self.to_validate.validate()
         return error_lines
+
+    def iter_validate(self, chunk_size: int = COPY_CHUNK_SIZE, abort_on_errors: bool = False):
+        """
+        Lancement de la validation en mode pipeline, voir ValidationTemplate.iter_validate
+        :param chunk_size:      Taille des morceaux renvoyés
+        :param abort_on_errors: Lève une exception en fin de validation s'il y a des erreurs
+        :return: Générateur des lignes validées en csv, encodées en bytes
+        """
+        yield from self.to_validate.iter_validate(chunk_size, abort_on_errors)
+
+    def iter_validate_rows(self, abort_on_errors: bool = False):
+        """
+        Lancement de la validation en mode pipeline, voir ValidationTemplate.iter_validate_rows
+        :param abort_on_errors: Lève une exception en fin de validation s'il y a des erreurs
+        :return: Générateur des lignes validées, avec leurs types python
+        """
+        yield from self.to_validate.iter_validate_rows(abort_on_errors)
+
+    @property
+    def error_lines(self):
+        """:return: Les n° de lignes en erreur"""
+        return self.to_validate.error_lines
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EdiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.edi'
+
+    def ready(self):
+        # Enregistrement des signaux d'invalidation des caches
+        from apps.edi import signals  # noqa: F401
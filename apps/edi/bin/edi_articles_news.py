@@ -8,13 +8,13 @@ Commentaire:
 created at: 2023-03-18
 created by: Paulo ALVES
 
-modified at: 2023-03-18
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 import os
 import platform
 import sys
-from typing import AnyStr, Tuple
+from typing import List
 
 import django
 
@@ -243,47 +243,89 @@ SQL_AXE_RFA = """
 """
 
 
-def get_famillly_edi_ediimport_new_articles(cursor: connection.cursor) -> Tuple:
-    """Renvoie le nom des statitsiques à appliquer aux articles importés
-    dans edi_edi_import non présents dans la table articles pour les codifier
-    avec les valeurs de stats codifiées
+def get_family_axes_matches(cursor: connection.cursor) -> List:
+    """Renvoie, pour les articles importés dans edi_edi_import non présents dans la table
+    articles, la première règle de book_supplierfamilyaxes (par id) de la stat du tiers dont
+    REGEXP_MATCHES("famille", "regex_match") est égal au résultat attendu.
+    Chaque couple (stat, famille) distinct n'est évalué qu'une fois, en une seule requête,
+    les regex restant évaluées par postgresql (ARE)
     :param cursor: cursor de connection psycopg2 django
-    :return: La liste des (tiers, nom_stat, to_regex) pour les articles dans edi_ediimport
-             non présents dans la table article
+    :return: La liste des (tiers, famille, id book_supplierfamilyaxes)
     """
-    sql_stats = """
-    select 
-        "ee"."third_party_num", 
-        "bs"."stat_name"
-    from "book_society" "bs"
-    join "book_statfamillyaxes" "bs2"
-    on "bs"."stat_name"= "bs2"."name"
-    join "edi_ediimport" "ee"
-    on "bs"."third_party_num"= "ee"."third_party_num"
-    where not exists (
+    sql_matches = """
+    with "fam" as (
         select 
-            1 
-         from "articles_article" "aa"
-        where "aa"."third_party_num"= "ee"."third_party_num"
-          and "aa"."reference"= "ee"."reference_article"
-    ) 
-    group by 
-        "ee"."third_party_num", 
-        "bs"."stat_name", 
-        "bs2"."regex_bool"
+            "ee"."third_party_num", 
+            "bs"."stat_name",
+            "ee"."famille"
+        from "book_society" "bs"
+        join "book_statfamillyaxes" "bs2"
+        on "bs"."stat_name"= "bs2"."name"
+        join "edi_ediimport" "ee"
+        on "bs"."third_party_num"= "ee"."third_party_num"
+        where not exists (
+            select 
+                1 
+             from "articles_article" "aa"
+            where "aa"."third_party_num"= "ee"."third_party_num"
+              and "aa"."reference"= "ee"."reference_article"
+        ) 
+        and "ee"."famille" is not null
+        group by 
+            "ee"."third_party_num", 
+            "bs"."stat_name", 
+            "ee"."famille"
+    ), 
+    "stat_fam" as (
+        select 
+            "pairs"."stat_name",
+            "pairs"."famille",
+            (
+                select 
+                    "sfa"."id"
+                from "book_supplierfamilyaxes" "sfa"
+                where "sfa"."stat_name" = "pairs"."stat_name"
+                  and exists (
+                    select 
+                        1 
+                    from regexp_matches("pairs"."famille", "sfa"."regex_match") as "rm"("matches")
+                    where "rm"."matches" = string_to_array("sfa"."expected_result", ',')
+                  )
+                order by "sfa"."id"
+                limit 1
+            ) as "stat_id"
+        from (
+            select distinct 
+                "stat_name", 
+                "famille" 
+            from "fam"
+        ) "pairs"
+    )
+    select 
+        "fam"."third_party_num",
+        "fam"."famille",
+        "stat_fam"."stat_id"
+    from "fam"
+    join "stat_fam"
+    on "stat_fam"."stat_name" = "fam"."stat_name"
+    and "stat_fam"."famille" = "fam"."famille"
+    where "stat_fam"."stat_id" is not null
     """
-    cursor.execute(sql_stats)
+    cursor.execute(sql_matches)
     return cursor.fetchall()
 
 
-def set_stat_definitions(third_party_num: AnyStr, stat_name: AnyStr, cursor: connection.cursor):
+def set_stat_definitions(families_list: List, cursor: connection.cursor):
     """
-    Set les stats à appliquer pour les articles non présents dans la table articles
-    :param third_party_num: Tiers X3
-    :param stat_name: nom de la stat
+    Set les stats à appliquer pour les articles non présents dans la table articles,
+    en une seule requête pour l'ensemble des tiers
+    :param families_list: liste des (tiers, famille, id book_supplierfamilyaxes)
     :param cursor: cursor de connection psycopg2 django
     :return:
     """
+    if not families_list:
+        return
+
     sql_set_stat = """
     update edi_ediimport edi
     set 
@@ -297,97 +339,69 @@ def set_stat_definitions(third_party_num: AnyStr, stat_name: AnyStr, cursor: con
                           and "acs"."section" = 'REFAC0'
                         limit 1
                     )
-                    else "req_stat"."axe_bu"
+                    else "req_stat"."default_axe_bu"
                    end,
-        "axe_prj" = "req_stat"."axe_prj",
+        "axe_prj" = "req_stat"."default_axe_prj",
         "axe_pro" = "req_stat"."axe_pro",
-        "axe_pys" = "req_stat"."axe_pys",
-        "axe_rfa" = "req_stat"."axe_rfa",
+        "axe_pys" = "req_stat"."default_axe_pys",
+        "axe_rfa" = "req_stat"."default_axe_rfa",
         "uuid_big_category" = "req_stat"."uuid_big_category",
         "uuid_sub_big_category" = "req_stat"."uuid_sub_big_category",
         "customs_code" = "req_stat"."customs_code",
         "item_weight" = "req_stat"."item_weight",
         "unit_weight" = "req_stat"."unit_weight"
     from (
-        select distinct
-            "third_party_num", 
-            "reference_article", 
-            (select "axe_bu" from "parameters_defaultaxearticle" "pd" limit 1) as "axe_bu",
-            (select "axe_prj" from "parameters_defaultaxearticle" "pd" limit 1) as "axe_prj",
-            (select "axe_pys"  from "parameters_defaultaxearticle" "pd" limit 1) as "axe_pys",
-            (select "axe_rfa"  from "parameters_defaultaxearticle" "pd" limit 1) as "axe_rfa",
-            "axe_pro",
-            "uuid_big_category",
-            "uuid_sub_big_category",
-            "customs_code",
-            "item_weight",
-            "unit_weight",
-            "bool_stat"
-        from (
+        select 
+            "fam"."third_party_num", 
+            "fam"."famille", 
+            "pd"."axe_bu" as "default_axe_bu",
+            "pd"."axe_prj" as "default_axe_prj",
+            "pd"."axe_pys" as "default_axe_pys",
+            "pd"."axe_rfa" as "default_axe_rfa",
+            "bs"."axe_pro",
+            "bs"."uuid_big_category",
+            "bs"."uuid_sub_big_category",
+            "bs"."customs_code",
+            "bs"."item_weight",
+            "bs"."unit_weight"
+        from unnest(
+            %(third_party_nums)s::varchar[], 
+            %(familles)s::varchar[], 
+            %(stat_ids)s::integer[]
+        ) as "fam"("third_party_num", "famille", "stat_id")
+        join "book_supplierfamilyaxes" "bs" 
+        on "bs"."id" = "fam"."stat_id"
+        left join (
             select 
-                "third_party_num", 
-                "reference_article", 
-                "famille",
-                "stat"."regex_match" as "regex_match",
-                "stat"."expected_result" as "expected_result",
-                REGEXP_MATCHES("famille", "stat"."regex_match")::text[] as "re_match",
-                (
-                    REGEXP_MATCHES("famille", "stat"."regex_match")::text[] 
-                    = 
-                    string_to_array("stat"."expected_result", ',')
-                ) as "bool_stat",
-                "axe_pro",
-                "stat"."uuid_big_category",
-                "stat"."uuid_sub_big_category",
-                "stat"."customs_code",
-                "stat"."item_weight",
-                "stat"."unit_weight"
-            from (
-                select 
-                    "ee"."third_party_num", 
-                    "ee"."reference_article", 
-                    "ee"."famille" 
-                from "edi_ediimport" "ee" 
-                left join "articles_article" "aa" 
-                on "ee"."reference_article" = "aa"."reference" 
-                and "ee"."third_party_num" = "aa"."third_party_num"
-                where "aa"."reference" is null
-                and "ee"."third_party_num" = %(third_party_num)s
-                group by "ee"."third_party_num" , 
-                         "ee"."reference_article", 
-                         "ee"."famille"
-            ) "edi",
-            (
-                select 
-                    "regex_match",
-                    "expected_result",
-                    "axe_pro",
-                    "uuid_big_category",
-                    "uuid_sub_big_category",
-                    "customs_code",
-                    "item_weight",
-                    "unit_weight"
-                from "book_supplierfamilyaxes" "bs" 
-                where "stat_name" = %(stat_name)s
-            ) "stat"
-         ) "req_match"
-         group by     
-            "third_party_num", 
-            "reference_article", 
-            "axe_pro",
-            "uuid_big_category",
-            "uuid_sub_big_category",
-            "customs_code",
-            "item_weight",
-            "unit_weight",
-            "bool_stat"
-         having "bool_stat" = true
+                "axe_bu", 
+                "axe_prj", 
+                "axe_pys", 
+                "axe_rfa" 
+            from "parameters_defaultaxearticle" 
+            limit 1
+        ) "pd"
+        on true
     ) req_stat
     where "edi"."third_party_num" = "req_stat"."third_party_num"
-      and "edi"."reference_article" = "req_stat"."reference_article"
+      and "edi"."famille" = "req_stat"."famille"
+      and not exists (
+        select 
+            1 
+        from "articles_article" "aa"
+        where "aa"."third_party_num" = "edi"."third_party_num"
+          and "aa"."reference" = "edi"."reference_article"
+      )
     """
-    cursor.execute(sql_set_stat, {"third_party_num": third_party_num, "stat_name": stat_name})
-    # print(f"fin stat_definitions : {third_party_num} - {stat_name} : {cursor.rowcount}")
+    third_party_nums, familles, stat_ids = zip(*families_list)
+    cursor.execute(
+        sql_set_stat,
+        {
+            "third_party_nums": list(third_party_nums),
+            "familles": list(familles),
+            "stat_ids": list(stat_ids),
+        },
+    )
+    # print(f"fin stat_definitions : {cursor.rowcount}")
 
 
 def insert_new_articles(cursor: connection.cursor):
@@ -571,10 +585,8 @@ def set_axes_with_regex() -> None:
     :return: None
     """
     with connection.cursor() as cursor:
-        get_families = get_famillly_edi_ediimport_new_articles(cursor)
-
-        for third, stat in get_families:
-            set_stat_definitions(third, stat, cursor)
+        families_list = get_family_axes_matches(cursor)
+        set_stat_definitions(families_list, cursor)
 
         insert_new_articles(cursor)
         set_edi_ediimport_articles(cursor)
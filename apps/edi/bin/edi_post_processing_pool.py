@@ -1,21 +1,29 @@
-# pylint: disable=E0401,C0303,E1101,R0915,R0914
+# pylint: disable=E0401,C0303,E1101,R0915,R0914,W0703,W1203
 """
 FR : Module de post-traitement avant import des fichiers de factures fournisseur
 EN : Post-processing module before importing supplier invoice files
 
 Commentaire:
+    Les requêtes de post-traitement sont filtrées par = %(uuid_identification)s.
+    Lors des imports celery, les post-traitements de chaque fichier sont différés et regroupés
+    dans le callback du chord, chaque requête n'est alors lancée qu'une fois par flux
+    avec "uuid_identification" = ANY(%(uuids)s), pour toutes les traces du flux.
 
 created at: 2022-04-10
 created by: Paulo ALVES
 
-modified at: 2022-04-10
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
-from typing import AnyStr
+from typing import AnyStr, Callable, Dict, List, Set, Union
+from contextlib import contextmanager
+import json
 
+from psycopg2 import sql
 from django.db import connection
 from django.db.models import Q, Count
 
+from heron.loggers import LOGGER_EDI
 from apps.edi.models import EdiImport
 from apps.data_flux.models import Trace
 from apps.edi.bin.duplicates_check import (
@@ -53,6 +61,110 @@ from apps.edi.sql_files.sql_z_bu_refac import post_z_bu_refac
 
 from apps.users.models import User
 
+# Requêtes de post-traitement converties pour une liste de traces,
+# par id de la requête d'origine : (requête d'origine, requête convertie)
+BATCH_SQL_DICT = {}
+
+# Post-traitements différés de la tâche en cours, None hors mode différé
+POST_INSERTS_DICT = {"deferred": None}
+
+
+def get_uuids_list(uuid_identification: Union[AnyStr, List]) -> List:
+    """Renvoie la liste des uuid_identification à traiter
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
+    """
+    if isinstance(uuid_identification, (list, tuple)):
+        return [str(uuid) for uuid in uuid_identification]
+
+    return [str(uuid_identification)]
+
+
+def rewrite_batch_sql(
+    statement: Union[AnyStr, sql.Composable]
+) -> Union[AnyStr, sql.Composable]:
+    """Réécrit la requête pour une liste de traces, les sql.Composed sont réécrits
+    récursivement dans leurs parties
+    :param statement: requête filtrée par = %(uuid_identification)s
+    :return: requête filtrée par = ANY(%(uuids)s::uuid[])
+    """
+    if isinstance(statement, sql.Composed):
+        return sql.Composed([rewrite_batch_sql(part) for part in statement.seq])
+
+    if isinstance(statement, sql.SQL):
+        return sql.SQL(rewrite_batch_sql(statement.string))
+
+    if isinstance(statement, str):
+        return statement.replace("= %(uuid_identification)s", "= ANY(%(uuids)s::uuid[])")
+
+    # sql.Identifier, sql.Literal, sql.Placeholder
+    return statement
+
+
+def get_batch_sql(
+    statement: Union[AnyStr, sql.Composable]
+) -> Union[AnyStr, sql.Composable]:
+    """Renvoie la requête filtrée sur une liste de traces au lieu d'une seule
+    :param statement: requête filtrée par = %(uuid_identification)s
+    :return: requête filtrée par = ANY(%(uuids)s::uuid[])
+    """
+    # Les sql.Composable ne sont pas hashables, les requêtes sont en cache par id
+    cached_statement, batch_statement = BATCH_SQL_DICT.get(id(statement), (None, None))
+
+    if cached_statement is not statement:
+        batch_statement = rewrite_batch_sql(statement)
+        BATCH_SQL_DICT[id(statement)] = (statement, batch_statement)
+
+    return batch_statement
+
+
+def execute_post_sql(
+    cursor: connection.cursor,
+    statement: Union[AnyStr, sql.Composable],
+    uuid_identification: Union[AnyStr, List],
+    **params: Dict,
+):
+    """Exécute la requête de post-traitement pour une trace, ou pour une liste de traces
+    :param cursor: cursor django
+    :param statement: requête filtrée par = %(uuid_identification)s
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
+    :param params: autres paramètres de la requête
+    """
+    if isinstance(uuid_identification, (list, tuple)):
+        cursor.execute(
+            get_batch_sql(statement),
+            {"uuids": get_uuids_list(uuid_identification), **params},
+        )
+    else:
+        cursor.execute(statement, {"uuid_identification": uuid_identification, **params})
+
+
+@contextmanager
+def deferred_post_inserts():
+    """Contexte dans lequel les post-traitements lancés par post_insert sont différés,
+    renvoie la liste des post-traitements à passer à run_post_inserts
+    """
+    POST_INSERTS_DICT["deferred"] = deferred_list = []
+
+    try:
+        yield deferred_list
+    finally:
+        POST_INSERTS_DICT["deferred"] = None
+
+
+def post_insert(function: Callable, uuid_identification: AnyStr, **kwargs: Dict):
+    """Lance le post-traitement de la trace, ou l'enregistre pour un traitement groupé
+    si l'on est dans un contexte deferred_post_inserts
+    :param function: fonction de post-traitement du flux
+    :param uuid_identification: uuid_identification de la trace
+    :param kwargs: autres paramètres de la fonction
+    """
+    deferred_list = POST_INSERTS_DICT.get("deferred")
+
+    if deferred_list is None:
+        function(uuid_identification, **kwargs)
+    else:
+        deferred_list.append((function.__name__, str(uuid_identification), kwargs))
+
 
 def get_user_automate():
     """Recuperation de l'uuid de l'automate"""
@@ -133,7 +245,7 @@ def post_vacuum():
         cursor.execute("VACUUM (full)")
 
 
-def post_general(uuid_identification: AnyStr, cursor: connection.cursor):
+def post_general(uuid_identification: Union[AnyStr, List], cursor: connection.cursor):
     """Mise à jour générale pour tous les founrnisseurs"""
     sql_round_amount = post_common_dict.get("sql_round_amount")
     sql_supplier_update = post_common_dict.get("sql_supplier_update")
@@ -157,37 +269,36 @@ def post_general(uuid_identification: AnyStr, cursor: connection.cursor):
     sql_purchase_vat_cee = post_common_dict.get("sql_purchase_vat_cee")
     sql_validate = post_common_dict.get("sql_validate")
 
-    cursor.execute(sql_round_amount, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_supplier_update, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_supplier_name_update, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_fac_update_except_edi, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_reference, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_cct, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_is_multi_store_true, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_is_multi_store_false, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_update_articles, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_alls_381, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_vat_regime, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-    cursor.execute(vat_per_line, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_delta_vat, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_none, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_delivery_number, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_signboard, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_center, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_import_uuid_identification, {"uuid_identification": uuid_identification})
-    cursor.execute(sql_purchase_vat_cee, {"uuid_identification": uuid_identification})
-    cursor.execute(
-        sql_validate,
-        {"uuid_identification": uuid_identification, "created_by": get_user_automate()},
+    execute_post_sql(cursor, sql_round_amount, uuid_identification)
+    execute_post_sql(cursor, sql_supplier_update, uuid_identification)
+    execute_post_sql(cursor, sql_supplier_name_update, uuid_identification)
+    execute_post_sql(cursor, sql_fac_update_except_edi, uuid_identification)
+    execute_post_sql(cursor, sql_reference, uuid_identification)
+    execute_post_sql(cursor, sql_cct, uuid_identification)
+    execute_post_sql(cursor, sql_is_multi_store_true, uuid_identification)
+    execute_post_sql(cursor, sql_is_multi_store_false, uuid_identification)
+    execute_post_sql(cursor, sql_update_articles, uuid_identification)
+    execute_post_sql(cursor, sql_alls_381, uuid_identification)
+    execute_post_sql(cursor, sql_vat_regime, uuid_identification)
+    execute_post_sql(cursor, sql_vat, uuid_identification)
+    execute_post_sql(cursor, vat_per_line, uuid_identification)
+    execute_post_sql(cursor, sql_delta_vat, uuid_identification)
+    execute_post_sql(cursor, sql_none, uuid_identification)
+    execute_post_sql(cursor, sql_delivery_number, uuid_identification)
+    execute_post_sql(cursor, sql_signboard, uuid_identification)
+    execute_post_sql(cursor, sql_center, uuid_identification)
+    execute_post_sql(cursor, sql_import_uuid_identification, uuid_identification)
+    execute_post_sql(cursor, sql_purchase_vat_cee, uuid_identification)
+    execute_post_sql(
+        cursor, sql_validate, uuid_identification, created_by=get_user_automate()
     )
 
 
-def bulk_post_insert(uuid_identification: AnyStr):
+def bulk_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier BBGR Bulk
     et rajout des lignes de port et d'emballage en EMB et PORT en créant des lignes
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     charges_dict = {
         "packaging_amount": "EMBALLAGE",
@@ -200,7 +311,7 @@ def bulk_post_insert(uuid_identification: AnyStr):
     # Ajout des lignes de packaging pour la facture concernée ======================================
     packaging_amount_dict = (
         EdiImport.objects.filter(Q(valid=False) | Q(valid__isnull=True))
-        .filter(uuid_identification=uuid_identification)
+        .filter(uuid_identification__in=get_uuids_list(uuid_identification))
         .values("invoice_number", "uuid_identification", *list(charges_dict))
         .annotate(dcount=Count("invoice_number"))
     )
@@ -275,51 +386,51 @@ def bulk_post_insert(uuid_identification: AnyStr):
     sql_update = post_bulk_dict.get("sql_update")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def cosium_post_insert(uuid_identification: AnyStr):
+def cosium_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Opto33 EDI
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_ttc_a_zero = post_cosium_dict.get("sql_ttc_a_zero")
     sql_totaux = post_cosium_dict.get("sql_totaux")
     sql_familles = post_cosium_dict.get("sql_familles")
     sql_origin = post_cosium_dict.get("sql_origin")
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_ttc_a_zero, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_familles, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_origin, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_totaux, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_ttc_a_zero, uuid_identification)
+        execute_post_sql(cursor, sql_familles, uuid_identification)
+        execute_post_sql(cursor, sql_origin, uuid_identification)
+        execute_post_sql(cursor, sql_totaux, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def cosium_achats_post_insert(uuid_identification: AnyStr):
+def cosium_achats_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Opto33 EDI
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_ttc_a_zero = post_cosium_achats_dict.get("sql_ttc_a_zero")
     sql_totaux = post_cosium_achats_dict.get("sql_totaux")
     sql_familles = post_cosium_achats_dict.get("sql_familles")
     sql_origin = post_cosium_achats_dict.get("sql_origin")
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_ttc_a_zero, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_familles, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_origin, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_totaux, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_ttc_a_zero, uuid_identification)
+        execute_post_sql(cursor, sql_familles, uuid_identification)
+        execute_post_sql(cursor, sql_origin, uuid_identification)
+        execute_post_sql(cursor, sql_totaux, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def tansferts_cosium_post_insert(uuid_identification: AnyStr):
+def tansferts_cosium_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Opto33 EDI
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_code_maison = post_transfert_cosium_dict.get("sql_code_maison")
     sql_amounts = post_transfert_cosium_dict.get("sql_amounts")
@@ -327,19 +438,19 @@ def tansferts_cosium_post_insert(uuid_identification: AnyStr):
     sql_articles_cosium_acuitis = post_transfert_cosium_dict.get("sql_articles_cosium_acuitis")
     sql_articles_base_cosium = post_transfert_cosium_dict.get("sql_articles_base_cosium")
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_code_maison, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_amounts, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_articles_cosium, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_articles_cosium_acuitis, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_articles_base_cosium, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_code_maison, uuid_identification)
+        execute_post_sql(cursor, sql_amounts, uuid_identification)
+        execute_post_sql(cursor, sql_articles_cosium, uuid_identification)
+        execute_post_sql(cursor, sql_articles_cosium_acuitis, uuid_identification)
+        execute_post_sql(cursor, sql_articles_base_cosium, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def edi_post_insert(uuid_identification: AnyStr):
+def edi_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Opto33 EDI
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
 
     sql_col_essilor = post_edi_dict.get("sql_col_essilor")
@@ -348,11 +459,11 @@ def edi_post_insert(uuid_identification: AnyStr):
     sql_fac_update_edi = post_edi_dict.get("sql_fac_update_edi")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_col_essilor, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_tva, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_precilens, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_fac_update_edi, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_col_essilor, uuid_identification)
+        execute_post_sql(cursor, sql_tva, uuid_identification)
+        execute_post_sql(cursor, sql_precilens, uuid_identification)
+        execute_post_sql(cursor, sql_fac_update_edi, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
@@ -367,94 +478,94 @@ def edi_trace_supplier_insert():
         edi_flow = cursor.fetchall()
 
         for (uuid_identification,) in edi_flow:
-            cursor.execute(sql_edi_generique, {"uuid_identification": uuid_identification})
+            execute_post_sql(cursor, sql_edi_generique, uuid_identification)
 
 
-def bbgr_statment_post_insert(uuid_identification: AnyStr):
+def bbgr_statment_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier BBGR Statment
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_vat = bbgr_002_statment_dict.get("sql_vat")
     sql_familles = bbgr_002_statment_dict.get("sql_familles")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_familles, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_vat, uuid_identification)
+        execute_post_sql(cursor, sql_familles, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def bbgr_monthly_post_insert(uuid_identification: AnyStr):
+def bbgr_monthly_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier BBGR Statment
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_vat = bbgr_003_monthly_dict.get("sql_vat")
     sql_familles = bbgr_002_statment_dict.get("sql_familles")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_familles, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_vat, uuid_identification)
+        execute_post_sql(cursor, sql_familles, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def bbgr_retours_post_insert(uuid_identification: AnyStr):
+def bbgr_retours_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier BBGR Statment
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_vat = bbgr_004_retours_dict.get("sql_vat")
     sql_vat_amount = bbgr_004_retours_dict.get("sql_vat_amount")
     sql_total_amount_by_invoices = bbgr_004_retours_dict.get("sql_total_amount_by_invoices")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat_amount, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_total_amount_by_invoices, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_vat, uuid_identification)
+        execute_post_sql(cursor, sql_vat_amount, uuid_identification)
+        execute_post_sql(cursor, sql_total_amount_by_invoices, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def bbgr_reception_post_insert(uuid_identification: AnyStr):
+def bbgr_reception_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier BBGR Statment
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_vat = bbgr_005_receptions_dict.get("sql_vat")
     sql_vat_amount = bbgr_005_receptions_dict.get("sql_vat_amount")
     sql_total_amount_by_invoices = bbgr_005_receptions_dict.get("sql_total_amount_by_invoices")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat_amount, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_total_amount_by_invoices, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_vat, uuid_identification)
+        execute_post_sql(cursor, sql_vat_amount, uuid_identification)
+        execute_post_sql(cursor, sql_total_amount_by_invoices, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def eye_confort_post_insert(uuid_identification: AnyStr):
+def eye_confort_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier EyeConfort
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_eye_dict.get("sql_update")
     sql_update_units = post_eye_dict.get("sql_update_units")
     sql_familles = post_eye_dict.get("sql_familles")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_units, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_familles, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_update_units, uuid_identification)
+        execute_post_sql(cursor, sql_familles, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def generique_post_insert(uuid_identification: AnyStr, post=None):
+def generique_post_insert(uuid_identification: Union[AnyStr, List], post=None):
     """
     Mise à jour des champs vides à l'import du fichier EyeConfort
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     :param post: si l'on veut appliquer le post général
     """
     sql_update = post_generic_dict.get("sql_update")
@@ -465,162 +576,162 @@ def generique_post_insert(uuid_identification: AnyStr, post=None):
     sql_edi_generique = post_generic_dict.get("sql_edi_generique")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_net_amount_mgdev, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-        # cursor.execute(sql_maison, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_mg_developpemnt, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_edi_generique, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_net_amount_mgdev, uuid_identification)
+        execute_post_sql(cursor, sql_vat, uuid_identification)
+        # execute_post_sql(cursor, sql_maison, uuid_identification)
+        execute_post_sql(cursor, sql_mg_developpemnt, uuid_identification)
+        execute_post_sql(cursor, sql_edi_generique, uuid_identification)
 
         if post is None:
             post_general(uuid_identification, cursor)
 
 
-def generique_post_insert_internal(uuid_identification: AnyStr):
+def generique_post_insert_internal(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier EyeConfort
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_vat = post_generic_internal_dict.get("sql_vat")
     sql_update = post_generic_internal_dict.get("sql_update")
     sql_update_bu = post_generic_internal_dict.get("sql_update_bu")
 
     with connection.cursor() as cursor:
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_bu, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, sql_vat, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_update_bu, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def hearing_post_insert(uuid_identification: AnyStr):
+def hearing_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Hearing
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_hearing_dict.get("sql_update")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def interson_post_insert(uuid_identification: AnyStr):
+def interson_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Interson
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_interson_dict.get("sql_update")
     sql_bl_date = post_interson_dict.get("sql_bl_date")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_bl_date, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_bl_date, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def johnson_post_insert(uuid_identification: AnyStr):
+def johnson_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier JOHNSON
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_johnson_dict.get("sql_update")
     sql_update_vat_rate = post_johnson_dict.get("sql_update_vat_rate")
     sql_update_units = post_johnson_dict.get("sql_update_units")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_vat_rate, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_units, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_update_vat_rate, uuid_identification)
+        execute_post_sql(cursor, sql_update_units, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def lmc_post_insert(uuid_identification: AnyStr):
+def lmc_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier LMC
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_lmc_dict.get("sql_update")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def newson_post_insert(uuid_identification: AnyStr):
+def newson_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier NEWSON
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_newson_dict.get("sql_update")
     sql_round_net_amount = post_newson_dict.get("sql_round_net_amount")
     sql_net_amount = post_newson_dict.get("sql_net_amount")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_round_net_amount, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_net_amount, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_round_net_amount, uuid_identification)
+        execute_post_sql(cursor, sql_net_amount, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def phonak_post_insert(uuid_identification: AnyStr):
+def phonak_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Phonak
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_phonak_dict.get("sql_update")
     sql_net_amount = post_phonak_dict.get("sql_net_amount")
     sql_mulitiple_dates = post_phonak_dict.get("sql_mulitiple_dates")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_net_amount, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_mulitiple_dates, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_net_amount, uuid_identification)
+        execute_post_sql(cursor, sql_mulitiple_dates, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def prodition_post_insert(uuid_identification: AnyStr):
+def prodition_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier Prodition
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_libele = post_prodition_dict.get("sql_libele")
     sql_update = post_prodition_dict.get("sql_update")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_libele, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_libele, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def signia_post_insert(uuid_identification: AnyStr):
+def signia_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier SIGNA
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_signia_dict.get("sql_update")
     sql_update_units = post_signia_dict.get("sql_update_units")
     sql_update_bl = post_signia_dict.get("sql_update_bl")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_units, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_bl, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_update_units, uuid_identification)
+        execute_post_sql(cursor, sql_update_bl, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def starkey_post_insert(uuid_identification: AnyStr):
+def starkey_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier NEWSON
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_starkey_dict.get("sql_update")
     sql_copie_envoi_depot = post_starkey_dict.get("sql_copie_envoi_depot")
@@ -628,50 +739,50 @@ def starkey_post_insert(uuid_identification: AnyStr):
     sql_update_units = post_starkey_dict.get("sql_update_units")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_copie_envoi_depot, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_delete_envoi_depot, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_units, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_copie_envoi_depot, uuid_identification)
+        execute_post_sql(cursor, sql_delete_envoi_depot, uuid_identification)
+        execute_post_sql(cursor, sql_update_units, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def technidis_post_insert(uuid_identification: AnyStr):
+def technidis_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier NEWSON
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_technidis_dict.get("sql_update")
     sql_update_units = post_technidis_dict.get("sql_update_units")
     sql_net_amount = post_technidis_dict.get("sql_net_amount")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_units, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_net_amount, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_update_units, uuid_identification)
+        execute_post_sql(cursor, sql_net_amount, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def unitron_post_insert(uuid_identification: AnyStr):
+def unitron_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier NEWSON
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_unitron_dict.get("sql_update")
     sql_mulitiple_dates = post_unitron_dict.get("sql_mulitiple_dates")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_mulitiple_dates, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_mulitiple_dates, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def widex_post_insert(uuid_identification: AnyStr):
+def widex_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier WIDEX
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_widex_dict.get("sql_update")
     sql_update_units = post_widex_dict.get("sql_update_units")
@@ -680,27 +791,27 @@ def widex_post_insert(uuid_identification: AnyStr):
     sql_marque = post_widex_dict.get("sql_marque")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update_units, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_invoices_amounts, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_articles_wsau, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_marque, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_update_units, uuid_identification)
+        execute_post_sql(cursor, sql_invoices_amounts, uuid_identification)
+        execute_post_sql(cursor, sql_articles_wsau, uuid_identification)
+        execute_post_sql(cursor, sql_marque, uuid_identification)
         post_general(uuid_identification, cursor)
 
 
-def widexga_post_insert(uuid_identification: AnyStr):
+def widexga_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier WIDEX GA
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     widex_post_insert(uuid_identification)
 
 
-def z_bu_refac_post_insert(uuid_identification: AnyStr):
+def z_bu_refac_post_insert(uuid_identification: Union[AnyStr, List]):
     """
     Mise à jour des champs vides à l'import du fichier issu de la requête Sage pour la BU REFAC0
-    :param uuid_identification: uuid_identification
+    :param uuid_identification: uuid_identification, ou liste des uuid_identification
     """
     sql_update = post_z_bu_refac.get("sql_update")
     sql_piece = post_z_bu_refac.get("sql_piece")
@@ -708,9 +819,70 @@ def z_bu_refac_post_insert(uuid_identification: AnyStr):
     sql_vat = post_z_bu_refac.get("sql_vat")
 
     with connection.cursor() as cursor:
-        cursor.execute(SQL_QTY, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_update, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_piece, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_name, {"uuid_identification": uuid_identification})
-        cursor.execute(sql_vat, {"uuid_identification": uuid_identification})
+        execute_post_sql(cursor, SQL_QTY, uuid_identification)
+        execute_post_sql(cursor, sql_update, uuid_identification)
+        execute_post_sql(cursor, sql_piece, uuid_identification)
+        execute_post_sql(cursor, sql_name, uuid_identification)
+        execute_post_sql(cursor, sql_vat, uuid_identification)
         post_general(uuid_identification, cursor)
+
+
+# Fonctions de post-traitement pouvant être différées, par nom
+POST_INSERT_FUNCTIONS_DICT = {
+    function.__name__: function
+    for function in (
+        bulk_post_insert,
+        cosium_post_insert,
+        cosium_achats_post_insert,
+        tansferts_cosium_post_insert,
+        edi_post_insert,
+        eye_confort_post_insert,
+        generique_post_insert,
+        generique_post_insert_internal,
+        hearing_post_insert,
+        interson_post_insert,
+        johnson_post_insert,
+        lmc_post_insert,
+        newson_post_insert,
+        phonak_post_insert,
+        prodition_post_insert,
+        signia_post_insert,
+        starkey_post_insert,
+        technidis_post_insert,
+        unitron_post_insert,
+        widex_post_insert,
+        widexga_post_insert,
+        z_bu_refac_post_insert,
+    )
+}
+
+
+def run_post_inserts(post_inserts_list: List) -> Set:
+    """Lance les post-traitements différés, une fois par fonction et paramètres,
+    pour toutes les traces concernées. En cas d'erreur les traces du groupe sont mises en erreur
+    :param post_inserts_list: liste des (nom de fonction, uuid_identification, kwargs)
+    :return: uuid_identification des traces dont un post-traitement a échoué
+    """
+    groups_dict = {}
+    failed_set = set()
+
+    for function_name, uuid_identification, kwargs in post_inserts_list:
+        key = (function_name, json.dumps(kwargs, sort_keys=True))
+        groups_dict.setdefault(key, []).append(uuid_identification)
+
+    for (function_name, kwargs), uuids_list in groups_dict.items():
+        try:
+            POST_INSERT_FUNCTIONS_DICT[function_name](uuids_list, **json.loads(kwargs))
+
+        except Exception as error:
+            LOGGER_EDI.exception(f"run_post_inserts {function_name!r} : {error!r}")
+            failed_set.update(uuids_list)
+            Trace.objects.filter(uuid_identification__in=uuids_list).update(
+                errors=True,
+                comment=(
+                    "Une erreur c'est produite."
+                    "<br>Le post-traitement groupé du fichier a échoué!"
+                ),
+            )
+
+    return failed_set
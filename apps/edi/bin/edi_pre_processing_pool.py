@@ -8,14 +8,14 @@ Commentaire:
 created at: 2022-04-10
 created by: Paulo ALVES
 
-modified at: 2023-01-01
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
-import io
 import csv
 from pathlib import Path
 from operator import itemgetter
 from decimal import Decimal
+from typing import Dict
 
 import pendulum
 
@@ -30,28 +30,24 @@ from apps.core.bin.get_sage_elements import (
     get_uuid_rfa,
     # get_vat_regime,
 )
-from apps.data_flux.utilities import excel_file_to_csv_string_io
+from apps.core.edi_parsing.plugins import register_edi_parser
+from apps.data_flux.utilities import excel_file_rows
 from apps.data_flux.postgres_save import get_random_name
 from apps.data_flux.utilities import encoding_detect
 from apps.edi.models import SupplierDefinition
+from apps.edi.parameters.invoices_imports import get_first_line
 
 
-def bulk_translate_file(file: Path):
+@register_edi_parser("BbgrBulk")
+def bulk_rows(file: Path, params_dict: Dict = None):
     """
-    Transformation du fichier en entrée des factures BBGR Bulk, arrivant au format entêtes/lignes
-    pour le transformer en fichier à plat
+    Lignes du fichier des factures BBGR Bulk, arrivant au format entêtes/lignes,
+    renvoyées à plat (entête + ligne)
     :param file: Fichier
-    :return: Path(file)
+    :param params_dict: Paramètres du loader
+    :return: Générateur des lignes
     """
-    while True:
-        new_file = Path(settings.PRE_PROCESSING) / f"{get_random_name()}.csv"
-
-        if not new_file.is_file():
-            break
-
-    with file.open("r", encoding="utf8") as file_to_parse, new_file.open(
-        "w", encoding="utf8"
-    ) as file_to_write:
+    with file.open("r", encoding="utf8") as file_to_parse:
         csv_reader = csv.reader(
             file_to_parse,
             delimiter=";",
@@ -59,9 +55,6 @@ def bulk_translate_file(file: Path):
             lineterminator="",
             quoting=csv.QUOTE_MINIMAL,
         )
-        csv_writer = csv.writer(
-            file_to_write, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL
-        )
         e_row = None
 
         for row in csv_reader:
@@ -72,51 +65,25 @@ def bulk_translate_file(file: Path):
                 if part == "E20":
                     e_row = write_row
                 elif part == "G21":
-                    csv_writer.writerow(e_row + write_row)
+                    yield e_row + write_row
 
-    return new_file
 
-
-def interson_translate_file(file: Path):
+@register_edi_parser("Interson")
+def interson_rows(file: Path, params_dict: Dict = None):
     """
-    Transformation du fichier en entrée des factures Interson, pour remplacer le separateur \t par;
+    Lignes du fichier des factures Interson, dont le separateur peut être \t ou ;
     :param file: Fichier
-    :return: Path(file)
+    :param params_dict: Paramètres du loader
+    :return: Générateur des lignes
     """
-    while True:
-        new_file = Path(settings.INTERSON) / f"{get_random_name()}.csv"
-
-        if not new_file.is_file():
-            break
-
     encoding = encoding_detect(file)
 
-    with file.open("r", encoding=encoding, errors="replace") as file_to_parse, new_file.open(
-        "w", encoding="utf8", newline=""
-    ) as file_to_write:
-
-        csv_writer = csv.writer(
-            file_to_write, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL
-        )
-
+    with file.open("r", encoding=encoding, errors="replace") as file_to_parse:
         for line in file_to_parse:
             if "\t" in line:
-                write_line = line.replace(";", "").replace("\r", "").replace("\n", "").split("\t")
+                yield line.replace(";", "").replace("\r", "").replace("\n", "").split("\t")
             else:
-                write_line = line.replace("\r", "").replace("\n", "").split(";")
-
-            csv_writer.writerow(write_line)
-
-    file.unlink()
-
-    with file.open("w", encoding="utf8") as old_file, new_file.open(
-        "r", encoding="utf8"
-    ) as file_to_read:
-        old_file.write(file_to_read.read())
-
-    new_file.unlink()
-
-    return file
+                yield line.replace("\r", "").replace("\n", "").split(";")
 
 
 def transferts_cosium_file(file: Path):
@@ -231,54 +198,33 @@ def transferts_cosium_file(file: Path):
     return file
 
 
-def johnson_file(file: Path):
+@register_edi_parser("Johnson")
+def johnson_rows(file: Path, params_dict: Dict = None):
     """
-    Transformation du fichier jonhson pour supprimer les sous totaux (en deuxième position *)
-    Une pour l'envoyeur, l'autre pour le receptionnaire.
+    Lignes du fichier excel jonhson, sans les sous totaux (en deuxième position *)
     :param file: Fichier
-    :return: Path(file)
+    :param params_dict: Paramètres du loader
+    :return: Générateur des lignes
     """
-    new_csv_file = file.parents[0] / f"{file.stem}.csv"
-    csv_io = io.StringIO()
-    excel_file_to_csv_string_io(file, csv_io)
-
-    first_line = SupplierDefinition.objects.get(flow_name="Johnson").first_line
-
-    with new_csv_file.open("w", encoding="utf8", newline="") as file_to_write:
-        csv_reader = csv.reader(
-            csv_io,
-            delimiter=";",
-            quotechar='"',
-            lineterminator="\n",
-            quoting=csv.QUOTE_MINIMAL,
-        )
-        csv_writer = csv.writer(
-            file_to_write, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL
-        )
+    first_line = get_first_line(SupplierDefinition, "Johnson")
 
-        for i, line in enumerate(csv_reader, 1):
-            if line[1] == "*" or (i >= first_line and not line[2]):
-                continue
-
-            csv_writer.writerow(line)
+    for i, line in enumerate(excel_file_rows(file), 1):
+        if line[1] == "*" or (i >= first_line and not line[2]):
+            continue
 
-    csv_io.close()
-    file.unlink()
+        yield line
 
-    return new_csv_file
 
-
-def wsau_file(file: Path):
+def wsau_check_file(file: Path):
     """
     Contrôle du fichier wsau, qu'il ne manque pas le supplier_ident
     :param file: Fichier
-    :return: Path(file)
     """
     error_lines = []
 
     with file.open("r", encoding="utf8", newline="") as file_to_read:
         csv_reader = csv.reader(
-            file_to_read.readlines(),
+            file_to_read,
             delimiter=";",
             quotechar='"',
             lineterminator="\n",
@@ -297,31 +243,29 @@ def wsau_file(file: Path):
         LOGGER_EDI.exception(f"Exception Générale : {error!r}")
         raise AttributeError(error)
 
-    name = str(file.stem)
-
-    new_csv_file = file.parents[0] / f"{name}_change.csv"
 
+@register_edi_parser("Wsau")
+def wsau_rows(file: Path, params_dict: Dict = None):
+    """
+    Lignes du fichier wsau, avec une date par défaut quand elle est absente
+    :param file: Fichier
+    :param params_dict: Paramètres du loader
+    :return: Générateur des lignes
+    """
     with file.open("r", encoding="utf8", newline="") as csv_io:
-        with new_csv_file.open("w", encoding="utf8", newline="") as file_to_write:
-            csv_reader = csv.reader(
-                csv_io.readlines(),
-                delimiter=";",
-                quotechar='"',
-                lineterminator="\n",
-                quoting=csv.QUOTE_MINIMAL,
-            )
-            csv_writer = csv.writer(
-                file_to_write, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL
-            )
-
-            for i, line in enumerate(csv_reader, 1):
-                if not line[17]:
-                    line[17] = '1900-01-01'
-
-                csv_writer.writerow(line)
+        csv_reader = csv.reader(
+            csv_io,
+            delimiter=";",
+            quotechar='"',
+            lineterminator="\n",
+            quoting=csv.QUOTE_MINIMAL,
+        )
 
-    file.unlink()
-    new_csv_file.rename(new_csv_file.with_stem(name))
+        for line in csv_reader:
+            if not line[17]:
+                line[17] = '1900-01-01'
+
+            yield line
 
 
 def z_bu_refac_file(file: Path) -> Path:
@@ -415,4 +359,5 @@ if __name__ == "__main__":
     #         r"\SAGE_YOOZ_REFAC0\F1677059198463_ZBUREFAC - Copie.csv"
     #     )
     # )
-    johnson_file(Path("/Users/paulo/Downloads/6196377-ACUITIS (1).XLS"))
\ No newline at end of file
+    # for row in johnson_rows(Path("/Users/paulo/Downloads/6196377-ACUITIS (1).XLS")):
+    #     print(row)
\ No newline at end of file
@@ -0,0 +1,146 @@
+# pylint: disable=E0401,W0703,W1203
+"""
+FR : Module de séparation des fichiers EDI contenant plusieurs interchanges
+EN : Splitting module for EDI files containing several interchanges
+
+Commentaire:
+    Certains fournisseurs (ex.: JULBO) mettent plusieurs interchanges EDIFACT dans un
+    seul fichier. Les limites UNA/UNB sont recherchées directement dans un buffer mmap,
+    sans décoder ni charger le fichier, et les interchanges sont écrits octet pour
+    octet, l'encoding d'origine est donc conservé sans avoir à le détecter.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from typing import Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import mmap
+import re
+
+from heron.loggers import LOGGER_EDI
+from apps.data_flux.postgres_save import get_random_name
+
+# Début d'interchange : UNA ou UNB en début de fichier ou en début de segment
+EDI_INTERCHANGE_RE = re.compile(rb"(?:^|(?<=['\r\n]))[ \t]*(UNA|UNB\+)")
+
+# Nombre de fichiers traités en parallèle
+EDI_SPLIT_WORKERS = 4
+
+# Nombre de tentatives pour trouver un nom de fichier libre
+EDI_SPLIT_NAME_ATTEMPTS = 10
+
+
+def get_interchanges_offsets(buffer) -> List[int]:
+    """Renvoie les positions de début des interchanges du buffer.
+    Un UNB qui suit directement un UNA appartient au même interchange.
+    :param buffer: bytes ou mmap du fichier EDI
+    :return: liste des positions
+    """
+    offsets_list = []
+    previous_tag = None
+
+    for match in EDI_INTERCHANGE_RE.finditer(buffer):
+        tag = match.group(1)
+
+        if not (tag == b"UNB+" and previous_tag == b"UNA"):
+            offsets_list.append(match.start(1))
+
+        previous_tag = tag
+
+    return offsets_list
+
+
+def write_interchange(file: Path, content: bytes) -> Path:
+    """Ecrit l'interchange dans un nouveau fichier à côté du fichier d'origine,
+    la création exclusive garantit que l'on n'écrase aucun fichier existant
+    :param file: fichier EDI d'origine
+    :param content: contenu de l'interchange
+    :return: fichier créé
+    """
+    for _ in range(EDI_SPLIT_NAME_ATTEMPTS):
+        file_name = file.parent / f"{file.stem}.{get_random_name()}.edi"
+
+        try:
+            with file_name.open("xb") as file_to_write:
+                file_to_write.write(content)
+
+            return file_name
+
+        except FileExistsError:
+            continue
+
+    raise FileExistsError(
+        f"Impossible de trouver un nom de fichier libre pour : {file.name!r}"
+    )
+
+
+def split_edi_file(file: Path) -> int:
+    """Sépare le fichier EDI en autant de fichiers que d'interchanges,
+    le fichier d'origine n'est supprimé que s'il a été séparé
+    :param file: fichier EDI
+    :return: nombre de fichiers écrits, 0 si le fichier n'a pas été séparé
+    """
+    if file.stat().st_size == 0:
+        return 0
+
+    files_number = 0
+
+    with file.open("rb") as edi_file, mmap.mmap(
+        edi_file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as buffer:
+        offsets_list = get_interchanges_offsets(buffer)
+
+        if len(offsets_list) < 2:
+            return 0
+
+        # Ce qui précède le premier interchange reste avec celui-ci
+        offsets_list[0] = 0
+
+        for start, end in zip(offsets_list, offsets_list[1:] + [len(buffer)]):
+            content = buffer[start:end].strip()
+
+            if content:
+                write_interchange(file, content)
+                files_number += 1
+
+    file.unlink()
+
+    return files_number
+
+
+def split_edi_files(files: Iterable[Path]) -> Tuple[int, int]:
+    """Sépare les fichiers EDI en parallèle
+    :param files: fichiers EDI
+    :return: nombre de fichiers séparés, nombre de fichiers écrits
+    """
+    files_list = list(files)
+
+    if not files_list:
+        return 0, 0
+
+    split_files = 0
+    written_files = 0
+
+    with ThreadPoolExecutor(
+        max_workers=min(EDI_SPLIT_WORKERS, len(files_list))
+    ) as executor:
+        futures_list = [
+            (file, executor.submit(split_edi_file, file)) for file in files_list
+        ]
+
+        for file, future in futures_list:
+            try:
+                files_number = future.result()
+
+                if files_number:
+                    split_files += 1
+                    written_files += files_number
+
+            except Exception as error:
+                LOGGER_EDI.error(f"Erreur lors du traitement du fichier {file}: {error}")
+
+    return split_files, written_files
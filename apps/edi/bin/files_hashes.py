@@ -0,0 +1,94 @@
+# pylint: disable=E0401,E1101,W1203
+"""
+FR : Module de dédoublonnage des fichiers fournisseurs par empreinte SHA-256
+EN : Supplier files deduplication module by SHA-256 hash
+
+Commentaire:
+    Les empreintes des fichiers intégrés sans erreur sont conservées dans EdiFileHash,
+    par flow_name. Un fichier renvoyé à l'identique par le fournisseur est mis de côté
+    dans BACKUP_DUPLICATES_SUPPLIERS_DIR avant tout parsing, validation ou COPY.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from typing import AnyStr, Dict, Set
+from pathlib import Path
+import hashlib
+import shutil
+
+from heron.loggers import LOGGER_EDI
+from apps.core.functions.functions_setups import settings
+from apps.edi.models import EdiFileHash, SupplierDefinition
+
+# Taille des blocs lus pour le calcul de l'empreinte
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file: Path) -> AnyStr:
+    """Calcul en streaming de l'empreinte SHA-256 du fichier
+    :param file: fichier à analyser
+    :return: empreinte hexadécimale
+    """
+    sha256 = hashlib.sha256()
+
+    with file.open("rb") as file_to_hash:
+        for chunk in iter(lambda: file_to_hash.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def get_flow_names_dict() -> Dict:
+    """Renvoie le dictionnaire {répertoire: flow_name} des définitions fournisseurs"""
+    return dict(SupplierDefinition.objects.values_list("directory", "flow_name"))
+
+
+def get_flow_name(directory: AnyStr, flow_names_dict: Dict = None) -> AnyStr:
+    """Renvoie le flow_name du répertoire de traitement, le répertoire lui même
+    pour les répertoires sans définition fournisseur
+    :param directory: répertoire de traitement (clé de processing_dict)
+    :param flow_names_dict: dictionnaire {répertoire: flow_name} déjà chargé
+    :return: flow_name
+    """
+    if flow_names_dict is None:
+        flow_names_dict = get_flow_names_dict()
+
+    return flow_names_dict.get(directory, directory)
+
+
+def get_hashes_set() -> Set:
+    """Renvoie l'ensemble des couples (flow_name, sha256) déjà intégrés"""
+    return set(EdiFileHash.objects.values_list("flow_name", "sha256"))
+
+
+def quarantine_file(file: Path, directory: AnyStr) -> Path:
+    """Déplace le fichier déjà intégré dans le répertoire des doublons
+    :param file: fichier en doublon
+    :param directory: répertoire de traitement (clé de processing_dict)
+    :return: fichier déplacé
+    """
+    duplicates_dir = Path(settings.BACKUP_DUPLICATES_SUPPLIERS_DIR) / directory
+    duplicates_dir.mkdir(parents=True, exist_ok=True)
+    duplicate_file = duplicates_dir / file.name
+
+    if duplicate_file.is_file():
+        duplicate_file.unlink()
+
+    shutil.move(file.resolve(), duplicate_file.resolve())
+    LOGGER_EDI.warning(f"Fichier déjà intégré, mis en doublon : {file.name!r}")
+
+    return duplicate_file
+
+
+def register_file_hash(flow_name: AnyStr, file_name: AnyStr, sha256: AnyStr):
+    """Enregistre l'empreinte du fichier intégré
+    :param flow_name: flow_name du fichier
+    :param file_name: nom du fichier
+    :param sha256: empreinte du fichier
+    """
+    EdiFileHash.objects.get_or_create(
+        flow_name=flow_name, sha256=sha256, defaults={"file_name": file_name}
+    )
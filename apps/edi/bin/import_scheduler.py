@@ -0,0 +1,143 @@
+# pylint: disable=E0401,E1101,W1203
+"""
+FR : Module d'ordonnancement des tâches d'import des fichiers fournisseurs
+EN : Scheduling module for supplier files import tasks
+
+Commentaire:
+    Le coût de chaque fichier est estimé à partir de sa taille (nombre de lignes
+    extrapolé d'un échantillon) et du débit historique en lignes/s du flow_name,
+    calculé sur les traces d'import. Les fichiers les plus coûteux sont envoyés en
+    premier (LPT), ce qui évite qu'un gros fichier soumis en dernier fixe la durée
+    totale de l'import.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from typing import Dict, List, Tuple
+from pathlib import Path
+import datetime
+import heapq
+import os
+
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from heron import celery_app
+from apps.data_flux.models import Trace
+
+# Débit par défaut des flux sans historique (lignes/s)
+DEFAULT_ROWS_PER_SECOND = 500
+
+# Nombre de jours d'historique des traces pour le calcul des débits
+HISTORY_DAYS = 90
+
+# Taille de l'échantillon lu pour l'estimation du nombre de lignes
+SAMPLE_SIZE = 64 * 1024
+
+# Les fichiers excel sont compressés, estimation forfaitaire d'octets par ligne
+EXCEL_SUFFIXES = {".xlsx", ".xlsm", ".xls"}
+EXCEL_BYTES_PER_ROW = 40
+
+
+def get_workers_number() -> int:
+    """Renvoie le nombre de tâches celery pouvant tourner en parallèle"""
+    return celery_app.conf.worker_concurrency or os.cpu_count() or 1
+
+
+def get_flows_rows_per_second() -> Dict:
+    """Renvoie le débit historique en lignes/s par flow_name, d'après les traces d'import
+    :return: {flow_name: lignes/s}
+    """
+    traces = (
+        Trace.objects.filter(
+            invoices=True,
+            flow_name__isnull=False,
+            time_to_process__gt=0,
+            created_at__gte=timezone.now() - datetime.timedelta(days=HISTORY_DAYS),
+        )
+        .values("flow_name")
+        .annotate(
+            rows=Sum(
+                Coalesce(F("created_numbers_records"), 0)
+                + Coalesce(F("updated_numbers_records"), 0)
+                + Coalesce(F("errors_numbers_records"), 0)
+            ),
+            seconds=Sum("time_to_process"),
+        )
+    )
+
+    return {
+        trace.get("flow_name"): float(trace.get("rows")) / float(trace.get("seconds"))
+        for trace in traces
+        if trace.get("rows") and trace.get("seconds")
+    }
+
+
+def estimate_rows(file: Path) -> float:
+    """Estime le nombre de lignes du fichier à partir d'un échantillon de début de fichier
+    :param file: fichier à estimer
+    :return: nombre de lignes estimé
+    """
+    size = file.stat().st_size
+
+    if file.suffix.lower() in EXCEL_SUFFIXES:
+        return size / EXCEL_BYTES_PER_ROW
+
+    with file.open("rb") as file_to_sample:
+        sample = file_to_sample.read(SAMPLE_SIZE)
+
+    if not sample:
+        return 0
+
+    # Les EDI n'ont pas forcément de retour à la ligne, un segment vaut une ligne
+    lines = max(sample.count(b"\n"), sample.count(b"'"), 1)
+
+    return lines * size / len(sample)
+
+
+def estimate_cost(file: Path, flow_name: str, rows_per_second_dict: Dict) -> float:
+    """Estime la durée d'import du fichier en secondes
+    :param file: fichier à importer
+    :param flow_name: flow_name du fichier
+    :param rows_per_second_dict: débits historiques par flow_name
+    :return: durée estimée
+    """
+    try:
+        rows = estimate_rows(file)
+    except OSError:
+        rows = 0
+
+    return rows / rows_per_second_dict.get(flow_name, DEFAULT_ROWS_PER_SECOND)
+
+
+def schedule_files(files_list: List) -> Tuple[List, float]:
+    """Trie les fichiers à importer du plus coûteux au moins coûteux et estime la durée
+    totale de l'import, en répartissant les fichiers sur les workers disponibles
+    :param files_list: tuples (fichier, backup, répertoire, flow_name, sha256)
+                       de get_files_celery
+    :return: liste ordonnée, durée estimée en secondes
+    """
+    rows_per_second_dict = get_flows_rows_per_second()
+    costs_list = sorted(
+        (
+            (
+                estimate_cost(Path(row_args[0]), row_args[3], rows_per_second_dict),
+                row_args,
+            )
+            for row_args in files_list
+        ),
+        key=lambda cost_row: cost_row[0],
+        reverse=True,
+    )
+
+    # Chaque fichier va sur le worker qui se libère en premier
+    workers_loads = [0.0] * min(get_workers_number(), len(costs_list) or 1)
+
+    for cost, _ in costs_list:
+        heapq.heappush(workers_loads, heapq.heappop(workers_loads) + cost)
+
+    return [row_args for _, row_args in costs_list], max(workers_loads)
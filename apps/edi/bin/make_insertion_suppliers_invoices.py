@@ -12,11 +12,8 @@ created by: Paulo ALVES
 modified at: 2023-01-01
 modified by: Paulo ALVES
 """
-import io
 from pathlib import Path
-from functools import lru_cache
 
-import redis
 from django.utils import timezone
 from django.db.utils import IntegrityError
 from psycopg2 import sql
@@ -25,17 +22,20 @@ from heron.loggers import LOGGER_EDI
 from apps.core.functions.functions_setups import settings, connection
 from apps.edi.models import SupplierDefinition, ColumnDefinition
 from apps.edi.parameters.invoices_imports import get_columns, get_first_line, get_loader_params_dict
-from apps.data_flux.validation import Validation, PydanticValidation, PydanticTrace
+from apps.core.edi_parsing.plugins import get_edi_plugin
+from apps.data_flux.cache import SUPPLIERS_CACHE_NAME, get_cache_registry
+from apps.edi.forms.forms_djantic.forms_invoices import LazySchema
+from apps.data_flux.validation import Validation, PydanticColumnarValidation, PydanticTrace
 from apps.data_flux.loader import (
     GetAddDictError,
     IterFileToInsertError,
     ExcelToCsvError,
     FileToCsvError,
-    FileLoader,
-    Opto33Loader,
+    FileStreamLoader,
 )
 from apps.data_flux.exceptions import (
     ValidationError,
+    ValidationAbortError,
     OptoDateError,
     OptoLinesError,
     OptoQualifierError,
@@ -45,92 +45,56 @@ from apps.data_flux.exceptions import (
     PathTypeError,
     PathFileError,
 )
-from apps.data_flux.postgres_save import PostgresKeyError, PostgresTypeError, PostgresDjangoUpsert
-
+from apps.data_flux.postgres_save import (
+    PostgresDjangoError,
+    PostgresKeyError,
+    PostgresTypeError,
+    PostgresDjangoUpsert,
+    IteratorFile,
+    get_pipeline_connection,
+)
 
-try:
-    cache = redis.StrictRedis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        password=settings.REDIS_PASSWORD,
-    )
-except redis.exceptions.ConnectionError:
-    cache = {}
 
 proccessing_dir = Path(settings.PROCESSING_SUPPLIERS_DIR)
 
 
-@lru_cache(maxsize=256)
 def get_suppliers(flow_name: str):
     """
     :param flow_name: Champ flow_name dans la table SupplierDefinition
-    :return: Retourne le supplier et l'indentifier du fournisseur dans la table SupplierDefinition
-    """
-    with connection.cursor() as cursor:
-        sql_supplier = sql.SQL(
-            """
-        select  
-            "supplier", "supplier_ident" 
-        from edi_supplierdefinition es 
-        where "flow_name" = %(flow_name)s
-        """
-        )
-        cursor.execute(sql_supplier, {"flow_name": flow_name})
-        results = cursor.fetchall()
-
-    return (results[0][0], results[0][1]) if results else ("", "")
-
-
-@lru_cache(maxsize=256)
-def get_supplier_name(flow_name: str):
-    """
-    :param flow_name: Champ flow_name dans la table SupplierDefinition
-    :return: Retourne le supplier du fournisseur dans la table SupplierDefinition
+    :return: Retourne le supplier et l'indentifier du fournisseur dans la table SupplierDefinition,
+             lus une seule fois par changement de SupplierDefinition
     """
-    supplier, supplier_ident = get_suppliers(flow_name)
-
-    if isinstance(cache, (dict,)):
-        cache[f"{flow_name}_supplier"] = supplier
-        cache[f"{flow_name}_ident"] = supplier_ident
-    else:
-        cache.set(f"{flow_name}_supplier", supplier)
-        cache.set(f"{flow_name}_ident", supplier_ident)
 
-    return supplier
+    def get_suppliers_from_db():
+        with connection.cursor() as cursor:
+            sql_supplier = sql.SQL(
+                """
+            select  
+                "supplier", "supplier_ident" 
+            from edi_supplierdefinition es 
+            where "flow_name" = %(flow_name)s
+            """
+            )
+            cursor.execute(sql_supplier, {"flow_name": flow_name})
+            results = cursor.fetchall()
 
+        return [results[0][0], results[0][1]] if results else ["", ""]
 
-@lru_cache(maxsize=256)
-def get_supplier_ident(flow_name: str):
-    """
-    :param flow_name: Champ flow_name dans la table SupplierDefinition
-    :return: Retourne le supplier_ident du fournisseur dans la table SupplierDefinition
-    """
-    supplier, supplier_ident = get_suppliers(flow_name)
-
-    if isinstance(cache, (dict,)):
-        cache[f"{flow_name}_ident"] = supplier_ident
-        cache[f"{flow_name}_supplier"] = supplier
-    else:
-        cache.set(f"{flow_name}_ident", supplier_ident)
-        cache.set(f"{flow_name}_supplier", supplier)
+    supplier, supplier_ident = get_cache_registry(SUPPLIERS_CACHE_NAME).get_or_set(
+        flow_name, get_suppliers_from_db
+    )
 
-    return supplier_ident
+    return supplier, supplier_ident
 
 
-@lru_cache(maxsize=256)
 def get_supplier(flow_name):
     """Get supplier name in cache ou model SupplierDefinition"""
-    return (
-        cache.get(f"{flow_name}_supplier").decode() if cache.get(f"{flow_name}") else None
-    ) or get_supplier_name(flow_name)
+    return get_suppliers(flow_name)[0]
 
 
-@lru_cache(maxsize=256)
 def get_ident(flow_name):
     """Get supplier ident in cache ou model SupplierDefinition"""
-    return (
-        cache.get(f"{flow_name}_ident").decode() if cache.get(f"{flow_name}") else None
-    ) or get_supplier_ident(flow_name)
+    return get_suppliers(flow_name)[1]
 
 
 def make_insert_edi_files(model, flow_name, source, trace, validator, params_dict_loader):
@@ -144,7 +108,6 @@ def make_insert_edi_files(model, flow_name, source, trace, validator, params_dic
     :return:
     """
     error = False
-    valide_file_io = io.StringIO()
     to_print = ""
 
     try:
@@ -156,6 +119,10 @@ def make_insert_edi_files(model, flow_name, source, trace, validator, params_dic
             # ne sont pas dans la table ColumnDefinition, alors l'import ne peut se faire.
             raise TypeError("Vous n'avez pas de colonnes à récupérer")
 
+        # Les schémas des flux ne sont construits qu'à leur première utilisation
+        if isinstance(validator, LazySchema):
+            validator = validator.get_schema()
+
         flow_dict = get_loader_params_dict(SupplierDefinition, flow_name)
         params_dict_load = {
             **params_dict_loader,
@@ -165,15 +132,18 @@ def make_insert_edi_files(model, flow_name, source, trace, validator, params_dic
         params_dict_validation = {
             "trace": trace,
             "insert_method": "upsert",
-            "validation": (PydanticValidation, PydanticTrace),
-            "file_io": valide_file_io,
+            "validation": (PydanticColumnarValidation, PydanticTrace),
             "nb_errors_max": 50,
         }
 
-        if flow_name == "Edi":
-            LOADER = Opto33Loader
+        # Les formats fournisseurs enregistrés ont leur propre loader ou parser de lignes
+        edi_plugin = get_edi_plugin(flow_name)
+
+        if edi_plugin is not None:
+            LOADER = edi_plugin.loader
+            params_dict_load = edi_plugin.get_loader_params_dict(params_dict_load)
         else:
-            LOADER = FileLoader
+            LOADER = FileStreamLoader
 
         with LOADER(
             source=source,
@@ -192,7 +162,46 @@ def make_insert_edi_files(model, flow_name, source, trace, validator, params_dic
                 validator=validator,
                 params_dict=params_dict_validation,
             )
-            error_lines = validation.validate()
+
+            # Les lignes validées alimentent directement le COPY, sur une connexion dédiée,
+            # la validation écrivant les traces sur la connexion par défaut pendant le COPY
+            copy_connection = get_pipeline_connection()
+            copy_file = IteratorFile(validation.iter_validate(abort_on_errors=True))
+
+            try:
+                postgres_upsert = PostgresDjangoUpsert(
+                    model=model,
+                    fields_dict={key: False for key in validator.Config.include},
+                    cnx=copy_connection,
+                    exclude_update_fields={},
+                )
+                postgres_upsert.insertion(
+                    file=copy_file,
+                    insert_mode="insert",
+                    delimiter=";",
+                    quote_character='"',
+                    kwargs_prepared={"trace": trace},
+                )
+
+            except PostgresDjangoError as except_error:
+                source_error = except_error.__cause__
+
+                # Si la validation comporte des erreurs, le COPY a été annulé,
+                # les lignes en erreur sont traitées ci-dessous
+                if isinstance(source_error, ValidationAbortError):
+                    pass
+
+                # Les erreurs du loader remontent telles quelles vers leurs exceptions dédiées
+                elif source_error is not None and source_error is copy_file.iterator_error:
+                    raise source_error from None
+
+                else:
+                    raise
+
+            finally:
+                copy_connection.close()
+
+            error_lines = validation.error_lines
 
             if error_lines:
                 to_print += f"\nLignes en erreur : {error_lines}\n"
@@ -202,21 +211,6 @@ def make_insert_edi_files(model, flow_name, source, trace, validator, params_dic
 
             to_print += "\nPas d'erreurs\n"
 
-            postgres_upsert = PostgresDjangoUpsert(
-                model=model,
-                fields_dict={key: False for key in validator.Config.include},
-                cnx=connection,
-                exclude_update_fields={},
-            )
-            valide_file_io.seek(0)
-            postgres_upsert.insertion(
-                file=valide_file_io,
-                insert_mode="insert",
-                delimiter=";",
-                quote_character='"',
-                kwargs_prepared={"trace": trace},
-            )
-
     # Exceptions FileLoader ========================================================================
     except GetAddDictError as except_error:
         error = True
@@ -295,12 +289,4 @@ def make_insert_edi_files(model, flow_name, source, trace, validator, params_dic
         trace.time_to_process = (timezone.now() - trace.created_at).total_seconds()
         trace.save()
 
-        try:
-            if not valide_file_io.closed:
-                valide_file_io.close()
-            del valide_file_io
-
-        except (AttributeError, NameError):
-            pass
-
     return to_print
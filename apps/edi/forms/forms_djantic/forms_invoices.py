@@ -12,6 +12,7 @@ modified at: 2022-04-06
 modified by: Paulo ALVES
 """
 
+from typing import AnyStr, Callable, List, Type
 from decimal import Decimal
 import uuid
 import datetime
@@ -31,608 +32,819 @@ from apps.edi.models import EdiImport, ColumnDefinition
 from apps.edi.parameters.invoices_imports import get_columns
 
 
-class BbgrBulkSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle BbrgVerre"""
+class LazySchema:
+    """Schéma djantic construit à la première utilisation, à partir des colonnes du registre
+    des flux, et reconstruit uniquement si les colonnes du flux ont changé
+    """
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+    def __init__(self, flow_name: AnyStr, schema_factory: Callable):
+        self.flow_name = flow_name
+        self.schema_factory = schema_factory
+        self.columns_tuple = None
+        self.schema = None
 
-    class Config:
-        """Config"""
+    def get_schema(self) -> Type[ModelSchema]:
+        """Renvoie le schéma djantic à jour des colonnes du flux"""
+        columns_tuple = tuple(get_columns(ColumnDefinition, self.flow_name))
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "BbgrBulk")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+        if self.schema is None or self.columns_tuple != columns_tuple:
+            self.schema = self.schema_factory(list(columns_tuple))
+            self.columns_tuple = columns_tuple
 
+        return self.schema
 
-class CosiumSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle BbrgVerre"""
+    def __call__(self, *args, **kwargs):
+        return self.get_schema()(*args, **kwargs)
 
-    uuid_identification: uuid.UUID
+    def __getattr__(self, name):
+        # Pas de construction du schéma tant que l'instance n'est pas initialisée (copy, pickle)
+        if "schema_factory" not in self.__dict__:
+            raise AttributeError(name)
 
-    class Config:
-        """Config"""
+        return getattr(self.get_schema(), name)
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Cosium")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "created_at",
-            "modified_at",
-        ]
+    def __repr__(self):
+        return f"LazySchema({self.flow_name!r})"
 
 
-class CosiumTransfertSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-):
-    """Schema Djantic pour validation du modèle BbrgVerre"""
+def bbgr_bulk_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma BbgrBulkSchema pour les colonnes du flux BbgrBulk"""
 
-    acuitis_order_date: datetime.datetime
-    uuid_identification: uuid.UUID
+    class BbgrBulkSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle BbrgVerre"""
 
-    @validator("acuitis_order_date", pre=True)
-    def check_acuitis_order_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
 
-        return value
+        class Config:
+            """Config"""
 
-    class Config:
-        """Config"""
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Transfert")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "created_at",
-            "modified_at",
-        ]
+    return BbgrBulkSchema
 
 
-class EdiSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-):
-    """Schema Djantic pour validation du modèle Edi"""
+BbgrBulkSchema = LazySchema("BbgrBulk", bbgr_bulk_schema)
 
-    uuid_identification: uuid.UUID
-    qty: Decimal = 1
-    acuitis_order_date: datetime.datetime
-    delivery_date: datetime.datetime
 
-    @validator("acuitis_order_date", pre=True)
-    def check_acuitis_order_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+def cosium_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma CosiumSchema pour les colonnes du flux Cosium"""
 
-        return value
+    class CosiumSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle BbrgVerre"""
 
-    @validator("delivery_date", pre=True)
-    def check_delivery_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+        uuid_identification: uuid.UUID
 
-        return value
+        class Config:
+            """Config"""
 
-    class Config:
-        """Config"""
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "created_at",
+                "modified_at",
+            ]
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Edi")) + [
-            "uuid_identification",
-            "flow_name",
-            "created_at",
-            "modified_at",
-        ]
+    return CosiumSchema
 
 
-class EyeConfortSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaEyeConfor,
-):
-    """Schema Djantic pour validation du modèle Eye_confort"""
+CosiumSchema = LazySchema("Cosium", cosium_schema)
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
 
-    class Config:
-        """Config"""
+def cosium_transfert_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma CosiumTransfertSchema pour les colonnes du flux Transfert"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "EyeConfort")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+    class CosiumTransfertSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+    ):
+        """Schema Djantic pour validation du modèle BbrgVerre"""
 
+        acuitis_order_date: datetime.datetime
+        uuid_identification: uuid.UUID
 
-class GeneriqueSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Generique"""
+        @validator("acuitis_order_date", pre=True)
+        def check_acuitis_order_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
 
-    uuid_identification: uuid.UUID
-    acuitis_order_date: datetime.datetime
-    delivery_date: datetime.datetime
+            return value
 
-    @validator("acuitis_order_date", pre=True)
-    def check_acuitis_order_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+        class Config:
+            """Config"""
 
-        return value
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "created_at",
+                "modified_at",
+            ]
 
-    @validator("delivery_date", pre=True)
-    def check_delivery_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+    return CosiumTransfertSchema
 
-        return value
 
-    class Config:
-        """Config"""
+CosiumTransfertSchema = LazySchema("Transfert", cosium_transfert_schema)
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Generique")) + [
-            "uuid_identification",
-            "flow_name",
-            "created_at",
-            "modified_at",
-        ]
 
+def edi_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma EdiSchema pour les colonnes du flux Edi"""
 
-class HearingSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Hearing"""
+    class EdiSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+    ):
+        """Schema Djantic pour validation du modèle Edi"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+        uuid_identification: uuid.UUID
+        qty: Decimal = 1
+        acuitis_order_date: datetime.datetime
+        delivery_date: datetime.datetime
 
-    class Config:
-        """Config"""
+        @validator("acuitis_order_date", pre=True)
+        def check_acuitis_order_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Hearing")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+            return value
 
+        @validator("delivery_date", pre=True)
+        def check_delivery_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
 
-class IntersonSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaInterson,
-):
-    """Schema Djantic pour validation du modèle Interson"""
+            return value
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+        class Config:
+            """Config"""
 
-    class Config:
-        """Config"""
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "created_at",
+                "modified_at",
+            ]
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Interson")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+    return EdiSchema
 
 
-class JohnsonSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-):
-    """Schema Djantic pour validation du modèle Johnson"""
+EdiSchema = LazySchema("Edi", edi_schema)
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
-    delivery_date: datetime.datetime
 
-    @validator("delivery_date", pre=True)
-    def check_delivery_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+def eye_confort_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma EyeConfortSchema pour les colonnes du flux EyeConfort"""
 
-        return value
+    class EyeConfortSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaEyeConfor,
+    ):
+        """Schema Djantic pour validation du modèle Eye_confort"""
 
-    class Config:
-        """Config"""
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Johnson")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+        class Config:
+            """Config"""
 
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
-class LmcSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-):
-    """Schema Djantic pour validation du modèle Lmc"""
+    return EyeConfortSchema
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
 
-    class Config:
-        """Config"""
+EyeConfortSchema = LazySchema("EyeConfort", eye_confort_schema)
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Lmc")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
 
+def generique_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma GeneriqueSchema pour les colonnes du flux Generique"""
 
-class NewsonSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaNewson,
-):
-    """Schema Djantic pour validation du modèle Newson"""
+    class GeneriqueSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Generique"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+        uuid_identification: uuid.UUID
+        acuitis_order_date: datetime.datetime
+        delivery_date: datetime.datetime
 
-    class Config:
-        """Config"""
+        @validator("acuitis_order_date", pre=True)
+        def check_acuitis_order_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Newson")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+            return value
 
+        @validator("delivery_date", pre=True)
+        def check_delivery_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
 
-class PhonakSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Phonak"""
+            return value
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+        class Config:
+            """Config"""
 
-    class Config:
-        """Config"""
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "created_at",
+                "modified_at",
+            ]
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Phonak")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+    return GeneriqueSchema
 
 
-class HansatonSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Hansaton.
-    Reprise de la fonction de Phonack, car faisant parti du même groupe
-    """
+GeneriqueSchema = LazySchema("Generique", generique_schema)
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
 
-    class Config:
-        """Config"""
+def hearing_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma HearingSchema pour les colonnes du flux Hearing"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Hansaton")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+    class HearingSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Hearing"""
 
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
 
-class ProditionSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Prodition"""
+        class Config:
+            """Config"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
-    class Config:
-        """Config"""
+    return HearingSchema
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Prodition")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
 
+HearingSchema = LazySchema("Hearing", hearing_schema)
 
-class SigniaSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle Signia"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
-    delivery_date: datetime.datetime
+def interson_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma IntersonSchema pour les colonnes du flux Interson"""
 
-    @validator("delivery_date", pre=True)
-    def check_delivery_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
+    class IntersonSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaInterson,
+    ):
+        """Schema Djantic pour validation du modèle Interson"""
 
-        return value
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
 
-    class Config:
-        """Config"""
+        class Config:
+            """Config"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Signia")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
+    return IntersonSchema
 
-class StarkeySchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Starkey"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
-    delivery_date: datetime.datetime
+IntersonSchema = LazySchema("Interson", interson_schema)
 
-    @validator("delivery_date", pre=True)
-    def check_delivery_date(cls, value):
-        if not value or value == "None":
-            return datetime.datetime(1900, 1, 1)
 
-        return value
+def johnson_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma JohnsonSchema pour les colonnes du flux Johnson"""
 
-    class Config:
-        """Config"""
+    class JohnsonSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+    ):
+        """Schema Djantic pour validation du modèle Johnson"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Starkey")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+        delivery_date: datetime.datetime
 
+        @validator("delivery_date", pre=True)
+        def check_delivery_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
 
-class TechnidisSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle Technidis"""
+            return value
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+        class Config:
+            """Config"""
 
-    class Config:
-        """Config"""
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Technidis")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+    return JohnsonSchema
 
 
-class UnitronSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaGenerique,
-):
-    """Schema Djantic pour validation du modèle Unitron"""
+JohnsonSchema = LazySchema("Johnson", johnson_schema)
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
 
-    class Config:
-        """Config"""
+def lmc_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma LmcSchema pour les colonnes du flux Lmc"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Unitron")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+    class LmcSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+    ):
+        """Schema Djantic pour validation du modèle Lmc"""
 
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
 
-class WidexSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle Widex"""
+        class Config:
+            """Config"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
-    class Config:
-        """Config"""
+    return LmcSchema
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Widex")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
 
+LmcSchema = LazySchema("Lmc", lmc_schema)
 
-class WsauSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle Wsau"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
+def newson_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma NewsonSchema pour les colonnes du flux Newson"""
+
+    class NewsonSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaNewson,
+    ):
+        """Schema Djantic pour validation du modèle Newson"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
 
-    class Config:
-        """Config"""
+        class Config:
+            """Config"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Wsau")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "created_at",
-            "modified_at",
-        ]
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
 
+    return NewsonSchema
 
-class WidexGaSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-    TvaWidex,
-):
-    """Schema Djantic pour validation du modèle WidexGa"""
 
-    uuid_identification: uuid.UUID
-    supplier: str
-    supplier_ident: str
+NewsonSchema = LazySchema("Newson", newson_schema)
 
-    class Config:
-        """Config"""
 
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "WidexGa")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+def phonak_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma PhonakSchema pour les colonnes du flux Phonak"""
 
+    class PhonakSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Phonak"""
 
-class ZBuRefacSageSchema(
-    ModelSchema,
-    ValidateFieldsBase,
-):
-    """Schema Djantic pour validation du modèle WidexGa"""
-
-    uuid_identification: uuid.UUID
-    flow_name: str = "SageYoozRefac"
-    supplier: str = "SAGE_YOOZ_REFAC"
-    supplier_ident: str = "Zburefac"
-    unit_weight: int
-    axe_bu: uuid.UUID
-    axe_prj: uuid.UUID
-    axe_pro: uuid.UUID
-    axe_pys: uuid.UUID
-    axe_rfa: uuid.UUID
-    vat: str
-
-    class Config:
-        """Config"""
-
-        model = EdiImport
-        include = list(get_columns(ColumnDefinition, "Zburefac")) + [
-            "uuid_identification",
-            "flow_name",
-            "supplier",
-            "supplier_ident",
-            "created_at",
-            "modified_at",
-        ]
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return PhonakSchema
+
+
+PhonakSchema = LazySchema("Phonak", phonak_schema)
+
+
+def hansaton_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma HansatonSchema pour les colonnes du flux Hansaton"""
+
+    class HansatonSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Hansaton.
+        Reprise de la fonction de Phonack, car faisant parti du même groupe
+        """
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return HansatonSchema
+
+
+HansatonSchema = LazySchema("Hansaton", hansaton_schema)
+
+
+def prodition_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma ProditionSchema pour les colonnes du flux Prodition"""
+
+    class ProditionSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Prodition"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return ProditionSchema
+
+
+ProditionSchema = LazySchema("Prodition", prodition_schema)
+
+
+def signia_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma SigniaSchema pour les colonnes du flux Signia"""
+
+    class SigniaSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle Signia"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+        delivery_date: datetime.datetime
+
+        @validator("delivery_date", pre=True)
+        def check_delivery_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
+
+            return value
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return SigniaSchema
+
+
+SigniaSchema = LazySchema("Signia", signia_schema)
+
+
+def starkey_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma StarkeySchema pour les colonnes du flux Starkey"""
+
+    class StarkeySchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Starkey"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+        delivery_date: datetime.datetime
+
+        @validator("delivery_date", pre=True)
+        def check_delivery_date(cls, value):
+            if not value or value == "None":
+                return datetime.datetime(1900, 1, 1)
+
+            return value
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return StarkeySchema
+
+
+StarkeySchema = LazySchema("Starkey", starkey_schema)
+
+
+def technidis_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma TechnidisSchema pour les colonnes du flux Technidis"""
+
+    class TechnidisSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle Technidis"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return TechnidisSchema
+
+
+TechnidisSchema = LazySchema("Technidis", technidis_schema)
+
+
+def unitron_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma UnitronSchema pour les colonnes du flux Unitron"""
+
+    class UnitronSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaGenerique,
+    ):
+        """Schema Djantic pour validation du modèle Unitron"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return UnitronSchema
+
+
+UnitronSchema = LazySchema("Unitron", unitron_schema)
+
+
+def widex_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma WidexSchema pour les colonnes du flux Widex"""
+
+    class WidexSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle Widex"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return WidexSchema
+
+
+WidexSchema = LazySchema("Widex", widex_schema)
+
+
+def wsau_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma WsauSchema pour les colonnes du flux Wsau"""
+
+    class WsauSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle Wsau"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "created_at",
+                "modified_at",
+            ]
+
+    return WsauSchema
+
+
+WsauSchema = LazySchema("Wsau", wsau_schema)
+
+
+def widex_ga_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma WidexGaSchema pour les colonnes du flux WidexGa"""
+
+    class WidexGaSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+        TvaWidex,
+    ):
+        """Schema Djantic pour validation du modèle WidexGa"""
+
+        uuid_identification: uuid.UUID
+        supplier: str
+        supplier_ident: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return WidexGaSchema
+
+
+WidexGaSchema = LazySchema("WidexGa", widex_ga_schema)
+
+
+def z_bu_refac_sage_schema(columns_list: List) -> Type[ModelSchema]:
+    """Construction du schéma ZBuRefacSageSchema pour les colonnes du flux Zburefac"""
+
+    class ZBuRefacSageSchema(
+        ModelSchema,
+        ValidateFieldsBase,
+    ):
+        """Schema Djantic pour validation du modèle WidexGa"""
+
+        uuid_identification: uuid.UUID
+        flow_name: str = "SageYoozRefac"
+        supplier: str = "SAGE_YOOZ_REFAC"
+        supplier_ident: str = "Zburefac"
+        unit_weight: int
+        axe_bu: uuid.UUID
+        axe_prj: uuid.UUID
+        axe_pro: uuid.UUID
+        axe_pys: uuid.UUID
+        axe_rfa: uuid.UUID
+        vat: str
+
+        class Config:
+            """Config"""
+
+            model = EdiImport
+            include = columns_list + [
+                "uuid_identification",
+                "flow_name",
+                "supplier",
+                "supplier_ident",
+                "created_at",
+                "modified_at",
+            ]
+
+    return ZBuRefacSageSchema
+
+
+ZBuRefacSageSchema = LazySchema("Zburefac", z_bu_refac_sage_schema)
 
 
 def main():
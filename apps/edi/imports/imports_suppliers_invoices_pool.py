@@ -24,14 +24,12 @@ from apps.edi.bin.make_insertion_suppliers_invoices import (
     make_insert_edi_files,
 )
 from apps.edi.bin.edi_pre_processing_pool import (
-    bulk_translate_file,
-    interson_translate_file,
     transferts_cosium_file,
-    johnson_file,
-    wsau_file,
+    wsau_check_file,
     z_bu_refac_file,
 )
 from apps.edi.bin.edi_post_processing_pool import (
+    post_insert,
     bulk_post_insert,
     cosium_post_insert,
     cosium_achats_post_insert,
@@ -114,12 +112,10 @@ def bbgr_bulk(file_path: Path):
             "modified_at": timezone.now(),
         },
     }
-    new_file_path = bulk_translate_file(file_path)
     to_print = make_insert_edi_files(
-        model, flow_name, new_file_path, trace, validator, params_dict_loader
+        model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    new_file_path.unlink()
-    bulk_post_insert(trace.uuid_identification)
+    post_insert(bulk_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -293,7 +289,7 @@ def cosium(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    cosium_post_insert(trace.uuid_identification)
+    post_insert(cosium_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -321,7 +317,7 @@ def cosium_achats(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    cosium_achats_post_insert(trace.uuid_identification)
+    post_insert(cosium_achats_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -351,7 +347,7 @@ def transfert_cosium(file_path: Path):
         to_print = make_insert_edi_files(
             model, flow_name, new_file_path, trace, validator, params_dict_loader
         )
-        tansferts_cosium_post_insert(trace.uuid_identification)
+        post_insert(tansferts_cosium_post_insert, trace.uuid_identification)
 
     except Exception as error:
         trace.errors = True
@@ -389,7 +385,7 @@ def edi(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    edi_post_insert(trace.uuid_identification)
+    post_insert(edi_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -418,7 +414,7 @@ def eye_confort(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    eye_confort_post_insert(trace.uuid_identification)
+    post_insert(eye_confort_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -446,7 +442,7 @@ def generique(file_path: Path):
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
     trace.save()
-    generique_post_insert(trace.uuid_identification)
+    post_insert(generique_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -474,8 +470,8 @@ def generique_internal(file_path: Path):
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
     trace.save()
-    generique_post_insert(trace.uuid_identification, post=False)
-    generique_post_insert_internal(trace.uuid_identification)
+    post_insert(generique_post_insert, trace.uuid_identification, post=False)
+    post_insert(generique_post_insert_internal, trace.uuid_identification)
 
     return trace, to_print
 
@@ -504,7 +500,7 @@ def hearing(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    hearing_post_insert(trace.uuid_identification)
+    post_insert(hearing_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -530,11 +526,10 @@ def interson(file_path: Path):
             "modified_at": timezone.now(),
         },
     }
-    new_file_path = interson_translate_file(file_path)
     to_print = make_insert_edi_files(
-        model, flow_name, new_file_path, trace, validator, params_dict_loader
+        model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    interson_post_insert(trace.uuid_identification)
+    post_insert(interson_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -561,14 +556,12 @@ def johnson(file_path: Path):
         },
         "exclude_rows_dict": {1: "Total"},
     }
-    new_file = file_path
     to_print = "erreur"
     try:
-        new_file = johnson_file(file_path)
         to_print = make_insert_edi_files(
-            model, flow_name, new_file, trace, validator, params_dict_loader
+            model, flow_name, file_path, trace, validator, params_dict_loader
         )
-        johnson_post_insert(trace.uuid_identification)
+        post_insert(johnson_post_insert, trace.uuid_identification)
     except OSError as error:
         trace.errors = True
         trace.comment = (
@@ -582,8 +575,6 @@ def johnson(file_path: Path):
         trace.comment = "Une erreur c'est produite veuillez consulter les logs"
         trace.save()
         LOGGER_EDI.exception(f"johnson_file : {error!r}")
-    finally:
-        new_file.unlink()
 
     return trace, to_print
 
@@ -612,7 +603,7 @@ def lmc(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    lmc_post_insert(trace.uuid_identification)
+    post_insert(lmc_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -641,7 +632,7 @@ def newson(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    newson_post_insert(trace.uuid_identification)
+    post_insert(newson_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -670,7 +661,7 @@ def phonak(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    phonak_post_insert(trace.uuid_identification)
+    post_insert(phonak_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -701,7 +692,7 @@ def hansaton(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    phonak_post_insert(trace.uuid_identification)
+    post_insert(phonak_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -730,7 +721,7 @@ def prodition(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    prodition_post_insert(trace.uuid_identification)
+    post_insert(prodition_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -759,7 +750,7 @@ def signia(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    signia_post_insert(trace.uuid_identification)
+    post_insert(signia_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -788,7 +779,7 @@ def starkey(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    starkey_post_insert(trace.uuid_identification)
+    post_insert(starkey_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -817,7 +808,7 @@ def technidis(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    technidis_post_insert(trace.uuid_identification)
+    post_insert(technidis_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -846,7 +837,7 @@ def unitron(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    unitron_post_insert(trace.uuid_identification)
+    post_insert(unitron_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -875,7 +866,7 @@ def widex(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    widex_post_insert(trace.uuid_identification)
+    post_insert(widex_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -904,11 +895,11 @@ def wsau(file_path: Path):
 
     to_print = "erreur"
     try:
-        wsau_file(file_path)
+        wsau_check_file(file_path)
         to_print = make_insert_edi_files(
             model, flow_name, file_path, trace, validator, params_dict_loader
         )
-        widex_post_insert(trace.uuid_identification)
+        post_insert(widex_post_insert, trace.uuid_identification)
 
     except AttributeError as error:
         trace.errors = True
@@ -951,7 +942,7 @@ def widex_ga(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, file_path, trace, validator, params_dict_loader
     )
-    widexga_post_insert(trace.uuid_identification)
+    post_insert(widexga_post_insert, trace.uuid_identification)
 
     return trace, to_print
 
@@ -981,7 +972,7 @@ def z_bu_refac(file_path: Path):
     to_print = make_insert_edi_files(
         model, flow_name, new_file, trace, validator, params_dict_loader
     )
-    z_bu_refac_post_insert(trace.uuid_identification)
+    post_insert(z_bu_refac_post_insert, trace.uuid_identification)
     new_file.unlink()
 
     return trace, to_print
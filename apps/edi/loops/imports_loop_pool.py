@@ -12,16 +12,17 @@ modified at: 2022-04-09
 modified by: Paulo ALVES
 """
 
-from typing import AnyStr
+from typing import AnyStr, List
 import asyncio
-import re
+import datetime
 from pathlib import Path
 import time
 
 from psycopg2 import sql
 from django.db import transaction, close_old_connections
+from django.utils import timezone
 from asgiref.sync import sync_to_async
-from celery import group
+from celery import chord, group
 
 from heron import celery_app
 from heron.loggers import LOGGER_EDI
@@ -58,8 +59,15 @@ from apps.edi.imports.imports_suppliers_invoices_pool import (
 )
 from apps.core.functions.functions_setups import settings
 from apps.core.models import SSEProgress
-from apps.data_flux.utilities import encoding_detect
-from apps.data_flux.postgres_save import get_random_name
+from apps.edi.bin.edi_splitter import split_edi_files
+from apps.edi.bin.import_scheduler import schedule_files
+from apps.edi.bin.files_hashes import (
+    file_sha256,
+    get_flow_name,
+    get_flow_names_dict,
+    get_hashes_set,
+    quarantine_file,
+)
 from apps.users.models import User
 from apps.parameters.bin.core import get_action
 from apps.parameters.models import ActionInProgress
@@ -93,8 +101,10 @@ processing_dict = {
 }
 
 
-def separate_edi():
-    """Séparation des fichiers EDI (ex.: JULBO qui met plusieurs edi dans un seul fichier"""
+def separate_edi(progress: SSEProgress = None):
+    """Séparation des fichiers EDI (ex.: JULBO qui met plusieurs edi dans un seul fichier
+    :param progress: SSEProgress de l'import, pour y reporter les fichiers séparés
+    """
     edi_files_directory = Path(settings.PROCESSING_SUPPLIERS_DIR) / "EDI"
 
     try:
@@ -109,68 +119,84 @@ def separate_edi():
             )
             return
 
+        files_list = []
+
         for file in edi_files_directory.glob("*"):
-            try:
-                if file.name.startswith("._"):
-                    if file.is_file():
-                        file.unlink()
-
-                else:
-                    encoding = encoding_detect(file) or "ascii"
-                    una_test = False
-
-                    with open(file, "r", encoding=encoding) as edi_file:
-                        text = edi_file.read().strip()
-                        split_text = re.split(r"(?=UNA:\+).*[\n|']", text)
-
-                        if len(split_text) > 2:
-                            for text_edi_file in split_text:
-                                if text_edi_file:
-                                    una_test = True
-                                    file_name = (
-                                        Path(settings.PROCESSING_SUPPLIERS_DIR)
-                                        / f"EDI/{file.stem}.{get_random_name()}.edi"
-                                    )
-
-                                    # On s'assure que le nom du fichier n'existe pas
-                                    while True:
-                                        if not file_name.is_file():
-                                            break
-
-                                    with open(
-                                        file_name,
-                                        "w",
-                                        encoding=encoding,
-                                    ) as file_to_write:
-                                        file_to_write.write(text_edi_file)
-
-                    if una_test:
-                        file.unlink()
-            except Exception as e:
-                LOGGER_EDI.error(f"Erreur lors du traitement du fichier {file}: {e}")
+            if not file.is_file():
                 continue
+
+            if file.name.startswith("._"):
+                file.unlink()
+            else:
+                files_list.append(file)
+
+        split_files, written_files = split_edi_files(files_list)
+
+        if split_files:
+            LOGGER_EDI.warning(
+                f"separate_edi : {split_files} fichiers séparés en {written_files}"
+            )
+
+            if progress is not None:
+                metadata = progress.metadata or {"success": [], "failed": []}
+                edi_split = metadata.get("edi_split") or {"files": 0, "interchanges": 0}
+                edi_split["files"] += split_files
+                edi_split["interchanges"] += written_files
+                metadata["edi_split"] = edi_split
+                progress.metadata = metadata
+                progress.update_progress(
+                    message=(
+                        f"{split_files} fichiers EDI séparés "
+                        f"en {written_files} interchanges"
+                    )
+                )
+
     except Exception as e:
         LOGGER_EDI.exception(f"Erreur lors de la séparation des fichiers EDI: {e}")
 
 
-def get_files_celery():
+def get_files_celery(progress: SSEProgress = None):
     """Retourne la liste des tuples (fichier, process) à traiter par celery,
     ne pouvant serializer des fonctions ou objets python
+    :param progress: SSEProgress de l'import, pour y reporter les fichiers séparés
     """
-    separate_edi()
+    separate_edi(progress)
     files_list = []
+    duplicates_list = []
+    flow_names_dict = get_flow_names_dict()
+    hashes_set = get_hashes_set()
 
     for directory, _ in processing_dict.items():
         files_directory = Path(settings.PROCESSING_SUPPLIERS_DIR) / directory
         backup_dir = Path(settings.BACKUP_SUPPLIERS_DIR) / directory
+        flow_name = get_flow_name(directory, flow_names_dict)
 
         for file in files_directory.glob("*"):
             if file.name.startswith("._"):
                 if file.is_file():
                     file.unlink()
             else:
+                sha256 = file_sha256(file) if file.is_file() else None
+
+                # Les fichiers déjà intégrés (ou en double dans l'envoi) sont écartés
+                if sha256 is not None and (flow_name, sha256) in hashes_set:
+                    quarantine_file(file, directory)
+                    duplicates_list.append(file.name)
+                    continue
+
+                hashes_set.add((flow_name, sha256))
                 backup_file = backup_dir / file.name
-                files_list.append((str(file), str(backup_file), directory))
+                files_list.append(
+                    (str(file), str(backup_file), directory, flow_name, sha256)
+                )
+
+    if duplicates_list and progress is not None:
+        metadata = progress.metadata or {"success": [], "failed": []}
+        metadata["duplicates"] = metadata.get("duplicates", []) + duplicates_list
+        progress.metadata = metadata
+        progress.update_progress(
+            message=f"{len(duplicates_list)} fichiers déjà intégrés écartés"
+        )
 
     return files_list
 
@@ -461,12 +487,38 @@ def have_files():
     return False
 
 
+def launch_import_chord(tasks_list: List, start_all: float, job_id: str):
+    """Lance les tâches d'import en chord, sans bloquer sur les résultats.
+    Chaque tâche met à jour la progression dès qu'elle a fini, les post-traitements
+    groupés par flux, le nettoyage général, la fin de la progression et la libération
+    de l'action sont faits une seule fois par le corps du chord (import_launch_finish),
+    qui reçoit les résultats des tâches d'import
+    :param tasks_list: signatures des tâches d'import
+    :param start_all: début de l'import
+    :param job_id: ID du job pour le suivi SSEProgress
+    """
+    finish_signature = celery_app.signature(
+        "import_launch_finish",
+        kwargs={"start_all": start_all, "job_id": job_id},
+    )
+    finish_signature.on_error(
+        celery_app.signature("import_launch_failed", kwargs={"job_id": job_id})
+    )
+
+    if tasks_list:
+        chord(tasks_list)(finish_signature)
+    else:
+        finish_signature.apply_async(args=([],))
+
+
 def celery_import_launch(user_pk: int, job_id: str):
-    """Main pour lancement de l'import avec Celery"""
+    """Main pour lancement de l'import avec Celery, rend la main dès que le chord
+    des imports est lancé"""
 
     active_action = None
     action = True
     progress = None
+    chord_launched = False
 
     try:
         tasks_list = []
@@ -492,12 +544,25 @@ def celery_import_launch(user_pk: int, job_id: str):
 
         start_all = time.time()
 
-        # On boucle sur les fichiers à insérer
-        proc_files_l = get_files_celery()
-
         # Récupérer le SSEProgress créé dans la vue
         progress = SSEProgress.objects.get(job_id=job_id)
 
+        # On boucle sur les fichiers à insérer
+        proc_files_l = get_files_celery(progress)
+
+        # Les fichiers les plus longs à importer partent en premier
+        proc_files_l, estimated_seconds = schedule_files(proc_files_l)
+        metadata = progress.metadata or {"success": [], "failed": []}
+        metadata["estimated_seconds"] = int(estimated_seconds)
+        metadata["estimated_finish"] = (
+            timezone.now() + datetime.timedelta(seconds=estimated_seconds)
+        ).isoformat()
+        progress.metadata = metadata
+
+        # Des fichiers ont pu être séparés ou ajoutés depuis la vue
+        progress.total_items = len(proc_files_l) + 1
+        progress.save()
+
         for row_args in proc_files_l:
             tasks_list.append(
                 celery_app.signature(
@@ -506,30 +571,14 @@ def celery_import_launch(user_pk: int, job_id: str):
                         "process_objects": row_args,
                         "user_pk": user_pk,
                         "job_id": job_id,
+                        "batch_post_insert": True,
                     },
                 )
             )
 
-        result = group(*tasks_list)().get(3600)
-        LOGGER_EDI.warning(f"result : {result!r},\nin {time.time() - start_all} s")
-
-        result_clean = group(
-            *[
-                celery_app.signature(
-                    "sql_clean_general",
-                    kwargs={"start_all": start_all, "job_id": job_id},
-                )
-            ]
-        )().get(3600)
-        LOGGER_EDI.warning(
-            f"result_clean : {result_clean!r},\nin {time.time() - start_all} s"
-        )
-
-        # Marquer comme terminé
-        if progress:
-            # Rafraîchir depuis la DB pour avoir les dernières valeurs
-            progress.refresh_from_db()
-            progress.mark_as_completed()
+        # Le chord se charge de la fin de l'import et de la libération de l'action
+        launch_import_chord(tasks_list, start_all, job_id)
+        chord_launched = True
 
     except Exception as error:
         LOGGER_EDI.exception(
@@ -545,9 +594,10 @@ def celery_import_launch(user_pk: int, job_id: str):
             LOGGER_EDI.error(f"Impossible de marquer le SSEProgress comme failed: {e}")
 
     finally:
-        # On remet l'action en cours à False, après l'execution
-        active_action.in_progress = False
-        active_action.save()
+        # Si le chord n'a pas été lancé, on remet l'action en cours à False
+        if active_action is not None and not chord_launched:
+            active_action.in_progress = False
+            active_action.save()
 
 
 def import_launch_bbgr(function_name: str, user_pk: int, job_id: str):
@@ -556,6 +606,7 @@ def import_launch_bbgr(function_name: str, user_pk: int, job_id: str):
     active_action = None
     action = True
     progress = None
+    chord_launched = False
 
     try:
         # S'assurer que l'objet ActionInProgress existe
@@ -582,37 +633,20 @@ def import_launch_bbgr(function_name: str, user_pk: int, job_id: str):
 
         start_all = time.time()
 
-        result = group(
-            *[
-                celery_app.signature(
-                    "bbgr_bi",
-                    kwargs={
-                        "function_name": function_name,
-                        "user_pk": user_pk,
-                        "job_id": job_id,
-                    },
-                )
-            ]
-        )().get(3600)
-        LOGGER_EDI.warning(f"result : {result!r},\nin {time.time() - start_all} s")
-
-        result_clean = group(
-            *[
-                celery_app.signature(
-                    "sql_clean_general",
-                    kwargs={"start_all": start_all, "job_id": job_id},
-                )
-            ]
-        )().get(3600)
-        LOGGER_EDI.warning(
-            f"result_clean : {result_clean!r},\nin {time.time() - start_all} s"
-        )
+        tasks_list = [
+            celery_app.signature(
+                "bbgr_bi",
+                kwargs={
+                    "function_name": function_name,
+                    "user_pk": user_pk,
+                    "job_id": job_id,
+                },
+            )
+        ]
 
-        # Marquer comme terminé
-        if progress:
-            # Rafraîchir depuis la DB pour avoir les dernières valeurs
-            progress.refresh_from_db()
-            progress.mark_as_completed()
+        # Le chord se charge de la fin de l'import et de la libération de l'action
+        launch_import_chord(tasks_list, start_all, job_id)
+        chord_launched = True
 
     except Exception as error:
         LOGGER_EDI.exception(
@@ -628,9 +662,10 @@ def import_launch_bbgr(function_name: str, user_pk: int, job_id: str):
             LOGGER_EDI.error(f"Impossible de marquer le SSEProgress comme failed: {e}")
 
     finally:
-        # On remet l'action en cours à False, après l'execution
-        active_action.in_progress = False
-        active_action.save()
+        # Si le chord n'a pas été lancé, on remet l'action en cours à False
+        if active_action is not None and not chord_launched:
+            active_action.in_progress = False
+            active_action.save()
 
 
 def import_launch_subscriptions(
@@ -611,6 +611,21 @@ class ColumnDefinition(models.Model):
         unique_together = (("flow_name", "ranking"),)
 
 
+class EdiFileHash(DatesTable):
+    """Empreintes SHA-256 des fichiers fournisseurs déjà intégrés,
+    pour écarter les fichiers renvoyés à l'identique avant leur import
+    """
+
+    flow_name = models.CharField(max_length=80)
+    sha256 = models.CharField(max_length=64)
+    file_name = models.CharField(null=True, blank=True, max_length=255)
+
+    class Meta:
+        """class Meta"""
+
+        unique_together = (("flow_name", "sha256"),)
+
+
 class ChronoDirect(models.Model):
     """Parsing du fichier chronodirect"""
     reference_cosium = models.CharField(max_length=35, verbose_name="référence cosium")
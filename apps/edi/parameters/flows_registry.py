@@ -0,0 +1,156 @@
+# pylint: disable=E0401
+"""
+FR : Registre en cache des définitions des flux fournisseurs (SupplierDefinition et ColumnDefinition)
+EN : Cached registry of supplier flows definitions (SupplierDefinition and ColumnDefinition)
+
+Commentaire:
+    Toutes les définitions sont chargées en une seule requête et gardées en mémoire dans
+    le process. La version du registre est celle du registre de cache FLOWS_REGISTRY_CACHE_NAME,
+    incrémentée par les signaux de apps.edi.signals à chaque modification des définitions.
+    Elle est relue une fois par import (refresh_flows_registry), et au plus toutes les
+    FLOWS_VERSION_CHECK_SECONDS pour les autres utilisations. Si le cache partagé est local
+    (redis indisponible), les définitions sont aussi rechargées toutes les
+    FLOWS_LOCAL_RELOAD_SECONDS.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from typing import AnyStr, Dict
+import time
+
+from django.db import connection
+
+from apps.data_flux.cache import (
+    FLOWS_REGISTRY_CACHE_NAME,
+    LocalSharedCache,
+    get_cache_registry,
+)
+
+# Délai maximum entre deux lectures de la version, hors refresh_flows_registry
+FLOWS_VERSION_CHECK_SECONDS = 60
+
+# Sans redis, les invalidations des autres process ne sont pas reçues,
+# les définitions sont alors rechargées au plus tard après ce délai
+FLOWS_LOCAL_RELOAD_SECONDS = 300
+
+SQL_FLOWS_DEFINITIONS = """
+select
+    "sd"."flow_name",
+    "sd"."first_line",
+    "sd"."encoding",
+    "sd"."delimiter",
+    "sd"."lineterminator",
+    "sd"."quotechar",
+    "sd"."escapechar",
+    "cd"."attr_name",
+    "cd"."file_column"
+from "edi_supplierdefinition" "sd"
+left join "edi_columndefinition" "cd"
+on "cd"."flow_name" = "sd"."flow_name"
+order by "sd"."flow_name", "cd"."ranking"
+"""
+
+# Registre des flux en mémoire :
+# {"version": version, "checked_at": time.monotonic(), "loaded_at": time.monotonic(),
+#  "flows": {flow_name: définition}}
+FLOWS_REGISTRY_DICT = {"version": None, "checked_at": None, "loaded_at": None, "flows": {}}
+
+
+def get_flows_version() -> AnyStr:
+    """Renvoie la version des définitions des flux, dans le cache partagé"""
+    return get_cache_registry(FLOWS_REGISTRY_CACHE_NAME).get_version()
+
+
+def load_flows() -> Dict:
+    """Charge en une requête la définition de tous les flux
+    :return: {flow_name: {"columns": {...}, "first_line": int, "loader_params": {...}}}
+    """
+    flows_dict = {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_FLOWS_DEFINITIONS)
+
+        for (
+            flow_name,
+            first_line,
+            encoding,
+            delimiter,
+            lineterminator,
+            quotechar,
+            escapechar,
+            attr_name,
+            file_column,
+        ) in cursor.fetchall():
+            flow_dict = flows_dict.get(flow_name)
+
+            if flow_dict is None:
+                flow_dict = flows_dict[flow_name] = {
+                    "columns": {},
+                    "first_line": first_line,
+                    "loader_params": {
+                        "encoding": encoding or None,
+                        "delimiter": delimiter or ";",
+                        "lineterminator": lineterminator or "\n",
+                        "quotechar": quotechar or '"',
+                        "escapechar": escapechar or '"',
+                    },
+                }
+
+            if attr_name is not None:
+                # file_column est nullable, une ligne incomplète ne concerne que son flux
+                flow_dict["columns"][attr_name] = (
+                    int(file_column)
+                    if file_column is not None and file_column.isnumeric()
+                    else file_column
+                )
+
+    return flows_dict
+
+
+def refresh_flows_registry() -> Dict:
+    """Relit la version des définitions des flux, et les recharge si elles ont changé.
+    À appeler une fois au début de chaque import
+    """
+    version = get_flows_version()
+    now = time.monotonic()
+    FLOWS_REGISTRY_DICT["checked_at"] = now
+    loaded_at = FLOWS_REGISTRY_DICT.get("loaded_at")
+    is_expired = (
+        isinstance(get_cache_registry(FLOWS_REGISTRY_CACHE_NAME).shared, LocalSharedCache)
+        and (loaded_at is None or now - loaded_at > FLOWS_LOCAL_RELOAD_SECONDS)
+    )
+
+    if FLOWS_REGISTRY_DICT.get("version") != version or is_expired:
+        FLOWS_REGISTRY_DICT["flows"] = load_flows()
+        FLOWS_REGISTRY_DICT["version"] = version
+        FLOWS_REGISTRY_DICT["loaded_at"] = now
+
+    return FLOWS_REGISTRY_DICT.get("flows")
+
+
+def reset_flows_registry():
+    """Vide le registre du process, il sera rechargé à la prochaine utilisation"""
+    FLOWS_REGISTRY_DICT["version"] = None
+    FLOWS_REGISTRY_DICT["checked_at"] = None
+
+
+def get_flows_registry() -> Dict:
+    """Renvoie les définitions des flux en mémoire, la version n'est relue
+    que toutes les FLOWS_VERSION_CHECK_SECONDS
+    """
+    checked_at = FLOWS_REGISTRY_DICT.get("checked_at")
+
+    if checked_at is None or time.monotonic() - checked_at > FLOWS_VERSION_CHECK_SECONDS:
+        return refresh_flows_registry()
+
+    return FLOWS_REGISTRY_DICT.get("flows")
+
+
+def get_flow_config(flow_name: AnyStr) -> Dict:
+    """Renvoie la définition du flux, un dictionnaire vide si le flux n'est pas défini
+    :param flow_name: nom du flux
+    """
+    return get_flows_registry().get(flow_name, {})
@@ -14,6 +14,9 @@ modified by: Paulo ALVES
 from typing import AnyStr, Dict
 from django.db import models
 
+from apps.edi.models import ColumnDefinition, SupplierDefinition
+from apps.edi.parameters.flows_registry import get_flow_config
+
 
 def get_columns(model: models.Model, flow_name: AnyStr) -> Dict:
     """
@@ -21,6 +24,9 @@ def get_columns(model: models.Model, flow_name: AnyStr) -> Dict:
     :param flow_name:  Nom de la table
     :return: Le Dictionnaire de correspondance entre le modèle et l'entête du fichier
     """
+    if model is ColumnDefinition:
+        return dict(get_flow_config(flow_name).get("columns", {}))
+
     return {
         dict_row.get("attr_name"): int(dict_row.get("file_column"))
         if dict_row.get("file_column").isnumeric()
@@ -37,6 +43,9 @@ def get_first_line(model: models.Model, flow_name: AnyStr) -> int:
     :param flow_name:  Nom de la table
     :return: Retourne la première ligne du fichier
     """
+    if model is SupplierDefinition:
+        return get_flow_config(flow_name).get("first_line", 1)
+
     try:
         first_line_object = model.objects.get(flow_name=flow_name)
         return first_line_object.first_line
@@ -50,6 +59,9 @@ def get_loader_params_dict(model: models.Model, flow_name: AnyStr) -> int:
     :param flow_name:  Nom de la table
     :return: Retourne le dictionnaire des paramètres pour le loader
     """
+    if model is SupplierDefinition:
+        return dict(get_flow_config(flow_name).get("loader_params", {}))
+
     try:
         object_dict = model.objects.values(
             "encoding",
@@ -0,0 +1,55 @@
+# pylint: disable=E0401,W0613
+"""
+FR : Module des signaux de l'application edi
+EN : Edi application signals module
+
+Commentaire:
+    Invalidation des caches des définitions fournisseurs, dans tous les process,
+    dès qu'une définition est modifiée ou supprimée. L'invalidation est faite au commit de
+    la transaction, sinon un process qui relit les définitions avant le commit mettrait en
+    cache les anciennes valeurs sous la nouvelle version.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.data_flux.cache import (
+    FLOWS_COLUMNS_CACHE_NAME,
+    FLOWS_REGISTRY_CACHE_NAME,
+    SUPPLIERS_CACHE_NAME,
+    get_cache_registry,
+)
+from apps.edi.models import ColumnDefinition, SupplierDefinition
+from apps.edi.parameters.flows_registry import reset_flows_registry
+
+
+@receiver([post_save, post_delete], sender=SupplierDefinition)
+def invalidate_suppliers_cache(sender, **kwargs):
+    """Invalidation du cache des fournisseurs par flow_name"""
+    transaction.on_commit(
+        get_cache_registry(SUPPLIERS_CACHE_NAME).invalidate, using=kwargs.get("using")
+    )
+
+
+@receiver([post_save, post_delete], sender=ColumnDefinition)
+def invalidate_flows_columns_cache(sender, **kwargs):
+    """Invalidation du cache des colonnes des fichiers par flow_name"""
+    transaction.on_commit(
+        get_cache_registry(FLOWS_COLUMNS_CACHE_NAME).invalidate, using=kwargs.get("using")
+    )
+
+
+@receiver([post_save, post_delete], sender=SupplierDefinition)
+@receiver([post_save, post_delete], sender=ColumnDefinition)
+def invalidate_flows_registry(sender, **kwargs):
+    """Invalidation du registre des définitions des flux"""
+    transaction.on_commit(reset_flows_registry, using=kwargs.get("using"))
+    transaction.on_commit(
+        get_cache_registry(FLOWS_REGISTRY_CACHE_NAME).invalidate, using=kwargs.get("using")
+    )
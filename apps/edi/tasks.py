@@ -55,13 +55,18 @@ from apps.edi.imports.imports_suppliers_invoices_pool import (
     z_bu_refac,
 )
 from apps.edi.bin.edi_post_processing_pool import (
+    deferred_post_inserts,
+    run_post_inserts,
     post_vacuum,
     post_processing_all,
     edi_trace_supplier_insert,
 )
 from apps.edi.bin.exclusions import set_exclusions
+from apps.edi.bin.files_hashes import register_file_hash
+from apps.edi.parameters.flows_registry import refresh_flows_registry
 from apps.users.models import User
 from apps.parameters.bin.core import get_object
+from apps.parameters.models import ActionInProgress
 
 processing_dict = {
     "BBGR_BULK": bbgr_bulk,
@@ -100,10 +105,14 @@ bbgr_dict = {
 
 @shared_task(name="suppliers_import")
 @clean_memory
-def launch_suppliers_import(process_objects, user_pk, job_id=None):
+def launch_suppliers_import(process_objects, user_pk, job_id=None, batch_post_insert=False):
     """
     Intégration des factures fournisseurs présentes
-    dans les répertoires de processing/suppliers_invoices_files
+    dans les répertoires de processing/suppliers_invoices_files.
+    Avec batch_post_insert, les post-traitements sont différés et renvoyés dans le résultat
+    de la tâche, pour être lancés groupés par flux dans le corps du chord d'import.
+    L'empreinte du fichier est alors aussi renvoyée, pour n'être enregistrée qu'après
+    la réussite des post-traitements
     """
 
     start_initial = time.time()
@@ -111,7 +120,9 @@ def launch_suppliers_import(process_objects, user_pk, job_id=None):
     error = False
     trace = None
     to_print = ""
-    str_file, str_backup_file, processing_key = process_objects
+    post_inserts_list = []
+    file_hash = None
+    str_file, str_backup_file, processing_key, flow_name, sha256 = process_objects
     file = Path(str_file)
     backup_file = Path(str_backup_file)
     function = processing_dict.get(processing_key)
@@ -121,7 +132,16 @@ def launch_suppliers_import(process_objects, user_pk, job_id=None):
 
     try:
         user = User.objects.get(pk=user_pk)
-        trace, to_print = function(file)
+
+        # Les définitions des flux sont relues une fois par import
+        refresh_flows_registry()
+
+        if batch_post_insert:
+            with deferred_post_inserts() as post_inserts_list:
+                trace, to_print = function(file)
+        else:
+            trace, to_print = function(file)
+
         trace.created_by = user
     except TypeError as except_error:
         error = True
@@ -147,6 +167,16 @@ def launch_suppliers_import(process_objects, user_pk, job_id=None):
             trace.invoices = True
             trace.save()
 
+        # On garde l'empreinte des fichiers intégrés, pour écarter les renvois
+        if not has_error and sha256 is not None and batch_post_insert:
+            file_hash = (flow_name, file.name, sha256, str(trace.uuid_identification))
+
+        elif not has_error and sha256 is not None:
+            try:
+                register_file_hash(flow_name, file.name, sha256)
+            except Exception as hash_error:
+                LOGGER_EDI.exception(f"Erreur enregistrement empreinte: {hash_error}")
+
         if file.is_file() and not backup_file.is_file():
             shutil.move(file.resolve(), backup_file.resolve())
         elif file.is_file():
@@ -188,7 +218,11 @@ def launch_suppliers_import(process_objects, user_pk, job_id=None):
         "======================================================================="
     )
 
-    return {"import : ": f"edi - {processing_key} - {time.time() - start_initial} s"}
+    return {
+        "import : ": f"edi - {processing_key} - {time.time() - start_initial} s",
+        "post_inserts": post_inserts_list,
+        "file_hash": file_hash,
+    }
 
 
 @shared_task(name="bbgr_bi")
@@ -330,6 +364,99 @@ def launch_sql_clean_general(start_all, job_id=None):
     }
 
 
+def release_action_in_progress(action: AnyStr = "import_edi_invoices"):
+    """Remet l'action en cours à False, en fin d'import
+    :param action: action à libérer
+    """
+    with transaction.atomic():
+        active_action = ActionInProgress.objects.select_for_update().get(action=action)
+        active_action.in_progress = False
+        active_action.save()
+
+
+@shared_task(name="import_launch_finish")
+@clean_memory
+def launch_import_finish(results, start_all, job_id=None):
+    """Corps du chord d'import, lancé une seule fois quand toutes les tâches d'import
+    des fichiers sont terminées : post-traitements groupés par flux, nettoyage sql général,
+    fin de la progression et libération de l'action en cours
+    :param results: résultats des tâches d'import du chord
+    """
+    try:
+        post_inserts_list = [
+            post_insert_args
+            for result in results or []
+            if isinstance(result, dict)
+            for post_insert_args in result.get("post_inserts", [])
+        ]
+
+        failed_set = set()
+
+        if post_inserts_list:
+            start_post = time.time()
+            failed_set = run_post_inserts(post_inserts_list)
+            LOGGER_EDI.warning(
+                f"run_post_inserts : {len(post_inserts_list)} fichiers, "
+                f"in {time.time() - start_post} s"
+            )
+
+        # Les empreintes ne sont gardées que pour les fichiers dont les post-traitements
+        # ont réussi, un fichier en erreur pourra être renvoyé
+        for result in results or []:
+            file_hash = result.get("file_hash") if isinstance(result, dict) else None
+
+            if file_hash is None:
+                continue
+
+            flow_name, file_name, sha256, uuid_identification = file_hash
+
+            if uuid_identification in failed_set:
+                continue
+
+            try:
+                register_file_hash(flow_name, file_name, sha256)
+            except Exception as hash_error:
+                LOGGER_EDI.exception(f"Erreur enregistrement empreinte: {hash_error}")
+
+        result_clean = launch_sql_clean_general(start_all, job_id)
+        LOGGER_EDI.warning(
+            f"result_clean : {result_clean!r},\nin {time.time() - start_all} s"
+        )
+
+        if job_id:
+            progress = SSEProgress.objects.get(job_id=job_id)
+            progress.mark_as_completed()
+
+    except Exception as except_error:
+        LOGGER_EDI.exception(
+            f"Exception Générale: sur tâche launch_import_finish\n{except_error!r}"
+        )
+
+    finally:
+        release_action_in_progress()
+
+    return {"Import terminé : ": f"{time.time() - start_all} s"}
+
+
+@shared_task(name="import_launch_failed")
+def launch_import_failed(request, exc, traceback, job_id=None):
+    """Errback du chord d'import, si une tâche d'import n'a pas pu aboutir"""
+    LOGGER_EDI.error(
+        f"Erreur sur la tâche {request.id} du chord d'import : {exc!r}\n{traceback}"
+    )
+
+    try:
+        if job_id:
+            progress = SSEProgress.objects.get(job_id=job_id)
+            progress.mark_as_failed(str(exc))
+
+    except Exception as except_error:
+        LOGGER_EDI.error(f"Impossible de marquer le SSEProgress comme failed: {except_error}")
+
+    finally:
+        release_action_in_progress()
+
+
 @shared_task(name="subscription_launch_task")
 @clean_memory
 def subscription_launch_task(
@@ -0,0 +1,130 @@
+# pylint: disable=E0401,C0413
+"""
+FR : Module de tests des post-traitements groupés des imports fournisseurs
+EN : Suppliers imports batched post-processing tests Module
+
+Commentaire:
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+import os
+import platform
+import sys
+import uuid
+
+import django
+
+BASE_DIR = r"/"
+
+if platform.uname().node not in ["PauloMSI", "MSI"]:
+    BASE_DIR = "/home/paulo/heron"
+
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "heron.settings")
+
+django.setup()
+
+import pytest
+from psycopg2 import sql
+from django.db import connection
+
+from apps.edi.bin.edi_post_processing_pool import execute_post_sql, get_batch_sql
+from apps.edi.sql_files.sql_common import post_common_dict
+from apps.edi.sql_files.sql_all import post_all_dict
+from apps.edi.sql_files.sql_bulk import post_bulk_dict
+from apps.edi.sql_files.sql_bbgr_002_statment import bbgr_002_statment_dict
+from apps.edi.sql_files.sql_bbgr_003_monthly import bbgr_003_monthly_dict
+from apps.edi.sql_files.sql_bbgr_004_retours import bbgr_004_retours_dict
+from apps.edi.sql_files.sql_bbgr_005_receptions import bbgr_005_receptions_dict
+from apps.edi.sql_files.sql_cosium import post_cosium_dict
+from apps.edi.sql_files.sql_cosium_achat import post_cosium_achats_dict
+from apps.edi.sql_files.sql_transferts_cosium import post_transfert_cosium_dict
+from apps.edi.sql_files.sql_edi import post_edi_dict
+from apps.edi.sql_files.sql_eye_confort import post_eye_dict
+from apps.edi.sql_files.sql_generic import post_generic_dict, post_generic_internal_dict
+from apps.edi.sql_files.sql_hearing import post_hearing_dict
+from apps.edi.sql_files.sql_interson import post_interson_dict
+from apps.edi.sql_files.sql_johnson import post_johnson_dict
+from apps.edi.sql_files.sql_lmc import post_lmc_dict
+from apps.edi.sql_files.sql_newson import post_newson_dict
+from apps.edi.sql_files.sql_phonak import post_phonak_dict
+from apps.edi.sql_files.sql_prodition import post_prodition_dict
+from apps.edi.sql_files.sql_signia import post_signia_dict
+from apps.edi.sql_files.sql_starkey import post_starkey_dict
+from apps.edi.sql_files.sql_technidis import post_technidis_dict
+from apps.edi.sql_files.sql_unitron import post_unitron_dict
+from apps.edi.sql_files.sql_widex import post_widex_dict
+from apps.edi.sql_files.sql_z_bu_refac import post_z_bu_refac
+
+POST_DICTS = {
+    "post_common_dict": post_common_dict,
+    "post_all_dict": post_all_dict,
+    "post_bulk_dict": post_bulk_dict,
+    "bbgr_002_statment_dict": bbgr_002_statment_dict,
+    "bbgr_003_monthly_dict": bbgr_003_monthly_dict,
+    "bbgr_004_retours_dict": bbgr_004_retours_dict,
+    "bbgr_005_receptions_dict": bbgr_005_receptions_dict,
+    "post_cosium_dict": post_cosium_dict,
+    "post_cosium_achats_dict": post_cosium_achats_dict,
+    "post_transfert_cosium_dict": post_transfert_cosium_dict,
+    "post_edi_dict": post_edi_dict,
+    "post_eye_dict": post_eye_dict,
+    "post_generic_dict": post_generic_dict,
+    "post_generic_internal_dict": post_generic_internal_dict,
+    "post_hearing_dict": post_hearing_dict,
+    "post_interson_dict": post_interson_dict,
+    "post_johnson_dict": post_johnson_dict,
+    "post_lmc_dict": post_lmc_dict,
+    "post_newson_dict": post_newson_dict,
+    "post_phonak_dict": post_phonak_dict,
+    "post_prodition_dict": post_prodition_dict,
+    "post_signia_dict": post_signia_dict,
+    "post_starkey_dict": post_starkey_dict,
+    "post_technidis_dict": post_technidis_dict,
+    "post_unitron_dict": post_unitron_dict,
+    "post_widex_dict": post_widex_dict,
+    "post_z_bu_refac": post_z_bu_refac,
+}
+
+
+def get_sql_text(statement) -> str:
+    """Texte sql de la requête, sans connexion, en parcourant les sql.Composed"""
+    if isinstance(statement, sql.Composed):
+        return "".join(get_sql_text(part) for part in statement.seq)
+
+    if isinstance(statement, sql.SQL):
+        return statement.string
+
+    return statement if isinstance(statement, str) else ""
+
+
+POST_STATEMENTS_LIST = [
+    pytest.param(statement, id=f"{dict_name}.{statement_name}")
+    for dict_name, post_dict in POST_DICTS.items()
+    for statement_name, statement in post_dict.items()
+    if isinstance(statement, (str, sql.Composable))
+    and "%(uuid_identification)s" in get_sql_text(statement)
+]
+
+
+@pytest.mark.parametrize("statement", POST_STATEMENTS_LIST)
+def test_get_batch_sql(statement):
+    batch_text = get_sql_text(get_batch_sql(statement))
+
+    assert "%(uuid_identification)s" not in batch_text
+    assert "= ANY(%(uuids)s::uuid[])" in batch_text
+    assert get_batch_sql(statement) is get_batch_sql(statement)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("statement", POST_STATEMENTS_LIST)
+def test_execute_post_sql_list(statement):
+    uuids_list = [str(uuid.uuid4()), str(uuid.uuid4())]
+
+    with connection.cursor() as cursor:
+        execute_post_sql(cursor, statement, uuids_list, created_by=str(uuid.uuid4()))
@@ -8,7 +8,7 @@ Commentaire:
 created at: 2023-04-13
 created by: Paulo ALVES
 
-modified at: 2023-04-13
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 import os
@@ -33,21 +33,22 @@ django.setup()
 
 from django.conf import settings
 from django.db import transaction
-from pdfrw import PdfReader, PdfWriter
 from django_celery_results.models import TaskResult
 
 from heron.loggers import LOGGER_INVOICES
 from apps.data_flux.trace import get_trace
-from apps.invoices.bin.pdf_sumary import summary_invoice_pdf
-from apps.invoices.bin.pdf_marchandises import invoice_marchandise_pdf
-from apps.invoices.bin.pdf_rfa import rfa_invoice_pdf
-from apps.invoices.bin.pdf_royalties import invoice_royalties_pdf
-from apps.invoices.bin.pdf_publicity import invoice_publicity_pdf
-from apps.invoices.bin.pdf_prestation import invoice_prestation_pdf
-from apps.invoices.bin.pdf_formation import invoice_formation_pdf
-from apps.invoices.bin.pdf_staff import invoice_staff_pdf
-from apps.invoices.bin.pdf_material import invoice_material_pdf
-from apps.invoices.bin.pdf_various import invoice_various_pdf
+from apps.invoices.bin.conf import DOMAIN
+from apps.invoices.bin.pdf_renderer import merge_pdfs, render_pdfs
+from apps.invoices.bin.pdf_sumary import summary_invoice_content
+from apps.invoices.bin.pdf_marchandises import invoice_marchandise_contents
+from apps.invoices.bin.pdf_rfa import rfa_invoice_content
+from apps.invoices.bin.pdf_royalties import invoice_royalties_content
+from apps.invoices.bin.pdf_publicity import invoice_publicity_content
+from apps.invoices.bin.pdf_prestation import invoice_prestation_content
+from apps.invoices.bin.pdf_formation import invoice_formation_content
+from apps.invoices.bin.pdf_staff import invoice_staff_content
+from apps.invoices.bin.pdf_material import invoice_material_content
+from apps.invoices.bin.pdf_various import invoice_various_content
 from apps.invoices.models import SaleInvoice
 from apps.centers_clients.models import Maison
 
@@ -87,25 +88,21 @@ def invoices_pdf_generation(cct: Maison.cct, num_file: AnyStr):
 
     try:
         generation_pdf_dict = {
-            "marchandises": invoice_marchandise_pdf,
-            "rfa": rfa_invoice_pdf,
-            "redevances": invoice_royalties_pdf,
-            "redevances-de-publicite": invoice_publicity_pdf,
-            "formation": invoice_formation_pdf,
-            "personnel": invoice_staff_pdf,
-            "materiel": invoice_material_pdf,
-            "prestation": invoice_prestation_pdf,
-            "divers": invoice_various_pdf,
+            "marchandises": invoice_marchandise_contents,
+            "rfa": rfa_invoice_content,
+            "redevances": invoice_royalties_content,
+            "redevances-de-publicite": invoice_publicity_content,
+            "formation": invoice_formation_content,
+            "personnel": invoice_staff_content,
+            "materiel": invoice_material_content,
+            "prestation": invoice_prestation_content,
+            "divers": invoice_various_content,
         }
 
-        files_list = []
-        file_num = num_file.replace("_full.pdf", "")
-        file_path = Path(settings.SALES_INVOICES_FILES_DIR) / f"{file_num}_summary.pdf"
+        contents_list = []
 
-        files_list.append(file_path)
-
-        # On génère le pdf du sommaire
-        summary_invoice_pdf(cct, file_path)
+        # On prépare le html du sommaire
+        contents_list.append(summary_invoice_content(cct))
 
         sales_invoices_list = (
             SaleInvoice.objects.filter(
@@ -115,42 +112,28 @@ def invoices_pdf_generation(cct: Maison.cct, num_file: AnyStr):
                 printed=False,
                 type_x3__in=(1, 2),
             )
-            .values_list("cct", "uuid_identification", "big_category_slug_name", "invoice_number")
+            .values_list("uuid_identification", "big_category_slug_name")
             .order_by("big_category_ranking")
         )
 
-        # On boucle sur le différent type de factures
+        # On boucle sur le différent type de factures, pour préparer le html des factures
         for sale in sales_invoices_list:
-            cct_name, uuid_identification, big_category_slug_name, invoice_number = sale
+            uuid_identification, big_category_slug_name = sale
 
             generation_pdf = generation_pdf_dict.get(big_category_slug_name)
 
             if generation_pdf:
-                file_path = (
-                    Path(settings.SALES_INVOICES_FILES_DIR)
-                    / f"{cct_name}_{big_category_slug_name}_{invoice_number}.pdf"
-                )
-                files_list.append(file_path)
-
-                # On génère le pdf des factures
-                generation_pdf(uuid_identification, file_path)
+                contents = generation_pdf(uuid_identification)
 
-        # On fusionne les pdf
-        writer = PdfWriter()
+                # Les marchandises ont plusieurs documents (entête, fournisseurs, détails, ...)
+                if isinstance(contents, str):
+                    contents = [contents]
 
-        # On ajoute chaque page de chaque fichier PDF à l'objet PdfWriter
-        for pdf_file in files_list:
-            reader = PdfReader(pdf_file)
-            for page in reader.pages:
-                writer.addpage(page)
+                contents_list.extend(contents)
 
-        # On enregistre le fichier PDF fusionné
+        # On génère les pdf en parallèle, puis on les fusionne en mémoire
         file_path = Path(settings.SALES_INVOICES_FILES_DIR) / num_file
-        writer.write(file_path)
-
-        # On supprime les fichiers intermédiaires
-        for file in files_list:
-            file.unlink()
+        merge_pdfs(render_pdfs(contents_list, DOMAIN), file_path)
 
         trace.file_name = f"Generate pdf : {num_file}"
         to_print = f"have generate pdf : {num_file} - "
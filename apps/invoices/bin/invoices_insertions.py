@@ -8,16 +8,14 @@ Commentaire:
 created at: 2023-03-11
 created by: Paulo ALVES
 
-modified at: 2023-03-11
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 
-from typing import AnyStr
-import io
+from typing import AnyStr, Tuple
 import os
 import platform
 import sys
-import csv
 import time
 from pathlib import Path
 from uuid import UUID
@@ -36,26 +34,27 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "heron.settings")
 django.setup()
 
 import pendulum
+from psycopg2 import sql
 from django.conf import settings
 from django.utils import timezone
 from django.db.models import Count, Q
 
 from heron.loggers import LOGGER_EDI, LOGGER_INVOICES
 from apps.core.models import SSEProgress
-from apps.core.bin.echeances import get_payment_method_elements, get_due_date
+from apps.core.bin.echeances import get_due_dates_calendar
 from apps.core.functions.functions_setups import connection, transaction
 from apps.core.utils.progress_bar import update_progress_threaded
 from apps.data_flux.postgres_save import (
     PostgresKeyError,
     PostgresTypeError,
-    PostgresDjangoUpsert,
+    get_random_name,
 )
 from apps.data_flux.trace import get_trace
 from apps.users.models import User
 from apps.edi.models import EdiImport
 from apps.edi.bin.cct_update import update_cct_edi_import
 from apps.invoices.bin.pre_controls import control_alls_missings
-from apps.invoices.models import Invoice, SaleInvoice
+from apps.invoices.models import SaleInvoice
 from apps.parameters.bin.generic_nums import get_generic_cct_num
 from apps.data_flux.models import Trace
 from apps.invoices.sql_files.sql_invoices_insertions import (
@@ -63,18 +62,24 @@ from apps.invoices.sql_files.sql_invoices_insertions import (
     SQL_FIX_IMPORT_UUID,
     SQL_COMMON_DETAILS,
     SQL_PURCHASES_INVOICES,
+    SQL_INVOICES_TEMP_TABLE,
+    SQL_INVOICES_TEMP_COUNT,
+    SQL_INVOICES_TEMP_DROP,
+    SQL_PURCHASES_DUE_DATES_PAIRS,
+    SQL_PURCHASES_INSERT_SELECT,
     SQL_PURCHASE_FOR_EXPORT_X3,
     SQL_PURCHASES_DETAILS,
     SQL_PURCHASE_DETAILS_FOR_EXPORT_X3,
     SQL_CONTROL_PURCHASES_INSERTION,
     SQL_CLEAR_INVOICES_SIGNBOARDS,
     SQL_SALES_INVOICES,
+    SQL_SALES_INSERT_SELECT,
     SQL_SALES_FOR_EXPORT_X3,
     SQL_SALES_DETAILS,
     SQL_CONTROL_SALES_INSERTION,
 )
 from apps.invoices.bin.columns import COLS_PURCHASE_DICT, COL_SALES_DICT
-from apps.invoices.bin.invoives_nums import get_purchase_num, get_invoice_num
+from apps.invoices.bin.invoives_nums import get_purchase_nums_params, get_invoice_nums_params
 from apps.invoices.loops.mise_a_jour_loop import process_update
 from apps.centers_purchasing.bin.update_account_article import update_axes_edi
 from apps.parameters.models import CounterNums
@@ -108,11 +113,34 @@ def set_sales_details(cursor: connection.cursor) -> None:
     cursor.execute(SQL_SALES_DETAILS)
 
 
+def create_invoices_temp_table(
+    cursor: connection.cursor, sql_select: sql.SQL, order_by: sql.SQL
+) -> Tuple[sql.Identifier, int]:
+    """
+    Création de la table provisoire des entêtes de factures à insérer, directement en base
+    :param cursor: cursor django pour la db
+    :param sql_select: requête des entêtes de factures
+    :param order_by: ordre de numérotation des factures
+    :return: table provisoire, nombre de factures
+    """
+    temp_table = sql.Identifier(f"invoices_{get_random_name()}")
+    cursor.execute(
+        SQL_INVOICES_TEMP_TABLE.format(
+            temp_table=temp_table, order_by=order_by, select=sql_select
+        )
+    )
+    cursor.execute(SQL_INVOICES_TEMP_COUNT.format(temp_table=temp_table))
+    (invoices_number,) = cursor.fetchone()
+
+    return temp_table, invoices_number
+
+
 def set_purchases_invoices(
     cursor: connection.cursor, user: User, invoice_date_iso: AnyStr
 ) -> [bool, AnyStr]:
     """
-    Remplissage du fichier io pour insertion en base des factures de vente
+    Insertion en base des factures d'achat par un insert ... select, les données restent
+    dans postgresql, seul le calendrier des échéances est calculé en python
     :param cursor: cursor django pour la db
     :param user: utilisateur qui a lancé la commande
     :param invoice_date_iso: mois d'intégration de la facture au format isoformat
@@ -121,7 +149,6 @@ def set_purchases_invoices(
     integration_month = (
         pendulum.parse(invoice_date_iso).date().start_of("month").isoformat()
     )
-    model = Invoice
     file_name = "select ..."
     trace_name = "Insertion des factures d'achat"
     application_name = "purchasess_invoices_insertion"
@@ -129,65 +156,40 @@ def set_purchases_invoices(
     comment = "Factures d'Achat"
     trace = get_trace(trace_name, file_name, application_name, flow_name, comment)
     error = False
-    file_io = io.StringIO()
+    temp_table = None
     to_print = ""
 
-    # On initialise le cache de la fonction qui renvoie les modes de paiements
-    get_payment_method_elements.cache_clear()
-
     try:
-        csv_writer = csv.writer(
-            file_io, delimiter=";", quotechar='"', quoting=csv.QUOTE_ALL
-        )
-        cursor.execute(SQL_PURCHASES_INVOICES)
-
-        for line in cursor.fetchall():
-            *line_to_write, auuid = list(line)
-            # invoice_sage_number
-            line_to_write[5] = (
-                f"{line_to_write[15]}"
-                f"{str(line_to_write[10])[-2:]}"
-                f"{str(line_to_write[8].month).zfill(2)}"
-                f"{get_purchase_num()}"
-            )[-20:]
-            # print(get_due_date(str(line_to_write[8]), auuid))
-            # date_echeance
-            line_to_write[17] = get_due_date(str(line_to_write[8]), auuid)
-            # created_by
-            line_to_write[25] = user.uuid_identification
-            # modified by
-            line_to_write[26] = user.uuid_identification
-            # Mois d'intégration = période de facturation
-            line_to_write[29] = integration_month
-            # print(line_to_write)
-            # print(dict(zip(COLS_PURCHASE_DICT, line_to_write)))
-
-            csv_writer.writerow(line_to_write)
-
-        file_io.seek(0)
-        postgres_upsert = PostgresDjangoUpsert(
-            model=model,
-            fields_dict=COLS_PURCHASE_DICT,
-            cnx=connection,
-            exclude_update_fields={},
-        )
-        file_io.seek(0)
-        postgres_upsert.insertion(
-            file=file_io,
-            insert_mode="do_nothing",
-            delimiter=";",
-            quote_character='"',
-            kwargs_prepared={"trace": trace},
+        temp_table, invoices_number = create_invoices_temp_table(
+            cursor,
+            SQL_PURCHASES_INVOICES,
+            sql.SQL('order by "third_party_num", "invoice_number"'),
         )
 
-    # Exceptions PostgresDjangoUpsert ==========================================================
-    except PostgresKeyError as except_error:
-        error = True
-        LOGGER_EDI.exception(f"PostgresKeyError : {except_error!r}")
-
-    except PostgresTypeError as except_error:
-        error = True
-        LOGGER_EDI.exception(f"PostgresTypeError : {except_error!r}")
+        # Calcul unique des échéances par couple (date de facture, mode de règlement)
+        cursor.execute(SQL_PURCHASES_DUE_DATES_PAIRS.format(temp_table=temp_table))
+        due_dates_dict = get_due_dates_calendar(cursor.fetchall())
+
+        # Réservation en une requête des numéros de toutes les factures
+        nums_params = get_purchase_nums_params(invoices_number)
+
+        cursor.execute(
+            SQL_PURCHASES_INSERT_SELECT.format(
+                fields=sql.SQL(", ").join(map(sql.Identifier, COLS_PURCHASE_DICT)),
+                temp_table=temp_table,
+            ),
+            {
+                **nums_params,
+                "user_uuid": str(user.uuid_identification),
+                "integration_month": integration_month,
+                "invoices_dates": [invoice_date for invoice_date, _ in due_dates_dict],
+                "auuids": [auuid for _, auuid in due_dates_dict],
+                "due_dates": [
+                    None if due_date is None else str(due_date)
+                    for due_date in due_dates_dict.values()
+                ],
+            },
+        )
 
     # Exception Générale =======================================================================
     except Exception as except_error:
@@ -202,17 +204,12 @@ def set_purchases_invoices(
                 + "\n. Une erreur c'est produite veuillez consulter les logs"
             )
 
+        if temp_table is not None:
+            cursor.execute(SQL_INVOICES_TEMP_DROP.format(temp_table=temp_table))
+
         trace.time_to_process = (timezone.now() - trace.created_at).total_seconds()
         trace.save()
 
-        try:
-            if not file_io.closed:
-                file_io.close()
-            del file_io
-
-        except (AttributeError, NameError):
-            pass
-
     return error, to_print
 
 
@@ -220,14 +217,14 @@ def set_sales_invoices(
     cursor: connection.cursor, user: User, invoice_date_iso: AnyStr
 ) -> [bool, AnyStr]:
     """
-    Remplissage du fichier io pour insertion en base des factures de vente
+    Insertion en base des factures de vente par un insert ... select,
+    les données restent dans postgresql
     :param cursor: cursor django pour la db
     :param user: utilisateur qui a lancé la commande
     :param invoice_date_iso: date de la facture au format isoformat
     :return:
     """
     invoice_date = pendulum.parse(invoice_date_iso).date()
-    model = SaleInvoice
     file_name = "select ..."
     trace_name = "Insertion des factures de vente"
     application_name = "sales_invoices_insertion"
@@ -238,53 +235,33 @@ def set_sales_invoices(
     )
     trace = get_trace(trace_name, file_name, application_name, flow_name, comment)
     error = False
-    file_io = io.StringIO()
+    temp_table = None
     to_print = ""
 
     try:
-        csv_writer = csv.writer(
-            file_io, delimiter=";", quotechar='"', quoting=csv.QUOTE_ALL
-        )
         cursor.execute(SQL_CLEAR_INVOICES_SIGNBOARDS)
-        cursor.execute(SQL_SALES_INVOICES)
-
-        for line in cursor.fetchall():
-            invoice_num = get_invoice_num(invoice_date)
-            line_to_write = list(line)
-            line_to_write[5] = invoice_num
-            line_to_write[6] = f"{str(line[34])}{invoice_num}"
-            line_to_write[8] = invoice_date.isoformat()
-            line_to_write[9] = invoice_date.start_of("month").isoformat()
-            line_to_write[10] = invoice_date.year
-            line_to_write[20] = user.uuid_identification
-            line_to_write[21] = user.uuid_identification
-
-            csv_writer.writerow(line_to_write)
-
-        file_io.seek(0)
-        postgres_upsert = PostgresDjangoUpsert(
-            model=model,
-            fields_dict=COL_SALES_DICT,
-            cnx=connection,
-            exclude_update_fields={},
-        )
-        file_io.seek(0)
-        postgres_upsert.insertion(
-            file=file_io,
-            insert_mode="do_nothing",
-            delimiter=";",
-            quote_character='"',
-            kwargs_prepared={"trace": trace},
+        temp_table, invoices_number = create_invoices_temp_table(
+            cursor,
+            SQL_SALES_INVOICES,
+            sql.SQL('order by "cct", "big_category_ranking"'),
         )
 
-    # Exceptions PostgresDjangoUpsert ==========================================================
-    except PostgresKeyError as except_error:
-        error = True
-        LOGGER_EDI.exception(f"PostgresKeyError : {except_error!r}")
-
-    except PostgresTypeError as except_error:
-        error = True
-        LOGGER_EDI.exception(f"PostgresTypeError : {except_error!r}")
+        # Réservation en une requête des numéros de toutes les factures
+        nums_params = get_invoice_nums_params(invoice_date, invoices_number)
+
+        cursor.execute(
+            SQL_SALES_INSERT_SELECT.format(
+                fields=sql.SQL(", ").join(map(sql.Identifier, COL_SALES_DICT)),
+                temp_table=temp_table,
+            ),
+            {
+                **nums_params,
+                "user_uuid": str(user.uuid_identification),
+                "invoice_date": invoice_date.isoformat(),
+                "invoice_month": invoice_date.start_of("month").isoformat(),
+                "invoice_year": invoice_date.year,
+            },
+        )
 
     # Exception Générale =======================================================================
     except Exception as except_error:
@@ -299,17 +276,12 @@ def set_sales_invoices(
                 + "\n. Une erreur c'est produite veuillez consulter les logs"
             )
 
+        if temp_table is not None:
+            cursor.execute(SQL_INVOICES_TEMP_DROP.format(temp_table=temp_table))
+
         trace.time_to_process = (timezone.now() - trace.created_at).total_seconds()
         trace.save()
 
-        try:
-            if not file_io.closed:
-                file_io.close()
-            del file_io
-
-        except (AttributeError, NameError):
-            pass
-
     return error, to_print
 
 
@@ -9,12 +9,14 @@ Commentaire:
 created at: 2023-03-04
 created by: Paulo ALVES
 
-modified at: 2023-03-04
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
+from typing import Dict, Iterator
+
 import pendulum
 
-from apps.parameters.bin.core import get_counter_num
+from apps.parameters.bin.core import get_counter_num, get_counter_nums, get_counter_sql_params
 from apps.parameters.models import Counter
 
 
@@ -32,6 +34,37 @@ def get_invoice_num(invoice_dte: pendulum.instance):
     return fac_num
 
 
+def get_invoice_nums(invoice_dte: pendulum.instance, nums_number: int) -> Iterator[str]:
+    """Génération en une seule réservation des numéros de facture de Vente Enseigne
+    :param invoice_dte: Date de la facture (instance de pendulumm
+    :param nums_number: nombre de numéros à générer
+    :return: itérateur des numéros de facture
+    """
+    counter = Counter.objects.get(name="invoices_num")
+    fac_nums = get_counter_nums(
+        counter_instance=counter,
+        nums_number=nums_number,
+        attr_instance_dict={"prefix": invoice_dte},
+    )
+
+    return fac_nums
+
+
+def get_invoice_nums_params(invoice_dte: pendulum.instance, nums_number: int) -> Dict:
+    """Réservation des numéros de facture de Vente Enseigne, pour une numérotation en sql
+    :param invoice_dte: Date de la facture (instance de pendulumm
+    :param nums_number: nombre de numéros à réserver
+    :return: paramètres sql de la numérotation
+    """
+    counter = Counter.objects.get(name="invoices_num")
+
+    return get_counter_sql_params(
+        counter_instance=counter,
+        nums_number=nums_number,
+        attr_instance_dict={"prefix": invoice_dte},
+    )
+
+
 def get_purchase_num():
     """Génération d'un numéro de facture de Vente Enseigne
     :return:
@@ -44,6 +77,33 @@ def get_purchase_num():
     return fac_num
 
 
+def get_purchase_nums(nums_number: int) -> Iterator[str]:
+    """Génération en une seule réservation des numéros de facture d'achat
+    :param nums_number: nombre de numéros à générer
+    :return: itérateur des numéros de facture
+    """
+    counter = Counter.objects.get(name="purchase_num")
+    fac_nums = get_counter_nums(
+        counter_instance=counter,
+        nums_number=nums_number,
+    )
+
+    return fac_nums
+
+
+def get_purchase_nums_params(nums_number: int) -> Dict:
+    """Réservation des numéros de facture d'achat, pour une numérotation en sql
+    :param nums_number: nombre de numéros à réserver
+    :return: paramètres sql de la numérotation
+    """
+    counter = Counter.objects.get(name="purchase_num")
+
+    return get_counter_sql_params(
+        counter_instance=counter,
+        nums_number=nums_number,
+    )
+
+
 def get_bicpar_num():
     """Génération d'un numéro des fichiers d'export x3 des factures de vente
     :return:
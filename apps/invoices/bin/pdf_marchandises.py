@@ -8,21 +8,19 @@ Commentaire:
 created at: 2023-04-11
 created by: Paulo ALVES
 
-modified at: 2023-04 -11
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 from pathlib import Path
 from uuid import UUID
-from typing import AnyStr
+from typing import AnyStr, List
 
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.db import connection
-from weasyprint import HTML
-from weasyprint.text.fonts import FontConfiguration
-from pdfrw import PdfReader, PdfWriter
 
 from apps.invoices.bin.conf import DOMAIN
+from apps.invoices.bin.pdf_renderer import merge_pdfs, render_pdfs, write_pdf_file
 from apps.invoices.models import SaleInvoice, EnteteDetails
 from apps.invoices.sql_files.sql_marchandises import (
     SQL_HEADER,
@@ -33,12 +31,11 @@ from apps.invoices.sql_files.sql_marchandises import (
 )
 
 
-def marchandise_header_invoice_pdf(uuid_invoice: UUID, pdf_path: Path) -> AnyStr:
+def marchandise_header_invoice_content(uuid_invoice: UUID) -> AnyStr:
     """
     Génération des entêtes de factures de marchandises
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
 
     with connection.cursor() as cursor:
@@ -64,18 +61,14 @@ def marchandise_header_invoice_pdf(uuid_invoice: UUID, pdf_path: Path) -> AnyStr
             "domain": DOMAIN,
             "logo": str(invoices[0].signboard.logo_signboard).replace("logos/", ""),
         }
-        content = render_to_string("invoices/pdf_marchandises_header.html", context)
-        font_config = FontConfiguration()
-        html = HTML(string=content)
-        html.write_pdf(pdf_path, font_config=font_config)
+        return render_to_string("invoices/pdf_marchandises_header.html", context)
 
 
-def marchandise_suppliers_invoice_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> AnyStr:
+def marchandise_suppliers_invoice_content(uuid_invoice: UUID) -> AnyStr:
     """
     Génération des récapitulatifs par fournisseurs
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
 
     with connection.cursor() as cursor:
@@ -94,18 +87,14 @@ def marchandise_suppliers_invoice_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> A
             "domain": DOMAIN,
             "logo": str(invoices[0].signboard.logo_signboard).replace("logos/", ""),
         }
-        content = render_to_string("invoices/pdf_marchandises_suppliers.html", context)
-        font_config = FontConfiguration()
-        html = HTML(string=content)
-        html.write_pdf(pdf_path, font_config=font_config)
+        return render_to_string("invoices/pdf_marchandises_suppliers.html", context)
 
 
-def marchandise_details_invoice_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> AnyStr:
+def marchandise_details_invoice_content(uuid_invoice: UUID) -> AnyStr:
     """
     Génération des pages Détails par fournisseurs
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
 
     with connection.cursor() as cursor:
@@ -125,18 +114,14 @@ def marchandise_details_invoice_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> Any
             "domain": DOMAIN,
             "logo": str(invoices[0].signboard.logo_signboard).replace("logos/", ""),
         }
-        content = render_to_string("invoices/pdf_marchandises_details.html", context)
-        font_config = FontConfiguration()
-        html = HTML(string=content)
-        html.write_pdf(pdf_path, font_config=font_config)
+        return render_to_string("invoices/pdf_marchandises_details.html", context)
 
 
-def marchandise_sub_details_invoice_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> AnyStr:
+def marchandise_sub_details_invoice_content(uuid_invoice: UUID) -> AnyStr:
     """
     Génération des pages de marchandises
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
 
     with connection.cursor() as cursor:
@@ -155,47 +140,33 @@ def marchandise_sub_details_invoice_pdf(uuid_invoice: UUID, pdf_path: AnyStr) ->
             "domain": DOMAIN,
             "logo": str(invoices[0].signboard.logo_signboard).replace("logos/", ""),
         }
-        content = render_to_string("invoices/pdf_marchandises_sub_details.html", context)
-        font_config = FontConfiguration()
-        html = HTML(string=content)
-        html.write_pdf(pdf_path, font_config=font_config)
+        return render_to_string("invoices/pdf_marchandises_sub_details.html", context)
 
 
-def invoice_marchandise_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> None:
+def invoice_marchandise_contents(uuid_invoice: UUID) -> List[AnyStr]:
     """
-    Génération des pages de marchandises
+    Contenus html des pages de marchandises, dans l'ordre des pages
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: liste des contenus html (entête, fournisseurs, détails, sous-détails)
     """
     marchandise_dict = {
-        "header": marchandise_header_invoice_pdf,
-        "suppliers": marchandise_suppliers_invoice_pdf,
-        "details": marchandise_details_invoice_pdf,
-        "sub_details": marchandise_sub_details_invoice_pdf,
+        "header": marchandise_header_invoice_content,
+        "suppliers": marchandise_suppliers_invoice_content,
+        "details": marchandise_details_invoice_content,
+        "sub_details": marchandise_sub_details_invoice_content,
     }
-    files_list = []
-
-    for name, generation in marchandise_dict.items():
-        pdf_path_name = Path(str(pdf_path)[:-4]+f"_{name}.pdf")
-        generation(uuid_invoice=uuid_invoice, pdf_path=pdf_path_name)
-        files_list.append(pdf_path_name)
-
-    # On fusionne les pdf
-    writer = PdfWriter()
 
-    # On ajoute chaque page de chaque fichier PDF à l'objet PdfWriter
-    for pdf_file in files_list:
-        reader = PdfReader(pdf_file)
-        for page in reader.pages:
-            writer.addpage(page)
+    return [generation(uuid_invoice=uuid_invoice) for generation in marchandise_dict.values()]
 
-    # On enregistre le fichier PDF fusionné
-    writer.write(pdf_path)
 
-    for file in files_list:
-        if file.is_file():
-            file.unlink()
+def invoice_marchandise_pdf(uuid_invoice: UUID, pdf_path: AnyStr) -> None:
+    """
+    Génération des pages de marchandises
+    :param uuid_invoice: uuid_identification de la facture
+    :param pdf_path: Path du fichier pdf
+    :return: None
+    """
+    merge_pdfs(render_pdfs(invoice_marchandise_contents(uuid_invoice), DOMAIN), pdf_path)
 
 
 if __name__ == "__main__":
@@ -203,16 +174,16 @@ if __name__ == "__main__":
     sale = SaleInvoice.objects.get(uuid_identification=uuid_invoice_to_pdf)
 
     header_path = Path(settings.SALES_INVOICES_FILES_DIR) / f"{sale.cct}_header_marchandise.pdf"
-    marchandise_header_invoice_pdf(uuid_invoice=uuid_invoice_to_pdf, pdf_path=header_path)
+    write_pdf_file(marchandise_header_invoice_content(uuid_invoice_to_pdf), header_path)
 
     supplier_path = Path(settings.SALES_INVOICES_FILES_DIR) / f"{sale.cct}_supplier_marchandise.pdf"
-    marchandise_suppliers_invoice_pdf(uuid_invoice=uuid_invoice_to_pdf, pdf_path=supplier_path)
+    write_pdf_file(marchandise_suppliers_invoice_content(uuid_invoice_to_pdf), supplier_path)
 
     details_path = Path(settings.SALES_INVOICES_FILES_DIR) / f"{sale.cct}_details_marchandise.pdf"
-    marchandise_details_invoice_pdf(uuid_invoice=uuid_invoice_to_pdf, pdf_path=details_path)
+    write_pdf_file(marchandise_details_invoice_content(uuid_invoice_to_pdf), details_path)
 
     sub_path = Path(settings.SALES_INVOICES_FILES_DIR) / f"{sale.cct}_sub_marchandise.pdf"
-    marchandise_sub_details_invoice_pdf(uuid_invoice=uuid_invoice_to_pdf, pdf_path=sub_path)
+    write_pdf_file(marchandise_sub_details_invoice_content(uuid_invoice_to_pdf), sub_path)
 
     sub_path = Path(settings.SALES_INVOICES_FILES_DIR) / f"{sale.cct}_{sale.invoice_number}.pdf"
     invoice_marchandise_pdf(uuid_invoice=uuid_invoice_to_pdf, pdf_path=sub_path)
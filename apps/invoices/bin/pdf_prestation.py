@@ -12,25 +12,24 @@ modified at: 2023-04-16
 modified by: Paulo ALVES
 """
 from uuid import UUID
+from typing import AnyStr
 from pathlib import Path
 
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.db import connection
-from weasyprint import HTML
-from weasyprint.text.fonts import FontConfiguration
 
 from apps.invoices.bin.conf import DOMAIN
+from apps.invoices.bin.pdf_renderer import write_pdf_file
 from apps.invoices.models import SaleInvoice
 from apps.invoices.sql_files.sql_prestation import SQL_HEADER, SQL_RESUME_HEADER
 
 
-def invoice_prestation_pdf(uuid_invoice: UUID, pdf_path: Path) -> None:
+def invoice_prestation_content(uuid_invoice: UUID) -> AnyStr:
     """
     Generation de la facture de prestation
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
 
     with connection.cursor() as cursor:
@@ -57,10 +56,17 @@ def invoice_prestation_pdf(uuid_invoice: UUID, pdf_path: Path) -> None:
             "domain": DOMAIN,
             "logo": str(invoices[0].signboard.logo_signboard).replace("logos/", ""),
         }
-        content = render_to_string("invoices/pdf_prestation.html", context)
-        font_config = FontConfiguration()
-        html = HTML(string=content)
-        html.write_pdf(pdf_path, font_config=font_config)
+        return render_to_string("invoices/pdf_prestation.html", context)
+
+
+def invoice_prestation_pdf(uuid_invoice: UUID, pdf_path: Path) -> None:
+    """
+    Generation de la facture de prestation
+    :param uuid_invoice: uuid_identification de la facture
+    :param pdf_path: Path du fichier pdf
+    :return: None
+    """
+    write_pdf_file(invoice_prestation_content(uuid_invoice), pdf_path)
 
 
 if __name__ == "__main__":
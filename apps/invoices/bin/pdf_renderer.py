@@ -0,0 +1,285 @@
+# pylint: disable=E0401,W0703,W1203
+"""
+FR : Service de rendu des factures pdf WeasyPrint, avec un pool de process gardés au chaud
+EN : WeasyPrint invoices PDF rendering service, with a pool of warm worker processes
+
+Commentaire:
+    Les templates des factures chargent les polices et les logos par url ({{ domain }}/static/),
+    soit une requête http par ressource et par document. Chaque process de rendu garde
+    une FontConfiguration et un cache des ressources déjà chargées, préchargé au démarrage
+    du process avec les polices et le logo Héron, les logos des enseignes sont mis en cache
+    au premier document qui les utilise.
+    Le rendu html -> pdf est limité par le cpu, les documents d'un cct sont donc rendus en
+    parallèle dans le pool et renvoyés en mémoire (io.BytesIO), dans l'ordre des documents.
+    Si le pool ne peut pas être utilisé, le rendu est fait dans le process courant,
+    avec les mêmes caches. C'est le cas des workers celery prefork, process démons
+    qui ne peuvent pas créer de process enfants.
+    Le pool est dimensionné sur les cpu laissés à chaque tâche par la concurrence celery,
+    les cct étant eux-mêmes rendus en parallèle par les workers.
+    Les pdf en mémoire sont fusionnés sans fichiers intermédiaires, les ressources
+    identiques des pages (polices, images, ...) n'étant écrites qu'une fois dans le
+    fichier fusionné.
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+from typing import AnyStr, Dict, Iterable, List
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+
+from pdfrw import PdfArray, PdfDict, PdfReader, PdfWriter
+from weasyprint import HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+from heron import celery_app
+from heron.loggers import LOGGER_INVOICES
+
+# Nombre de documents rendus avec la même FontConfiguration, avant de la recréer,
+# chaque document y ajoute ses @font-face
+FONT_CONFIG_MAX_DOCUMENTS = 200
+
+# Ressources statiques préchargées au démarrage de chaque process de rendu
+PRELOAD_STATIC_FILES = (
+    "ClanMedium.otf",
+    "ClanBook.otf",
+    "ClanThin.otf",
+    "logo_heron_01.png",
+)
+
+# Configuration des polices du process : {"font_config": FontConfiguration, "documents": int}
+RENDER_CONFIG_DICT = {"font_config": None, "documents": 0}
+
+# Ressources déjà chargées par le process, par url
+RESOURCES_CACHE_DICT = {}
+
+# Pool des process de rendu : {"pool": ProcessPoolExecutor, "allowed": (pid, bool)}
+RENDER_POOL_DICT = {}
+RENDER_POOL_LOCK = threading.Lock()
+
+
+def cached_url_fetcher(url: AnyStr) -> Dict:
+    """url_fetcher WeasyPrint, qui garde en mémoire les ressources déjà chargées
+    :param url: url de la ressource
+    :return: dictionnaire de la ressource au format url_fetcher
+    """
+    resource = RESOURCES_CACHE_DICT.get(url)
+
+    if resource is None:
+        resource = default_url_fetcher(url)
+        file_obj = resource.pop("file_obj", None)
+
+        if file_obj is not None:
+            try:
+                resource["string"] = file_obj.read()
+            finally:
+                file_obj.close()
+
+        RESOURCES_CACHE_DICT[url] = resource
+
+    return dict(resource)
+
+
+def get_font_config() -> FontConfiguration:
+    """Renvoie la FontConfiguration du process, recréée tous les FONT_CONFIG_MAX_DOCUMENTS"""
+    if (
+        RENDER_CONFIG_DICT.get("font_config") is None
+        or RENDER_CONFIG_DICT.get("documents") >= FONT_CONFIG_MAX_DOCUMENTS
+    ):
+        RENDER_CONFIG_DICT["font_config"] = FontConfiguration()
+        RENDER_CONFIG_DICT["documents"] = 0
+
+    RENDER_CONFIG_DICT["documents"] += 1
+
+    return RENDER_CONFIG_DICT.get("font_config")
+
+
+def init_render_worker(domain: AnyStr = None):
+    """Initialisation d'un process de rendu : polices et ressources statiques
+    :param domain: domaine des ressources statiques des templates
+    """
+    RENDER_CONFIG_DICT["font_config"] = FontConfiguration()
+    RENDER_CONFIG_DICT["documents"] = 0
+
+    if domain is None:
+        return
+
+    for file_name in PRELOAD_STATIC_FILES:
+        try:
+            cached_url_fetcher(f"{domain}/static/{file_name}")
+        except Exception:
+            # La ressource sera chargée au premier document qui l'utilise
+            pass
+
+
+def render_pdf(content: AnyStr) -> bytes:
+    """Rendu pdf d'un contenu html
+    :param content: contenu html
+    :return: pdf
+    """
+    html = HTML(string=content, url_fetcher=cached_url_fetcher)
+
+    return html.write_pdf(font_config=get_font_config())
+
+
+def write_pdf_file(content: AnyStr, pdf_path: Path):
+    """Rendu pdf d'un contenu html dans un fichier
+    :param content: contenu html
+    :param pdf_path: Path du fichier pdf
+    """
+    Path(pdf_path).write_bytes(render_pdf(content))
+
+
+def get_render_workers() -> int:
+    """Renvoie le nombre de process de rendu, les cpu étant partagés entre les tâches celery"""
+    cpu_count = os.cpu_count() or 1
+    worker_concurrency = celery_app.conf.worker_concurrency or cpu_count
+
+    return max(1, cpu_count // worker_concurrency)
+
+
+def is_render_pool_allowed() -> bool:
+    """Renvoie True si le process courant peut créer le pool de rendu,
+    un process démon (worker celery prefork) ne pouvant pas avoir de process enfants.
+    Le résultat est gardé par pid, un process forké héritant du dictionnaire de son parent.
+    """
+    pid = os.getpid()
+    allowed = RENDER_POOL_DICT.get("allowed")
+
+    if allowed is None or allowed[0] != pid:
+        allowed = RENDER_POOL_DICT["allowed"] = (
+            pid,
+            not multiprocessing.current_process().daemon and get_render_workers() > 1,
+        )
+
+    return allowed[1]
+
+
+def get_render_pool(domain: AnyStr = None) -> ProcessPoolExecutor:
+    """Renvoie le pool des process de rendu, créé à la première demande
+    :param domain: domaine des ressources statiques à précharger
+    """
+    with RENDER_POOL_LOCK:
+        render_pool = RENDER_POOL_DICT.get("pool")
+
+        if render_pool is None:
+            render_pool = RENDER_POOL_DICT["pool"] = ProcessPoolExecutor(
+                max_workers=get_render_workers(),
+                initializer=init_render_worker,
+                initargs=(domain,),
+            )
+
+    return render_pool
+
+
+def reset_render_pool():
+    """Arrête le pool des process de rendu, il sera recréé à la prochaine demande"""
+    with RENDER_POOL_LOCK:
+        render_pool = RENDER_POOL_DICT.pop("pool", None)
+
+    if render_pool is not None:
+        render_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_pdfs(contents: Iterable[AnyStr], domain: AnyStr = None) -> List[io.BytesIO]:
+    """Rendu en parallèle des contenus html en pdf
+    :param contents: contenus html, dans l'ordre des documents
+    :param domain: domaine des ressources statiques à précharger
+    :return: pdf en mémoire, dans l'ordre des contenus
+    """
+    contents_list = list(contents)
+
+    if len(contents_list) > 1 and is_render_pool_allowed():
+        try:
+            return [
+                io.BytesIO(pdf)
+                for pdf in get_render_pool(domain).map(render_pdf, contents_list)
+            ]
+
+        except (AssertionError, OSError, BrokenProcessPool) as error:
+            # ex.: process de rendu tué, limite de process atteinte
+            LOGGER_INVOICES.warning(f"Pool de rendu pdf indisponible : {error!r}")
+            reset_render_pool()
+
+    return [io.BytesIO(render_pdf(content)) for content in contents_list]
+
+
+def share_pdf_object(pdf_object, shared_dict: Dict, seen_dict: Dict):
+    """Remplace récursivement les objets pdf par la première instance de contenu identique
+    :param pdf_object: objet pdfrw (PdfDict, PdfArray, ou valeur simple)
+    :param shared_dict: instances partagées, par empreinte de contenu
+    :param seen_dict: objets déjà traités, par id : (objet partagé, empreinte)
+    :return: objet partagé, empreinte du contenu
+    """
+    if not isinstance(pdf_object, (PdfDict, PdfArray)):
+        return pdf_object, str(pdf_object)
+
+    seen = seen_dict.get(id(pdf_object))
+
+    if seen is not None:
+        return seen
+
+    # Empreinte provisoire unique, en cas de référence circulaire
+    seen_dict[id(pdf_object)] = (pdf_object, f"#{id(pdf_object)}")
+
+    if isinstance(pdf_object, PdfDict):
+        contents = []
+
+        for key, value in sorted(pdf_object.iteritems(), key=lambda item: str(item[0])):
+            shared_value, value_key = share_pdf_object(value, shared_dict, seen_dict)
+
+            if shared_value is not value:
+                pdf_object[key] = shared_value
+
+            contents.append(f"{key} {value_key}")
+
+        content = f"<<{' '.join(contents)}>>{pdf_object.stream or ''}"
+
+    else:
+        contents = []
+
+        for index, value in enumerate(pdf_object):
+            shared_value, value_key = share_pdf_object(value, shared_dict, seen_dict)
+
+            if shared_value is not value:
+                pdf_object[index] = shared_value
+
+            contents.append(value_key)
+
+        content = f"[{' '.join(contents)}]"
+
+    object_key = hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+    shared_object = shared_dict.setdefault(object_key, pdf_object)
+    seen_dict[id(pdf_object)] = (shared_object, object_key)
+
+    return shared_object, object_key
+
+
+def merge_pdfs(pdf_buffers: Iterable[io.BytesIO], pdf_path: Path):
+    """Fusion en mémoire des pdf, écrite une seule fois dans le fichier
+    :param pdf_buffers: pdf en mémoire, dans l'ordre des documents
+    :param pdf_path: Path du fichier pdf fusionné
+    """
+    writer = PdfWriter()
+    shared_dict = {}
+    seen_dict = {}
+
+    for pdf_buffer in pdf_buffers:
+        reader = PdfReader(fdata=pdf_buffer.getvalue())
+
+        for page in reader.pages:
+            # Les ressources identiques des documents ne sont écrites qu'une fois
+            if page.Resources is not None:
+                page.Resources, _ = share_pdf_object(page.Resources, shared_dict, seen_dict)
+
+            writer.addpage(page)
+
+    writer.write(Path(pdf_path))
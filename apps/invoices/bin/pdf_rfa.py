@@ -17,20 +17,18 @@ from typing import AnyStr
 
 from django.template.loader import render_to_string
 from django.db import connection
-from weasyprint import HTML
-from weasyprint.text.fonts import FontConfiguration
 
 from apps.invoices.bin.conf import DOMAIN
+from apps.invoices.bin.pdf_renderer import write_pdf_file
 from apps.invoices.models import SaleInvoice
 from apps.invoices.sql_files.sql_rfa import SQL_HEADER, SQL_RESUME_HEADER
 
 
-def rfa_invoice_pdf(uuid_invoice: UUID, pdf_path: Path) -> AnyStr:
+def rfa_invoice_content(uuid_invoice: UUID) -> AnyStr:
     """
     Génération des factures de rfa
     :param uuid_invoice: uuid_identification de la facture
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
 
     with connection.cursor() as cursor:
@@ -56,10 +54,17 @@ def rfa_invoice_pdf(uuid_invoice: UUID, pdf_path: Path) -> AnyStr:
             "domain": DOMAIN,
             "logo": str(invoices[0].signboard.logo_signboard).replace("logos/", ""),
         }
-        content = render_to_string("invoices/pdf_rfa.html", context)
-        font_config = FontConfiguration()
-        html = HTML(string=content)
-        html.write_pdf(pdf_path, font_config=font_config)
+        return render_to_string("invoices/pdf_rfa.html", context)
+
+
+def rfa_invoice_pdf(uuid_invoice: UUID, pdf_path: Path) -> None:
+    """
+    Génération des factures de rfa
+    :param uuid_invoice: uuid_identification de la facture
+    :param pdf_path: Path du fichier pdf
+    :return: None
+    """
+    write_pdf_file(rfa_invoice_content(uuid_invoice), pdf_path)
 
 
 if __name__ == "__main__":
@@ -17,20 +17,18 @@ from pathlib import Path
 
 from django.template.loader import render_to_string
 from django.conf import settings
-from weasyprint import HTML
-from weasyprint.text.fonts import FontConfiguration
 
 from apps.invoices.bin.conf import DOMAIN
+from apps.invoices.bin.pdf_renderer import write_pdf_file
 from apps.invoices.models import SaleInvoice
 from apps.centers_purchasing.models import ChildCenterPurchase
 
 
-def summary_invoice_pdf(cct: AnyStr, pdf_path: Path) -> None:
+def summary_invoice_content(cct: AnyStr) -> AnyStr:
     """
     Generation de la page de resumé de facture
     :param cct: Maison facturée
-    :param pdf_path: Path du fichier pdf
-    :return: None
+    :return: contenu html du pdf
     """
     sale = SaleInvoice.objects.filter(
         cct=cct, final=False, printed=False, type_x3__in=(1, 2)
@@ -49,10 +47,17 @@ def summary_invoice_pdf(cct: AnyStr, pdf_path: Path) -> None:
         "domain": DOMAIN,
         "center_puchase": center_puchase,
     }
-    content = render_to_string("invoices/pdf_summary.html", context)
-    font_config = FontConfiguration()
-    html = HTML(string=content)
-    html.write_pdf(pdf_path, font_config=font_config)
+    return render_to_string("invoices/pdf_summary.html", context)
+
+
+def summary_invoice_pdf(cct: AnyStr, pdf_path: Path) -> None:
+    """
+    Generation de la page de resumé de facture
+    :param cct: Maison facturée
+    :param pdf_path: Path du fichier pdf
+    :return: None
+    """
+    write_pdf_file(summary_invoice_content(cct), pdf_path)
 
 
 if __name__ == "__main__":
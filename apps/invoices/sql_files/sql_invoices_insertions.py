@@ -8,7 +8,7 @@ Commentaire:
 created at: 2023-03-11
 created by: Paulo ALVES
 
-modified at: 2023-03-11
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 from psycopg2 import sql
@@ -353,6 +353,102 @@ SQL_PURCHASES_INVOICES = sql.SQL(
     """
 )
 
+SQL_INVOICES_TEMP_TABLE = sql.SQL(
+    # Table provisoire des entêtes de factures à insérer, rangées dans l'ordre de numérotation
+    """
+    create temporary table {temp_table} as
+    select 
+        "src".*,
+        (row_number() over ({order_by}) - 1)::integer as "rank_num"
+    from ({select}) "src"
+    """
+)
+
+SQL_INVOICES_TEMP_COUNT = sql.SQL(
+    """
+    select count(*) from {temp_table}
+    """
+)
+
+SQL_INVOICES_TEMP_DROP = sql.SQL(
+    """
+    drop table if exists {temp_table}
+    """
+)
+
+SQL_PURCHASES_DUE_DATES_PAIRS = sql.SQL(
+    # Couples distincts (date de facture, mode de règlement) pour le calendrier des échéances
+    """
+    select distinct 
+        "invoice_date"::varchar as "invoice_date", 
+        "auuid"
+    from {temp_table}
+    where "auuid" is not null
+    """
+)
+
+SQL_PURCHASES_INSERT_SELECT = sql.SQL(
+    # Insertion des entêtes de factures d'achat depuis la table provisoire,
+    # numérotation à partir de la plage réservée et jointure du calendrier des échéances
+    """
+    insert into "invoices_invoice" ({fields})
+    select 
+        "tmp"."created_at",
+        "tmp"."modified_at",
+        "tmp"."final",
+        "tmp"."export",
+        "tmp"."uuid_identification",
+        right(
+            coalesce("tmp"."third_party_num", '')
+            || right("tmp"."invoice_year"::varchar, 2)
+            || lpad(extract(month from "tmp"."invoice_date")::integer::varchar, 2, '0')
+            || "tmp"."counter_num",
+            20
+        ) as "invoice_sage_number",
+        "tmp"."invoice_number",
+        "tmp"."invoice_type",
+        "tmp"."invoice_date",
+        "tmp"."invoice_month",
+        "tmp"."invoice_year",
+        "tmp"."vat_regime",
+        "tmp"."invoice_amount_without_tax",
+        "tmp"."invoice_amount_tax",
+        "tmp"."invoice_amount_with_tax",
+        "tmp"."third_party_num",
+        "tmp"."adresse_tiers",
+        "due"."date_echeance"::date as "date_echeance",
+        "tmp"."mode_reglement",
+        "tmp"."type_reglement",
+        "tmp"."code_center",
+        "tmp"."code_signboard",
+        "tmp"."devise",
+        "tmp"."purchase_invoice",
+        "tmp"."adresse_tiers_paye",
+        %(user_uuid)s::uuid as "created_by",
+        %(user_uuid)s::uuid as "modified_by",
+        "tmp"."cpy",
+        "tmp"."fcy",
+        %(integration_month)s::date as "integration_month",
+        "tmp"."code_plan_sage"
+    from (
+        select 
+            *,
+            %(num_prefix)s || lpad(
+                (%(first_num)s + "rank_num")::varchar, 
+                greatest(%(lpad_num)s, length((%(first_num)s + "rank_num")::varchar)), 
+                '0'
+            ) as "counter_num"
+        from {temp_table}
+    ) "tmp"
+    left join unnest(
+        %(invoices_dates)s::varchar[], %(auuids)s::varchar[], %(due_dates)s::varchar[]
+    ) as "due" ("invoice_date", "auuid", "date_echeance")
+    on "due"."invoice_date" = "tmp"."invoice_date"::varchar
+    and "due"."auuid" = "tmp"."auuid"
+    on conflict do nothing
+    """
+)
+
 SQL_PURCHASES_DETAILS = sql.SQL(
     # insertion des détails spécifiques aux achats
     """
@@ -858,6 +954,64 @@ SQL_SALES_INVOICES = sql.SQL(
     """
 )
 
+SQL_SALES_INSERT_SELECT = sql.SQL(
+    # Insertion des entêtes de factures de ventes depuis la table provisoire,
+    # numérotation à partir de la plage réservée
+    """
+    insert into "invoices_saleinvoice" ({fields})
+    select 
+        "tmp"."created_at",
+        "tmp"."modified_at",
+        "tmp"."final",
+        "tmp"."export",
+        "tmp"."uuid_identification",
+        "tmp"."counter_num" as "invoice_number",
+        coalesce("tmp"."fcy", '') || "tmp"."counter_num" as "invoice_sage_number",
+        "tmp"."invoice_type",
+        %(invoice_date)s::date as "invoice_date",
+        %(invoice_month)s::date as "invoice_month",
+        %(invoice_year)s::integer as "invoice_year",
+        "tmp"."vat_regime",
+        "tmp"."invoice_amount_without_tax",
+        "tmp"."invoice_amount_tax",
+        "tmp"."invoice_amount_with_tax",
+        "tmp"."big_category",
+        "tmp"."big_category_code",
+        "tmp"."big_category_slug_name",
+        "tmp"."cct",
+        "tmp"."centers",
+        %(user_uuid)s::uuid as "created_by",
+        %(user_uuid)s::uuid as "modified_by",
+        "tmp"."parties",
+        "tmp"."signboard",
+        "tmp"."third_party_num",
+        "tmp"."code_center",
+        "tmp"."code_signboard",
+        "tmp"."devise",
+        "tmp"."sale_invoice",
+        "tmp"."printed",
+        "tmp"."mode_reglement",
+        "tmp"."big_category_ranking",
+        "tmp"."formation",
+        "tmp"."send_email",
+        "tmp"."fcy",
+        "tmp"."cpy",
+        "tmp"."invoice_type_name",
+        "tmp"."type_x3"
+    from (
+        select 
+            *,
+            %(num_prefix)s || lpad(
+                (%(first_num)s + "rank_num")::varchar, 
+                greatest(%(lpad_num)s, length((%(first_num)s + "rank_num")::varchar)), 
+                '0'
+            ) as "counter_num"
+        from {temp_table}
+    ) "tmp"
+    on conflict do nothing
+    """
+)
+
 SQL_SALES_FOR_EXPORT_X3 = sql.SQL(
     """
     update "invoices_saleinvoice" "isv"
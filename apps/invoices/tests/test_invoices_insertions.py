@@ -0,0 +1,71 @@
+# pylint: disable=E0401,C0413,W0621
+"""
+FR : Module de tests des insertions des factures d'achat et de vente
+EN : Purchases and sales invoices insertions tests Module
+
+Commentaire:
+
+created at: 2026-10-18
+created by: Paulo ALVES
+
+modified at: 2026-10-18
+modified by: Paulo ALVES
+"""
+import os
+import platform
+import sys
+
+import django
+
+BASE_DIR = r"/"
+
+if platform.uname().node not in ["PauloMSI", "MSI"]:
+    BASE_DIR = "/home/paulo/heron"
+
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "heron.settings")
+
+django.setup()
+
+import pytest
+import pendulum
+from django.db import connection
+
+from apps.data_flux.models import Trace
+from apps.invoices.bin.invoices_insertions import set_purchases_invoices, set_sales_invoices
+from apps.parameters.models import Counter
+from apps.users.models import User
+
+
+@pytest.fixture
+def insertion_user():
+    """Utilisateur et compteurs de numérotation des factures"""
+    Counter.objects.get_or_create(name="purchase_num", defaults={"lpad_num": 9})
+    Counter.objects.get_or_create(
+        name="invoices_num", defaults={"prefix": "AAAAMM", "lpad_num": 6}
+    )
+
+    return User.objects.create(email="test_insertions@heron.fr", code_child_center="TEST")
+
+
+@pytest.mark.django_db
+def test_set_purchases_invoices(insertion_user):
+    invoice_date_iso = pendulum.now().date().isoformat()
+
+    with connection.cursor() as cursor:
+        error, _ = set_purchases_invoices(cursor, insertion_user, invoice_date_iso)
+
+    assert error is False
+    assert not Trace.objects.filter(flow_name="Purchases_Insertion", errors=True).exists()
+
+
+@pytest.mark.django_db
+def test_set_sales_invoices(insertion_user):
+    invoice_date_iso = pendulum.now().date().isoformat()
+
+    with connection.cursor() as cursor:
+        error, _ = set_sales_invoices(cursor, insertion_user, invoice_date_iso)
+
+    assert error is False
+    assert not Trace.objects.filter(flow_name="Sales_Insertion", errors=True).exists()
@@ -8,11 +8,11 @@ Commentaire:
 created at: 2022-12-27
 created by: Paulo ALVES
 
-modified at: 2022-12-27
+modified at: 2026-10-18
 modified by: Paulo ALVES
 """
 
-from typing import Any, AnyStr, Dict
+from typing import Any, AnyStr, Dict, Iterator, Tuple
 from datetime import timedelta
 
 import pendulum
@@ -33,6 +33,16 @@ from apps.parameters.models import (
     CounterNums,
 )
 
+# Réservation d'une plage de numéros : le compteur est créé s'il n'existe pas,
+# "num" est le prochain numéro à attribuer, on renvoie le premier numéro réservé
+SQL_RESERVE_COUNTER_NUMS = """
+insert into "parameters_counternums" as "cn" ("uuid_counter", "num")
+values (%(uuid_counter)s, 1 + %(nums_number)s)
+on conflict ("uuid_counter") do update
+set "num" = "cn"."num" + %(nums_number)s
+returning "cn"."num" - %(nums_number)s as "first_num"
+"""
+
 
 def get_pre_suf(name: AnyStr, attr_instance: Any = None) -> str:
     """Retourne le texte de la attr_instance souhaitée dans le préfix ou le suffix
@@ -270,17 +280,15 @@ def initial_counter_nums(counter_instance: Counter):
         return obj
 
 
-def get_counter_num(counter_instance: Counter, attr_instance_dict: Dict = None) -> str:
-    """Retourne la numérotation
+def get_counter_format(counter_instance: Counter, attr_instance_dict: Dict = None) -> Tuple:
+    """Retourne le début de la numérotation (préfix et suffix) et la longueur du numéro
     :param counter_instance: instance du compteur à appliquer
     :param attr_instance_dict: dictonaire des valeurs des attr_instance à appliquer
-    :return: la numérotation demandée
+    :return: (texte avant le numéro, longueur du numéro)
     """
     if attr_instance_dict is None:
         attr_instance_dict = {}
 
-    counter_num_obj = initial_counter_nums(counter_instance)
-
     str_num = ""
     prefix = counter_instance.prefix or attr_instance_dict.get("prefix", "")
     attr_instance_prefix = attr_instance_dict.get("prefix", "")
@@ -301,12 +309,72 @@ def get_counter_num(counter_instance: Counter, attr_instance_dict: Dict = None)
             get_pre_suf(name=suffix, attr_instance=attr_instance_suffix) + separateur
         )
 
-    str_num += str(counter_num_obj.num).zfill(ldap_num)
+    return str_num, ldap_num
+
+
+def reserve_counter_nums(counter_instance: Counter, nums_number: int) -> range:
+    """Réserve atomiquement nums_number numéros consécutifs du compteur, en une requête.
+    Le verrou de ligne de l'update garantit que deux process n'ont pas les mêmes numéros
+    :param counter_instance: instance du compteur à appliquer
+    :param nums_number: nombre de numéros à réserver
+    :return: les numéros réservés
+    """
+    if nums_number < 1:
+        return range(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SQL_RESERVE_COUNTER_NUMS,
+            {
+                "uuid_counter": counter_instance.uuid_identification,
+                "nums_number": nums_number,
+            },
+        )
+        (first_num,) = cursor.fetchone()
+
+    return range(first_num, first_num + nums_number)
+
+
+def get_counter_nums(
+    counter_instance: Counter, nums_number: int, attr_instance_dict: Dict = None
+) -> Iterator[str]:
+    """Retourne nums_number numérotations consécutives, réservées en une seule requête.
+    Il faut réserver exactement le nombre de numéros utilisés pour ne pas laisser de trous
+    :param counter_instance: instance du compteur à appliquer
+    :param nums_number: nombre de numérotations à réserver
+    :param attr_instance_dict: dictonaire des valeurs des attr_instance à appliquer
+    :return: itérateur des numérotations demandées
+    """
+    str_num, ldap_num = get_counter_format(counter_instance, attr_instance_dict)
+    nums_range = reserve_counter_nums(counter_instance, nums_number)
+
+    return iter([str_num + str(num).zfill(ldap_num) for num in nums_range])
+
+
+def get_counter_sql_params(
+    counter_instance: Counter, nums_number: int, attr_instance_dict: Dict = None
+) -> Dict:
+    """Réserve nums_number numéros consécutifs et retourne les paramètres d'une numérotation
+    faite côté serveur : la ligne de rang n (à partir de 0) a le numéro
+    num_prefix || lpad((first_num + n)::varchar, lpad_num, '0')
+    :param counter_instance: instance du compteur à appliquer
+    :param nums_number: nombre de numérotations à réserver
+    :param attr_instance_dict: dictonaire des valeurs des attr_instance à appliquer
+    :return: {"num_prefix": str, "lpad_num": int, "first_num": int}
+    """
+    str_num, ldap_num = get_counter_format(counter_instance, attr_instance_dict)
+    nums_range = reserve_counter_nums(counter_instance, nums_number)
+
+    return {"num_prefix": str_num, "lpad_num": ldap_num, "first_num": nums_range.start}
 
-    counter_num_obj.num += 1
-    counter_num_obj.save()
 
-    return str_num
+def get_counter_num(counter_instance: Counter, attr_instance_dict: Dict = None) -> str:
+    """Retourne la numérotation
+    :param counter_instance: instance du compteur à appliquer
+    :param attr_instance_dict: dictonaire des valeurs des attr_instance à appliquer
+    :return: la numérotation demandée
+    """
+    return next(get_counter_nums(counter_instance, 1, attr_instance_dict))
 
 
 def have_action_in_progress():
@@ -118,6 +118,9 @@ IMPORT_ACCOUNTS = lazy_mkdir("files/processing/suppliers_invoices_files/IMPORT_A
 # REPERTOIRE DES BACKUP FACTURES FOURNISSEURS
 BACKUP_SUPPLIERS_DIR = lazy_mkdir("files/backup/suppliers_invoices_files")
 
+# REPERTOIRE DES FICHIERS FOURNISSEURS DEJA INTEGRES (DOUBLONS)
+BACKUP_DUPLICATES_SUPPLIERS_DIR = lazy_mkdir("files/backup/suppliers_invoices_files/DOUBLONS")
+
 # REPERTOIRE BACKUP DES IMPORTS DES ARTICLES SANS COMPTES
 BACKUP_WITHOUT_ACCOUNT_DIR = lazy_mkdir("files/backup/suppliers_invoices_files/ARTICLES_SANS_COMPTES")
 